@@ -26,4 +26,24 @@ __since__ = '2014-05-18'
 __version__ = version
 
 
-from asyncflux.client import AsyncfluxClient
+_SUBMODULES = frozenset((
+    'authcache', 'batch', 'breaker', 'client', 'clusteradmin', 'database',
+    'dataframe', 'deadline', 'errors', 'fakeserver', 'lanes', 'loadgen',
+    'looplag', 'metadata', 'multiwriter', 'partitioner', 'permissions',
+    'profiling', 'query', 'shardspace', 'startup', 'sync', 'testing',
+    'timestamps', 'timing', 'tls', 'user', 'util'))
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # Loads the client (and Tornado's) and the submodules on first use
+        if name == 'AsyncfluxClient':
+            from asyncflux.client import AsyncfluxClient
+            return AsyncfluxClient
+        if name in _SUBMODULES:
+            import importlib
+            return importlib.import_module('%s.%s' % (__name__, name))
+        raise AttributeError('module %r has no attribute %r' %
+                             (__name__, name))
+else:
+    from asyncflux.client import AsyncfluxClient  # pragma: no cover
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Cache of authentication outcomes"""
+import hashlib
+import hmac
+import os
+from collections import OrderedDict
+
+from tornado.concurrent import Future
+
+from asyncflux.deadline import now
+from asyncflux.util import LRUCache
+
+CLUSTER = ''
+
+
+class AuthCache(object):
+    """Remembers whether credentials were accepted by the server.
+
+    Entries are keyed by an HMAC of the credentials with a random
+    per-cache salt, so passwords are never kept. Accepted credentials are
+    remembered for ``ttl`` seconds and rejected ones for ``negative_ttl``.
+    Concurrent checks of the same credentials share a single request, and
+    :meth:`invalidate` forgets a user (or a whole database) at once, even
+    while a check is in flight. Scopes are database names, or
+    :data:`CLUSTER` for cluster admins.
+
+    Invalidations are numbered, and an entry only holds while no
+    invalidation of its user or scope is newer than its check. The last
+    ``max_size`` invalidations are kept; older ones are folded into a floor
+    that every entry must be newer than, which may forget a few more
+    outcomes than needed but never fewer.
+    """
+
+    TTL = 60.0
+    NEGATIVE_TTL = 5.0
+    MAX_SIZE = 10000
+
+    def __init__(self, ttl=None, negative_ttl=None, max_size=None,
+                 clock=now):
+        self.ttl = ttl or self.TTL
+        self.negative_ttl = negative_ttl or self.NEGATIVE_TTL
+        self.__clock = clock
+        self.__salt = os.urandom(16)
+        self.__entries = LRUCache(max_size or self.MAX_SIZE)
+        self.__invalidations = OrderedDict()
+        self.__max_invalidations = max_size or self.MAX_SIZE
+        self.__generation_floor = 0
+        self.__last_generation = 0
+        self.__pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __digest(self, scope, username, password):
+        message = u'\0'.join((scope, username, password)).encode('utf-8')
+        return hmac.new(self.__salt, message, hashlib.sha256).digest()
+
+    def __generation(self, scope, username):
+        return max(self.__generation_floor,
+                   self.__invalidations.get((scope, None), 0),
+                   self.__invalidations.get((scope, username), 0))
+
+    def invalidate(self, scope, username=None):
+        """Forgets the outcomes for a user, or for every user of a scope."""
+        key = (scope, username)
+        self.__last_generation += 1
+        self.__invalidations.pop(key, None)
+        self.__invalidations[key] = self.__last_generation
+        if len(self.__invalidations) > self.__max_invalidations:
+            _, generation = self.__invalidations.popitem(last=False)
+            self.__generation_floor = generation
+
+    def lookup(self, scope, username, password):
+        """Returns the remembered outcome for the credentials, or None."""
+        key = (scope, username, self.__digest(scope, username, password))
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        expires, generation, accepted = entry
+        if expires <= self.__clock() or \
+                generation != self.__generation(scope, username):
+            return None
+        return accepted
+
+    def authenticate(self, scope, username, password, check):
+        """Returns a future resolved with the outcome for the credentials.
+
+        ``check()`` asks the server and returns a future resolved with True
+        or False; if it fails instead, the error is passed on and nothing is
+        remembered.
+        """
+        digest = self.__digest(scope, username, password)
+        key = (scope, username, digest)
+        accepted = self.lookup(scope, username, password)
+        if accepted is not None:
+            self.hits += 1
+            future = Future()
+            future.set_result(accepted)
+            return future
+        pending = self.__pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return pending
+        self.misses += 1
+        generation = self.__generation(scope, username)
+        future = check()
+        self.__pending[key] = future
+
+        def done(f):
+            self.__pending.pop(key, None)
+            if f.exception() is not None or \
+                    generation != self.__generation(scope, username):
+                return
+            accepted = f.result()
+            ttl = self.ttl if accepted else self.negative_ttl
+            self.__entries.set(key, (self.__clock() + ttl, generation,
+                                     accepted))
+        future.add_done_callback(done)
+        return future
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.__entries),
+                'invalidations': len(self.__invalidations)}
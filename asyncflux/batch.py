@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Batched series writes"""
+import logging
+from collections import OrderedDict
+
+from tornado import gen
+
+from asyncflux.errors import ClientClosed
+from asyncflux.util import asyncflux_coroutine
+
+logger = logging.getLogger('asyncflux.batch')
+
+
+class BatchWriter(object):
+    """Buffers points of a database and writes them in batches.
+
+    A batch is written once it holds ``batch_size`` points or
+    ``flush_interval`` seconds after its first point was added, whatever
+    happens first. Errors of those background writes are passed to
+    ``on_error`` (logged by default).
+
+    Writers are registered in their client, whose
+    :meth:`~asyncflux.AsyncfluxClient.close` closes them.
+    """
+
+    BATCH_SIZE = 5000
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, database, batch_size=None, flush_interval=None,
+                 time_precision=None, on_error=None):
+        self.__database = database
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.time_precision = time_precision
+        self.on_error = on_error or self.__log_error
+        self.__series = OrderedDict()
+        self.__size = 0
+        self.__timeout = None
+        self.__in_flight = {}
+        self.__closed = False
+        self.__unwritten = []
+        self.client.add_batch_writer(self)
+
+    @property
+    def database(self):
+        return self.__database
+
+    @property
+    def client(self):
+        return self.__database.client
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    @property
+    def pending(self):
+        """Number of points waiting to be written."""
+        return self.__size
+
+    def add(self, name, columns, points):
+        """Buffers ``points`` of the series ``name``."""
+        if self.__closed:
+            raise ClientClosed('The batch writer is closed')
+        key = (name, tuple(columns))
+        self.__series.setdefault(key, []).extend(points)
+        self.__size += len(points)
+        if self.__size >= self.batch_size:
+            self.__flush_in_background()
+        elif self.__timeout is None:
+            self.__timeout = self.client.io_loop.call_later(
+                self.flush_interval, self.__flush_in_background)
+
+    def take(self):
+        """Removes and returns the buffered points as a list of series."""
+        if self.__timeout is not None:
+            self.client.io_loop.remove_timeout(self.__timeout)
+            self.__timeout = None
+        data = [{'name': name, 'columns': list(columns), 'points': points}
+                for (name, columns), points in self.__series.items()]
+        self.__series = OrderedDict()
+        self.__size = 0
+        return data
+
+    def __log_error(self, error, data):
+        logger.error('Failed to write %d series to %s: %s', len(data),
+                     self.database.name, error)
+
+    @gen.coroutine
+    def __write(self, data):
+        try:
+            yield self.database.write_points(
+                data, time_precision=self.time_precision)
+        except Exception as e:
+            if self.__closed:
+                self.__unwritten.extend(data)
+            else:
+                self.on_error(e, data)
+
+    def __write_in_background(self, data):
+        if data:
+            future = self.__write(data)
+            self.__in_flight[future] = data
+            future.add_done_callback(
+                lambda f: self.__in_flight.pop(f, None))
+
+    def __flush_in_background(self):
+        self.__write_in_background(self.take())
+
+    @asyncflux_coroutine
+    def flush(self):
+        """Writes the buffered points and waits for the running writes."""
+        data = self.take()
+        if data:
+            yield self.database.write_points(
+                data, time_precision=self.time_precision)
+        if self.__in_flight:
+            yield list(self.__in_flight)
+
+    @asyncflux_coroutine
+    def close(self):
+        """Stops accepting points, writes the buffered ones and waits for
+        the running writes.
+
+        Returns the series that couldn't be written, which are not passed
+        to ``on_error``.
+        """
+        self.__closed = True
+        self.__write_in_background(self.take())
+        if self.__in_flight:
+            yield list(self.__in_flight)
+        unwritten, self.__unwritten = self.__unwritten, []
+        raise gen.Return(unwritten)
+
+    def abandon(self):
+        """Closes the writer without waiting for its writes.
+
+        Returns the buffered series, the ones that failed to be written and
+        the ones still being written, whose writes may yet succeed.
+        """
+        self.__closed = True
+        data = self.take() + self.__unwritten
+        for series in list(self.__in_flight.values()):
+            data.extend(series)
+        self.__unwritten = []
+        self.__in_flight.clear()
+        return data
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Circuit breakers for nodes and endpoints"""
+from asyncflux.deadline import now
+from asyncflux.errors import CircuitOpenError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+PROBE_ROUTE = '/ping'
+
+
+class CircuitBreaker(object):
+    """A closed/open/half-open circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    every call is short-circuited for ``reset_timeout`` seconds. Then it
+    turns half-open and lets a single trial through (or runs ``probe``
+    instead), which closes the breaker on success or opens it again. A
+    trial that ends without an outcome (e.g. cancelled) must be given back
+    with :meth:`release`.
+    """
+
+    FAILURE_THRESHOLD = 5
+    RESET_TIMEOUT = 10.0
+
+    def __init__(self, failure_threshold=None, reset_timeout=None,
+                 clock=now):
+        self.failure_threshold = failure_threshold or self.FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or self.RESET_TIMEOUT
+        self.__clock = clock
+        self.__state = CLOSED
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial_pending = False
+        self.__counters = {'successes': 0, 'failures': 0,
+                           'short_circuited': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        return self.__state
+
+    def allow(self, probe=None):
+        if self.__state == OPEN and \
+                self.__clock() - self.__opened_at >= self.reset_timeout:
+            self.__state = HALF_OPEN
+            self.__trial_pending = False
+        if self.__state == HALF_OPEN and not self.__trial_pending:
+            self.__trial_pending = True
+            if probe is None:
+                return True
+            probe()
+        if self.__state == CLOSED:
+            return True
+        self.__counters['short_circuited'] += 1
+        return False
+
+    def release(self):
+        """Lets another trial through after one ended without an outcome."""
+        if self.__state == HALF_OPEN:
+            self.__trial_pending = False
+
+    def record_success(self):
+        self.__counters['successes'] += 1
+        self.__state = CLOSED
+        self.__failures = 0
+        self.__trial_pending = False
+
+    def record_failure(self):
+        self.__counters['failures'] += 1
+        self.__failures += 1
+        if self.__state == HALF_OPEN or \
+                self.__failures >= self.failure_threshold:
+            if self.__state != OPEN:
+                self.__counters['opened'] += 1
+            self.__state = OPEN
+            self.__opened_at = self.__clock()
+            self.__trial_pending = False
+
+    def statistics(self):
+        stats = dict(self.__counters)
+        stats['state'] = self.__state
+        stats['consecutive_failures'] = self.__failures
+        return stats
+
+
+class BreakerRegistry(object):
+    """Keeps a circuit breaker per node and per node and route template.
+
+    Node breakers are probed with ``ping()``, which is never short-circuited
+    itself; route breakers let a single request through as their trial.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None,
+                 clock=now):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__clock = clock
+        self.__breakers = {}
+
+    def get(self, node, route=None):
+        key = (node, route)
+        if key not in self.__breakers:
+            self.__breakers[key] = CircuitBreaker(self.failure_threshold,
+                                                  self.reset_timeout,
+                                                  self.__clock)
+        return self.__breakers[key]
+
+    def before_request(self, node, route, probe=None):
+        """Raises :class:`CircuitOpenError` if the request can't be sent.
+
+        Returns the breakers the request is the half-open trial of, to be
+        released once it is done.
+        """
+        if route == PROBE_ROUTE:
+            return []
+        if not self.get(node).allow(probe):
+            raise CircuitOpenError('Circuit open for %s' % node)
+        breaker = self.get(node, route)
+        if not breaker.allow():
+            raise CircuitOpenError('Circuit open for %s%s' % (node, route))
+        return [breaker] if breaker.state == HALF_OPEN else []
+
+    def record(self, node, route, success):
+        breakers = [self.get(node)]
+        if route != PROBE_ROUTE:
+            breakers.append(self.get(node, route))
+        for breaker in breakers:
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    def statistics(self):
+        stats = {}
+        for (node, route), breaker in self.__breakers.items():
+            stats[node + (route or '')] = breaker.statistics()
+        return stats
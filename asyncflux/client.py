@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 """Connection to InfluxDB"""
+import datetime
+import io
 import json
+import logging
 import sys
+import weakref
 try:
     from urlparse import urlparse
 except ImportError:  # pragma: no cover
@@ -11,11 +15,49 @@ if sys.version_info[0] >= 3:
 else:
     basestring = basestring  # pragma: no cover
 
-from tornado import gen, httpclient, httputil, ioloop
-
-from asyncflux import clusteradmin, database, shardspace
-from asyncflux.errors import AsyncfluxError
-from asyncflux.util import asyncflux_coroutine, snake_case_dict
+from tornado import gen, ioloop
+from tornado.concurrent import Future
+
+from asyncflux import deadline
+from asyncflux.errors import (AsyncfluxError, CircuitOpenError, ClientClosed,
+                              DeadlineExceeded, RequestCancelled)
+from asyncflux.util import LazyModule, asyncflux_coroutine
+
+# Imported on first use, so that creating a client stays cheap
+httpclient = LazyModule('tornado.httpclient')
+httputil = LazyModule('tornado.httputil')
+authcache = LazyModule('asyncflux.authcache')
+breaker = LazyModule('asyncflux.breaker')
+clusteradmin = LazyModule('asyncflux.clusteradmin')
+database = LazyModule('asyncflux.database')
+lanes = LazyModule('asyncflux.lanes')
+looplag = LazyModule('asyncflux.looplag')
+metadata = LazyModule('asyncflux.metadata')
+partitioner = LazyModule('asyncflux.partitioner')
+permissions = LazyModule('asyncflux.permissions')
+profiling = LazyModule('asyncflux.profiling')
+shardspace = LazyModule('asyncflux.shardspace')
+timestamps = LazyModule('asyncflux.timestamps')
+timing = LazyModule('asyncflux.timing')
+tls = LazyModule('asyncflux.tls')
+simple_httpclient = LazyModule('tornado.simple_httpclient')
+
+logger = logging.getLogger('asyncflux.client')
+
+
+@gen.coroutine
+def _quiet(future):
+    """Waits for ``future``, ignoring its errors."""
+    try:
+        yield future
+    except Exception:
+        pass
+
+
+def _operation_future(operation):
+    future = Future()
+    operation.add_done_callback(lambda _: future.set_result(None))
+    return future
 
 
 class AsyncfluxClient(object):
@@ -24,6 +66,8 @@ class AsyncfluxClient(object):
     PORT = 8086
     USERNAME = 'root'
     PASSWORD = 'root'
+    JSON_DECODE_THRESHOLD = 1024 * 1024
+    JSON_ENCODE_THRESHOLD = 100000
 
     def __init__(self, host=None, port=None, username=None, password=None,
                  is_secure=False, io_loop=None, **kwargs):
@@ -53,9 +97,82 @@ class AsyncfluxClient(object):
         self.__username = username
         self.__password = password
 
-        self.__json = kwargs.get('json_module', json)
         self.io_loop = io_loop or ioloop.IOLoop.current()
-        self.http_client = httpclient.AsyncHTTPClient(self.io_loop)
+        self.__json = kwargs.get('json_module', json)
+        self.json_executor = kwargs.get('json_executor')
+        self.json_decode_threshold = kwargs.get('json_decode_threshold',
+                                                self.JSON_DECODE_THRESHOLD)
+        self.json_encode_threshold = kwargs.get('json_encode_threshold',
+                                                self.JSON_ENCODE_THRESHOLD)
+        self.ssl_context = kwargs.get('ssl_context')
+        if self.ssl_context is None and scheme == 'https':
+            self.ssl_context = tls.default_context()
+        self.connect_timeout = kwargs.get('connect_timeout')
+        self.request_timeout = kwargs.get('request_timeout')
+        breakers = kwargs.get('circuit_breaker')
+        if breakers is True:
+            breakers = breaker.BreakerRegistry()
+        self.breakers = breakers or None
+        scheduler = kwargs.get('lanes')
+        if scheduler is True:
+            scheduler = lanes.LaneScheduler(io_loop=self.io_loop)
+        self.lanes = scheduler or None
+        self.time_precision = kwargs.get('time_precision')
+        if self.time_precision is not None:
+            timestamps.validate_time_precision(self.time_precision)
+        self.write_precheck = kwargs.get('write_precheck')
+        self.permissions = None
+        if self.write_precheck is not None:
+            if self.write_precheck not in (permissions.REJECT,
+                                           permissions.SPLIT):
+                raise ValueError('Invalid write precheck: %s' %
+                                 self.write_precheck)
+            self.permissions = permissions.PermissionCache(
+                self, ttl=kwargs.get('permission_ttl'))
+        auth_cache = kwargs.get('auth_cache')
+        if auth_cache is True:
+            auth_cache = authcache.AuthCache()
+        self.auth_cache = auth_cache or None
+        self.request_timing = kwargs.get('request_timing', False)
+        monitor = kwargs.get('loop_lag_monitor')
+        if monitor is True:
+            monitor = looplag.LoopLagMonitor(io_loop=self.io_loop)
+        self.loop_monitor = monitor or None
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        self.__request_hooks = []
+        self.__statistics = {'requests': 0, 'failures': 0,
+                             'short_circuited': 0}
+        self.__http_client = None
+        self.shard_partitioner = None
+        self.profiler = None
+        self.__warming = None
+        self.__warm_up_report = None
+        self.spill_sink = kwargs.get('spill_sink')
+        self.__batch_writers = weakref.WeakSet()
+        self.__in_flight = set()
+        self.__operations = set()
+        self.__closed = False
+        self.__close_sequence = None
+        self.__admitted = 0
+        self.__drain = None
+        self.__close_future = None
+        warm_connections = kwargs.get('warm_connections')
+        if warm_connections:
+            future = self.warm_up(warm_connections)
+            future.add_done_callback(lambda f: f.exception())
+
+    @property
+    def http_client(self):
+        """The :class:`~tornado.httpclient.AsyncHTTPClient` of the client,
+        created on first use."""
+        if self.__http_client is None:
+            self.__http_client = httpclient.AsyncHTTPClient(self.io_loop)
+        return self.__http_client
+
+    @http_client.setter
+    def http_client(self, value):
+        self.__http_client = value
 
     @property
     def host(self):
@@ -69,6 +186,10 @@ class AsyncfluxClient(object):
     def base_url(self):
         return '%s://%s:%s' % (self.__scheme, self.host, self.port, )
 
+    @property
+    def node(self):
+        return '%s:%s' % (self.host, self.port)
+
     @property
     def username(self):
         return self.__username
@@ -91,9 +212,341 @@ class AsyncfluxClient(object):
     def __getitem__(self, name):
         return self.__getattr__(name)
 
+    def __fetch_options(self):
+        options = {}
+        connect_timeout = self.connect_timeout
+        request_timeout = self.request_timeout
+        remaining = deadline.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded()
+            connect_timeout = min(connect_timeout or remaining, remaining)
+            request_timeout = min(request_timeout or remaining, remaining)
+        if connect_timeout is not None:
+            options['connect_timeout'] = connect_timeout
+        if request_timeout is not None:
+            options['request_timeout'] = request_timeout
+        # curl_httpclient keeps its own TLS sessions and rejects ssl_options
+        if self.ssl_context is not None and self.__scheme == 'https' and \
+                isinstance(self.http_client,
+                           simple_httpclient.SimpleAsyncHTTPClient):
+            options['ssl_options'] = self.ssl_context
+        return options
+
+    def __offload_encoding(self, body):
+        """Tells if a body has enough values to be encoded in the executor.
+
+        Series bodies are sized by their number of values, other bodies are
+        always encoded inline.
+        """
+        if self.json_executor is None or not isinstance(body, list):
+            return False
+        values = 0
+        for series in body:
+            if isinstance(series, dict):
+                points = series.get('points') or ()
+                values += len(points) * len(series.get('columns') or ())
+        return values >= self.json_encode_threshold
+
+    def __offload_decoding(self, body):
+        return self.json_executor is not None and \
+            len(body) >= self.json_decode_threshold
+
+    def __probe(self):
+        node_breaker = self.breakers.get(self.node)
+
+        def done(future):
+            future.exception()
+            node_breaker.release()
+        self.ping().add_done_callback(done)
+
+    def __record_outcome(self, path, success):
+        if not success:
+            self.__statistics['failures'] += 1
+        if self.breakers is not None:
+            self.breakers.record(self.node, path, success)
+
+    def get_statistics(self):
+        """Returns request counters, the state of the circuit breakers and
+        lanes, the loop lag histogram, the last warm-up and the TLS
+        handshakes, as enabled."""
+        statistics = dict(self.__statistics)
+        if self.breakers is not None:
+            statistics['breakers'] = self.breakers.statistics()
+        if self.lanes is not None:
+            statistics['lanes'] = self.lanes.statistics()
+        if self.loop_monitor is not None:
+            statistics['loop_lag'] = self.loop_monitor.statistics()
+        if self.__warm_up_report is not None:
+            statistics['warm_up'] = dict(self.__warm_up_report)
+        if hasattr(self.ssl_context, 'statistics'):
+            statistics['tls'] = self.ssl_context.statistics()
+        return statistics
+
+    @gen.coroutine
+    def __acquire_lane(self, lane, cancellation):
+        remaining = deadline.remaining()
+        future = self.lanes.acquire(lane, remaining)
+        if cancellation is None:
+            yield future
+            return
+        try:
+            yield cancellation.wrap(future)
+        except RequestCancelled:
+            self.lanes.abandon(lane, future)
+            raise
+
+    def enable_profiling(self, directory, sample_rate=0.01,
+                         trace_memory=False, snapshot_interval=None):
+        """Starts profiling a fraction of the calls made through this client.
+
+        See :class:`~asyncflux.profiling.Profiler`; reports are written to
+        ``directory``.
+        """
+        self.disable_profiling()
+        self.profiler = profiling.Profiler(
+            directory, sample_rate=sample_rate, trace_memory=trace_memory,
+            snapshot_interval=snapshot_interval, io_loop=self.io_loop)
+        return self.profiler
+
+    def disable_profiling(self):
+        profiler, self.profiler = self.profiler, None
+        if profiler is not None:
+            profiler.stop()
+        return profiler
+
+    def add_request_hook(self, hook):
+        """Calls ``hook`` with the :class:`~asyncflux.timing.RequestTiming`
+        of every request once it is done, whether it failed or not."""
+        self.__request_hooks.append(hook)
+
+    def remove_request_hook(self, hook):
+        self.__request_hooks.remove(hook)
+
+    def add_batch_writer(self, writer):
+        """Registers a :class:`~asyncflux.batch.BatchWriter` to be drained
+        by :meth:`close`; writers register themselves on creation."""
+        self.__batch_writers.add(writer)
+
+    def remove_batch_writer(self, writer):
+        self.__batch_writers.discard(writer)
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    def close(self, deadline=None):
+        """Shuts the client down within ``deadline`` seconds (without limit
+        if None), returning a future with a report of the shutdown.
+
+        New calls fail with :class:`~asyncflux.errors.ClientClosed` right
+        away. The registered batch writers are closed, writing their
+        buffered points in parallel, and the requests in flight are waited
+        for, along with the calls they belong to: the requests that calls
+        started before :meth:`close` send afterwards (e.g. the next time
+        range of a split query) are still sent. Once the deadline is
+        reached, the writes of the batch writers are cancelled and the
+        series not known to be written are handed to the
+        ``spill_sink(database_name, series)`` client option, or logged and
+        dropped without one; a write still in flight at that point may be
+        both spilled and written. The loop lag monitor, the profiler and
+        the HTTP client are stopped last.
+
+        Besides the batch writers and the spilled points, the report counts
+        the ``operations`` started before :meth:`close` that were waited
+        for, the requests they were admitted to send afterwards
+        (``admitted_requests``) and those left running at the deadline
+        (``abandoned_operations`` and ``abandoned_requests``).
+
+        Calling it again returns the future of the first call.
+        """
+        if self.__close_future is None:
+            self.__close_future = self.__close(deadline)
+        return self.__close_future
+
+    @gen.coroutine
+    def __close(self, timeout):
+        started = self.io_loop.time()
+        self.__closed = True
+        self.__close_sequence = deadline.next_sequence()
+        drain = self.__drain = deadline.Cancellation()
+        writers = list(self.__batch_writers)
+        closing = [writer.close(cancellation=drain) for writer in writers]
+        operations = set()
+        waiting = self.__wait_for_calls(closing, operations)
+        timed_out = False
+        try:
+            if timeout is None:
+                yield waiting
+            else:
+                yield gen.with_timeout(datetime.timedelta(seconds=timeout),
+                                       waiting)
+        except gen.TimeoutError:
+            timed_out = True
+            drain.cancel()
+        spilled = 0
+        for writer, future in zip(writers, closing):
+            if future.done():
+                unwritten = future.result()
+            else:
+                unwritten = writer.abandon()
+            if unwritten:
+                spilled += sum(len(s.get('points') or ()) for s in unwritten)
+                self.__spill(writer.database.name, unwritten)
+        report = {'elapsed': self.io_loop.time() - started,
+                  'timed_out': timed_out,
+                  'batch_writers': len(writers),
+                  'spilled_points': spilled,
+                  'operations': len(operations),
+                  'admitted_requests': self.__admitted,
+                  'abandoned_operations': len([o for o in operations
+                                               if not o.done]),
+                  'abandoned_requests': len([f for f in self.__in_flight
+                                             if not f.done()])}
+        self.__drain = None
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+        self.disable_profiling()
+        if self.__http_client is not None:
+            self.__http_client.close()
+        raise gen.Return(report)
+
+    @gen.coroutine
+    def __wait_for_calls(self, futures, operations):
+        # Calls may send their first request after close, so look for new
+        # ones until every call known to be running is done. The call
+        # closing the client, if any, is not waited for.
+        own = deadline.current_operation()
+        futures = futures + list(self.__in_flight)
+        while True:
+            started = [operation for operation in list(self.__operations)
+                       if operation not in operations and operation is not
+                       own and operation.sequence < self.__close_sequence]
+            if not futures and not started:
+                return
+            operations.update(started)
+            futures.extend(_operation_future(operation)
+                           for operation in started)
+            yield gen.multi([_quiet(future) for future in futures])
+            futures = []
+
+    def __admits_after_close(self):
+        if self.__drain is None:
+            return False
+        if deadline.current_cancellation() is self.__drain:
+            return True
+        operation = deadline.current_operation()
+        if operation is None or operation.sequence > self.__close_sequence:
+            return False
+        self.__admitted += 1
+        return True
+
+    def __spill(self, database_name, data):
+        if self.spill_sink is None:
+            logger.error('Dropping %d series of %s on close', len(data),
+                         database_name)
+            return
+        try:
+            self.spill_sink(database_name, data)
+        except Exception:
+            logger.exception('Failed to spill %d series of %s', len(data),
+                             database_name)
+
+    def __finish_timing(self, request_timing, error=None):
+        request_timing.total = self.io_loop.time() - request_timing.started
+        request_timing.error = error
+        for hook in list(self.__request_hooks):
+            try:
+                hook(request_timing)
+            except Exception:
+                logger.exception('Request hook %r failed', hook)
+
     @asyncflux_coroutine
     def request(self, path, path_params=None, qs=None, body=None,
-                method='GET', auth_username=None, auth_password=None):
+                method='GET', auth_username=None, auth_password=None,
+                lane=None):
+        """Sends a request to InfluxDB and returns its decoded body.
+
+        If the client was created with ``request_timing=True`` or has
+        request hooks, the time of every phase of the request is measured
+        and lists and objects are returned as
+        :class:`~asyncflux.timing.TimedList` and
+        :class:`~asyncflux.timing.TimedDict`, whose ``timing`` attribute
+        holds it.
+
+        Requests in flight are registered in the ``loop_lag_monitor``, if
+        any, so that loop lag spikes are attributed to them. Requests other
+        than pings wait for a :meth:`warm_up` in progress.
+        """
+        if self.__closed and not self.__admits_after_close():
+            raise ClientClosed()
+        operation = deadline.current_operation()
+        if operation is not None and operation not in self.__operations:
+            self.__operations.add(operation)
+            operation.add_done_callback(self.__operations.discard)
+        if self.__warming is not None and path != '/ping':
+            yield self.__warming
+        monitor = self.loop_monitor
+        token = None if monitor is None else monitor.begin(method, path)
+        try:
+            if not self.request_timing and not self.__request_hooks:
+                response = yield self.__dispatch(path, path_params, qs, body,
+                                                 method, auth_username,
+                                                 auth_password, lane, None)
+                raise gen.Return(response)
+            request_timing = timing.RequestTiming(method, path,
+                                                  self.io_loop.time())
+            try:
+                response = yield self.__dispatch(path, path_params, qs, body,
+                                                 method, auth_username,
+                                                 auth_password, lane,
+                                                 request_timing)
+            except Exception as e:
+                self.__finish_timing(request_timing, e)
+                raise
+            self.__finish_timing(request_timing)
+            raise gen.Return(response)
+        finally:
+            if token is not None:
+                monitor.end(token)
+
+    @gen.coroutine
+    def __dispatch(self, path, path_params, qs, body, method, auth_username,
+                   auth_password, lane, request_timing):
+        trials = []
+        if self.breakers is not None:
+            try:
+                trials = self.breakers.before_request(self.node, path,
+                                                      self.__probe)
+            except CircuitOpenError:
+                self.__statistics['short_circuited'] += 1
+                raise
+        try:
+            if self.lanes is None or lane == lanes.BYPASS:
+                response = yield self.__request(path, path_params, qs, body,
+                                                method, auth_username,
+                                                auth_password, request_timing)
+                raise gen.Return(response)
+            lane = lane or lanes.classify(method, path)
+            yield self.__acquire_lane(lane, deadline.current_cancellation())
+            try:
+                response = yield self.__request(path, path_params, qs, body,
+                                                method, auth_username,
+                                                auth_password, request_timing)
+            finally:
+                self.lanes.release(lane)
+            raise gen.Return(response)
+        finally:
+            # A no-op once the trial recorded its outcome
+            for breaker in trials:
+                breaker.release()
+
+    @gen.coroutine
+    def __request(self, path, path_params, qs, body, method, auth_username,
+                  auth_password, request_timing):
+        if request_timing is not None:
+            request_timing.queue = self.io_loop.time() - \
+                request_timing.started
         try:
             path_params = path_params or {}
             qs = qs or {}
@@ -101,14 +554,106 @@ class AsyncfluxClient(object):
             auth_password = auth_password or self.password
 
             url = (self.base_url + path) % path_params
-            if isinstance(body, dict):
+            if self.__offload_encoding(body):
+                body = yield self.json_executor.submit(self.__json.dumps,
+                                                       body)
+            elif isinstance(body, (dict, list)):
                 body = self.__json.dumps(body)
-            response = yield self.http_client.fetch(
+            options = self.__fetch_options()
+            # Timeouts of the caller's own deadline say nothing of the node
+            remaining = deadline.remaining()
+            own_timeout = remaining is not None and (
+                self.request_timeout is None or
+                remaining <= self.request_timeout)
+            cancellation = deadline.current_cancellation()
+            chunks = []
+            if cancellation is not None:
+                cancellation.check()
+            if request_timing is not None:
+                issued = self.io_loop.time()
+                request_timing.encode = issued - request_timing.started - \
+                    request_timing.queue
+            if cancellation is not None or request_timing is not None:
+                abort = isinstance(self.http_client,
+                                   simple_httpclient.SimpleAsyncHTTPClient)
+
+                def cancelled():
+                    # The caller already got RequestCancelled. The simple
+                    # client closes the connection on an HTTPInputError
+                    # without logging it as an error; others can't be
+                    # aborted quietly, so the rest of the response is
+                    # dropped instead.
+                    if cancellation is None or not cancellation.cancelled:
+                        return False
+                    if abort:
+                        raise httputil.HTTPInputError('Request cancelled')
+                    return True
+
+                def header_callback(line):
+                    if cancelled():
+                        return
+                    if request_timing is not None and \
+                            request_timing.first_byte is None:
+                        request_timing.first_byte = self.io_loop.time()
+
+                def streaming_callback(chunk):
+                    if not cancelled():
+                        chunks.append(chunk)
+                # Timing only needs the headers, so the body is only
+                # streamed to check the cancellation.
+                options['header_callback'] = header_callback
+                if cancellation is not None:
+                    options['streaming_callback'] = streaming_callback
+            future = self.http_client.fetch(
                 httputil.url_concat(url, qs), body=body, method=method,
-                auth_username=auth_username, auth_password=auth_password)
-            if hasattr(response, 'body') and response.body:
-                raise gen.Return(self.__json.loads(response.body))
+                auth_username=auth_username, auth_password=auth_password,
+                **options)
+            self.__statistics['requests'] += 1
+            self.__in_flight.add(future)
+            future.add_done_callback(self.__in_flight.discard)
+            if cancellation is not None:
+                future = cancellation.wrap(future)
+            try:
+                response = yield future
+            except RequestCancelled:
+                raise
+            except httpclient.HTTPError as e:
+                if not (own_timeout and e.code == 599 and
+                        'Timeout' in str(e)):
+                    self.__record_outcome(path, e.code < 500)
+                if chunks and e.response is not None:
+                    # The body was streamed, put it back for the error
+                    e.response.buffer = io.BytesIO(b''.join(chunks))
+                if request_timing is not None and e.response is not None:
+                    request_timing.on_response(e.response, issued,
+                                               self.io_loop.time())
+                raise
+            except Exception:
+                # Connection refused or reset, DNS failures and the like
+                self.__record_outcome(path, False)
+                raise
+            self.__record_outcome(path, True)
+            if request_timing is not None:
+                request_timing.on_response(response, issued,
+                                           self.io_loop.time())
+            response_body = b''.join(chunks) if chunks else \
+                getattr(response, 'body', None)
+            if response_body:
+                decoding = self.io_loop.time()
+                if self.__offload_decoding(response_body):
+                    result = yield self.json_executor.submit(
+                        self.__json.loads, response_body)
+                else:
+                    result = self.__json.loads(response_body)
+                if request_timing is not None:
+                    request_timing.decode = self.io_loop.time() - decoding
+                    result = timing.attach(result, request_timing)
+                raise gen.Return(result)
         except httpclient.HTTPError as e:
+            if e.response is None:
+                if e.code == 599 and 'Timeout' in str(e):
+                    raise DeadlineExceeded(str(e))
+                raise AsyncfluxError(message=str(e))
             raise AsyncfluxError(e.response)
 
     @asyncflux_coroutine
@@ -116,6 +661,62 @@ class AsyncfluxClient(object):
         status = yield self.request('/ping')
         raise gen.Return(status)
 
+    @asyncflux_coroutine
+    def warm_up(self, connections=4):
+        """Sends ``connections`` concurrent ping probes to the server,
+        holding back any other request until they are done. The
+        ``warm_connections`` client option runs it on creation.
+
+        The probes bypass the request lanes, so only ``max_clients`` of the
+        HTTP client limits how many run at once. Only HTTP clients that
+        pool connections, like ``curl_httpclient``, keep them open for the
+        requests that follow; the default ``simple_httpclient`` opens one
+        connection per request, so there the probes only load the modules
+        used by requests and resolve the host.
+
+        Failed probes don't make the warm-up fail. It returns the number of
+        ``probes``, the ``concurrency`` they could run with, whether the
+        HTTP client keeps connections (``pooled``), the number of probes
+        that ``succeeded`` and failed (``errors``), the ``last_error`` and
+        the ``elapsed`` seconds; :meth:`get_statistics` reports it as
+        ``warm_up`` too.
+        """
+        gate = Future()
+        self.__warming = gate
+        started = self.io_loop.time()
+        errors = []
+        http_client = self.http_client
+        pooled = not isinstance(http_client,
+                                simple_httpclient.SimpleAsyncHTTPClient)
+        # curl_httpclient keeps one handle per client it may run at once
+        max_clients = getattr(http_client, 'max_clients', None) or \
+            len(getattr(http_client, '_curls', ())) or connections
+
+        @gen.coroutine
+        def probe():
+            try:
+                yield self.request('/ping', lane=lanes.BYPASS)
+            except Exception as e:
+                errors.append(e)
+
+        try:
+            yield [probe() for _ in range(connections)]
+        finally:
+            if self.__warming is gate:
+                self.__warming = None
+            gate.set_result(None)
+        self.__warm_up_report = {
+            'node': self.node,
+            'probes': connections,
+            'concurrency': min(connections, max_clients),
+            'pooled': pooled,
+            'succeeded': connections - len(errors),
+            'errors': len(errors),
+            'last_error': repr(errors[-1]) if errors else None,
+            'elapsed': self.io_loop.time() - started,
+        }
+        raise gen.Return(dict(self.__warm_up_report))
+
     @asyncflux_coroutine
     def get_databases(self):
         dbs = yield self.request('/db')
@@ -149,6 +750,8 @@ class AsyncfluxClient(object):
                             "%s or Database" % (basestring.__name__,))
         yield self.request('/db/%(database)s', {'database': name},
                            method='DELETE')
+        if self.auth_cache is not None:
+            self.auth_cache.invalidate(name)
 
     @asyncflux_coroutine
     def get_cluster_admin_names(self):
@@ -165,6 +768,8 @@ class AsyncfluxClient(object):
     def create_cluster_admin(self, username, password):
         yield self.request('/cluster_admins', method='POST',
                            body={'name': username, 'password': password})
+        if self.auth_cache is not None:
+            self.auth_cache.invalidate(authcache.CLUSTER, username)
         new_cluster_admin = clusteradmin.ClusterAdmin(self, username)
         raise gen.Return(new_cluster_admin)
 
@@ -173,28 +778,106 @@ class AsyncfluxClient(object):
         yield self.request('/cluster_admins/%(username)s',
                            {'username': username}, method='POST',
                            body={'password': new_password})
+        if self.auth_cache is not None:
+            self.auth_cache.invalidate(authcache.CLUSTER, username)
 
     @asyncflux_coroutine
     def delete_cluster_admin(self, username):
         yield self.request('/cluster_admins/%(username)s',
                            {'username': username}, method='DELETE')
+        if self.auth_cache is not None:
+            self.auth_cache.invalidate(authcache.CLUSTER, username)
 
-    @asyncflux_coroutine
-    def authenticate_cluster_admin(self, username, password):
+    @gen.coroutine
+    def check_credentials(self, path, path_params, username, password):
+        """Tells if the server accepts some credentials for a path.
+
+        Only client errors (4xx) are taken as a rejection; failures without
+        a response (e.g. timeouts) and server errors are raised instead.
+        """
         try:
-            yield self.request('/cluster_admins/authenticate',
-                               auth_username=username, auth_password=password)
-        except AsyncfluxError:
+            yield self.request(path, path_params, auth_username=username,
+                               auth_password=password)
+        except AsyncfluxError as e:
+            if e.response is None or not 400 <= e.response.code < 500:
+                raise
             raise gen.Return(False)
         raise gen.Return(True)
 
+    @gen.coroutine
+    def authenticate(self, scope, path, path_params, username, password):
+        """Checks credentials through the ``auth_cache``, if any."""
+        try:
+            if self.auth_cache is None:
+                accepted = yield self.check_credentials(
+                    path, path_params, username, password)
+            else:
+                accepted = yield self.auth_cache.authenticate(
+                    scope, username, password,
+                    lambda: self.check_credentials(path, path_params,
+                                                   username, password))
+        except AsyncfluxError:
+            accepted = False
+        raise gen.Return(accepted)
+
+    @asyncflux_coroutine
+    def authenticate_cluster_admin(self, username, password):
+        accepted = yield self.authenticate(
+            authcache.CLUSTER, '/cluster_admins/authenticate', None,
+            username, password)
+        raise gen.Return(accepted)
+
     @asyncflux_coroutine
     def get_shard_spaces(self):
         spaces = yield self.request('/cluster/shard_spaces')
-        shard_spaces = [
-            shardspace.ShardSpace(self, **snake_case_dict(s)) for s in spaces
-        ]
+        shard_spaces = [shardspace.ShardSpace.from_raw(self, s)
+                        for s in spaces]
         raise gen.Return(shard_spaces)
 
+    @asyncflux_coroutine
+    def create_shard_space(self, database_name, name, regex='/.*/',
+                           retention_policy='inf', shard_duration='7d',
+                           replication_factor=1, split=1):
+        yield self.request('/cluster/shard_spaces/%(database)s',
+                           {'database': database_name}, method='POST',
+                           body={'name': name, 'regex': regex,
+                                 'retentionPolicy': retention_policy,
+                                 'shardDuration': shard_duration,
+                                 'replicationFactor': replication_factor,
+                                 'split': split})
+        new_shard_space = shardspace.ShardSpace(
+            self, name, database_name, regex, retention_policy,
+            shard_duration, replication_factor, split)
+        raise gen.Return(new_shard_space)
+
+    @asyncflux_coroutine
+    def delete_shard_space(self, database_name, name):
+        yield self.request('/cluster/shard_spaces/%(database)s/%(name)s',
+                           {'database': database_name, 'name': name},
+                           method='DELETE')
+
+    @asyncflux_coroutine
+    def snapshot_metadata(self, concurrency=8):
+        """See :func:`asyncflux.metadata.snapshot`."""
+        document = yield metadata.snapshot(self, concurrency=concurrency)
+        raise gen.Return(document)
+
+    @asyncflux_coroutine
+    def restore_metadata(self, document, password=None, delete_missing=False,
+                         concurrency=8, dry_run=False):
+        """See :func:`asyncflux.metadata.restore`."""
+        report = yield metadata.restore(
+            self, document, password=password, delete_missing=delete_missing,
+            concurrency=concurrency, dry_run=dry_run)
+        raise gen.Return(report)
+
+    @asyncflux_coroutine
+    def load_shard_partitioner(self, cache_size=None):
+        """Fetches the shard spaces and starts splitting writes by shard."""
+        shard_spaces = yield self.get_shard_spaces()
+        self.shard_partitioner = partitioner.ShardPartitioner(
+            shard_spaces, cache_size=cache_size)
+        raise gen.Return(self.shard_partitioner)
+
     def __repr__(self):
         return "AsyncfluxClient(%r, %r)" % (self.host, self.port)
@@ -5,6 +5,8 @@ from asyncflux.util import asyncflux_coroutine
 
 class ClusterAdmin(object):
 
+    __slots__ = ('__client', '__name')
+
     def __init__(self, client, name):
         self.__client = client
         self.__name = name
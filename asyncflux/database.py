@@ -1,14 +1,27 @@
 # -*- coding: utf-8 -*-
 """Database level operations"""
+import functools
+
 from tornado import gen
 
-from asyncflux import user
-from asyncflux.errors import AsyncfluxError
-from asyncflux.util import asyncflux_coroutine, snake_case_dict
+from asyncflux.errors import PermissionDenied
+from asyncflux.util import (LazyModule, asyncflux_coroutine, epoch_seconds,
+                            gather_bounded)
+
+batch = LazyModule('asyncflux.batch')
+dataframe_utils = LazyModule('asyncflux.dataframe')
+permission_utils = LazyModule('asyncflux.permissions')
+query_utils = LazyModule('asyncflux.query')
+timestamps = LazyModule('asyncflux.timestamps')
+user = LazyModule('asyncflux.user')
+
+USER_FIELDS = ('password', 'is_admin', 'read_from', 'write_to')
 
 
 class Database(object):
 
+    __slots__ = ('__client', '__name')
+
     def __init__(self, client, name):
         self.__client = client
         self.__name = name
@@ -35,7 +48,7 @@ class Database(object):
     def get_users(self):
         us = yield self.client.request('/db/%(database)s/users',
                                        {'database': self.name})
-        users = [user.User(self, **snake_case_dict(u)) for u in us]
+        users = [user.User.from_raw(self, u) for u in us]
         raise gen.Return(users)
 
     @asyncflux_coroutine
@@ -43,7 +56,7 @@ class Database(object):
         path_params = {'database': self.name, 'username': username}
         u = yield self.client.request('/db/%(database)s/users/%(username)s',
                                       path_params)
-        raise gen.Return(user.User(self, **snake_case_dict(u)))
+        raise gen.Return(user.User.from_raw(self, u))
 
     def __validate_permission_params(self, read_from=None, write_to=None,
                                      allow_nulls=True):
@@ -66,12 +79,20 @@ class Database(object):
         yield self.client.request('/db/%(database)s/users',
                                   {'database': self.name}, method='POST',
                                   body=payload)
+        # Forget outcomes cached while the user did not exist
+        self.__invalidate_user(username)
         read_from = read_from or user.User.READ_FROM
         write_to = write_to or user.User.WRITE_TO
         new_user = user.User(self, username, is_admin=is_admin,
                              read_from=read_from, write_to=write_to)
         raise gen.Return(new_user)
 
+    def __invalidate_user(self, username):
+        if self.client.permissions is not None:
+            self.client.permissions.invalidate(self.name, username)
+        if self.client.auth_cache is not None:
+            self.client.auth_cache.invalidate(self.name, username)
+
     @asyncflux_coroutine
     def update_user(self, username, new_password=None, is_admin=None,
                     read_from=None, write_to=None):
@@ -80,7 +101,7 @@ class Database(object):
         payload = {}
         if new_password:
             payload['password'] = new_password
-        if is_admin:
+        if is_admin is not None:
             payload['isAdmin'] = is_admin
         if read_from and write_to:
             payload['readFrom'] = read_from
@@ -90,6 +111,99 @@ class Database(object):
         yield self.client.request('/db/%(database)s/users/%(username)s',
                                   {'database': self.name, 'username': username},
                                   method='POST', body=payload)
+        self.__invalidate_user(username)
+
+    @asyncflux_coroutine
+    def sync_users(self, desired_users, delete_missing=True,
+                   update_passwords=False, concurrency=8, dry_run=False):
+        """Makes the users of the database match ``desired_users``.
+
+        ``desired_users`` are dicts with a ``name`` and, optionally,
+        ``password`` (required for new users), ``is_admin``, ``read_from``
+        and ``write_to``, which default as in :meth:`create_user`. The
+        current users are fetched once and only the differences are
+        applied, with at most ``concurrency`` requests in flight. Since
+        passwords can't be read back, the ones of existing users are only
+        set with ``update_passwords``, and users not in ``desired_users``
+        are deleted unless ``delete_missing`` is False.
+
+        Returns a dict by user name with the ``action`` taken (``create``,
+        ``update``, ``delete`` or None), the ``changes`` made and the
+        ``error`` it failed with, if any. Nothing is changed on a
+        ``dry_run``.
+        """
+        desired = {}
+        for spec in desired_users:
+            spec = dict(spec)
+            self.__validate_permission_params(
+                read_from=spec.get('read_from'),
+                write_to=spec.get('write_to'))
+            desired[spec['name']] = spec
+        current = yield self.get_users()
+        current = dict((u.name, u) for u in current)
+        for name, spec in desired.items():
+            if name not in current and not spec.get('password'):
+                raise ValueError('A password is required to create the '
+                                 'user %s' % name)
+
+        report = {}
+        tasks = []
+
+        def plan(name, action, changes, run):
+            report[name] = {'action': action, 'changes': changes,
+                            'error': None}
+            if action is None or dry_run:
+                return
+
+            @gen.coroutine
+            def task():
+                try:
+                    yield run()
+                except Exception as e:
+                    report[name]['error'] = e
+            tasks.append(task)
+
+        for name, spec in desired.items():
+            is_admin = bool(spec.get('is_admin', False))
+            read_from = spec.get('read_from') or user.User.READ_FROM
+            write_to = spec.get('write_to') or user.User.WRITE_TO
+            existing = current.get(name)
+            if existing is None:
+                plan(name, 'create', list(USER_FIELDS),
+                     functools.partial(self.create_user, name,
+                                       spec['password'], is_admin=is_admin,
+                                       read_from=read_from,
+                                       write_to=write_to))
+                continue
+            changes = {}
+            if update_passwords and spec.get('password'):
+                changes['new_password'] = spec['password']
+            if bool(existing.is_admin) != is_admin:
+                changes['is_admin'] = is_admin
+            if existing.read_from != read_from or \
+                    existing.write_to != write_to:
+                changes['read_from'] = read_from
+                changes['write_to'] = write_to
+            plan(name, 'update' if changes else None,
+                 sorted(k.replace('new_', '') for k in changes),
+                 functools.partial(self.update_user, name, **changes))
+        if delete_missing:
+            for name in current:
+                if name not in desired:
+                    plan(name, 'delete', [],
+                         functools.partial(self.delete_user, name))
+
+        yield gather_bounded(tasks, concurrency)
+        raise gen.Return(report)
+
+    @asyncflux_coroutine
+    def save_users(self, users, concurrency=8):
+        """Saves the tracked changes of several :class:`User` objects, with
+        at most ``concurrency`` requests in flight. Returns how many users
+        were updated."""
+        results = yield gather_bounded([u.save for u in users if u.dirty],
+                                       concurrency)
+        raise gen.Return(sum(1 for r in results if r))
 
     @asyncflux_coroutine
     def change_user_password(self, username, new_password):
@@ -116,17 +230,169 @@ class Database(object):
         yield self.client.request('/db/%(database)s/users/%(username)s',
                                   {'database': self.name, 'username': username},
                                   method='DELETE')
+        self.__invalidate_user(username)
 
     @asyncflux_coroutine
     def authenticate_user(self, username, password):
-        try:
-            yield self.client.request('/db/%(database)s/authenticate',
-                                      {'database': self.name},
-                                      auth_username=username,
-                                      auth_password=password)
-        except AsyncfluxError:
-            raise gen.Return(False)
-        raise gen.Return(True)
+        accepted = yield self.client.authenticate(
+            self.name, '/db/%(database)s/authenticate',
+            {'database': self.name}, username, password)
+        raise gen.Return(accepted)
+
+    @asyncflux_coroutine
+    def write_points(self, data, time_precision=None):
+        """Writes a list of ``{name, columns, points}`` series.
+
+        ``time_precision`` (``s``, ``ms`` or ``u``) defaults to the one of
+        the client, and datetimes in the ``time`` columns are converted to
+        it. When the client has a shard partitioner loaded, the points are
+        split so every request lands in a single shard time bucket.
+
+        With the ``write_precheck`` client option, the series the client
+        user can't write are found before any write: the whole call fails
+        with :class:`~asyncflux.errors.PermissionDenied` (``reject``) or
+        only the allowed series are written and the denied ones are returned
+        (``split``).
+        """
+        denied = None
+        if self.client.write_precheck:
+            denied = []
+            user_permissions = yield self.client.permissions.get(self.name)
+            if user_permissions is not None:
+                data, denied = user_permissions.split(data)
+            if denied and \
+                    self.client.write_precheck == permission_utils.REJECT:
+                names = [s['name'] for s in denied]
+                raise PermissionDenied(
+                    "User doesn't have write permissions for %s" %
+                    ', '.join(names), series=names)
+        time_precision = time_precision or self.client.time_precision
+        if time_precision:
+            timestamps.validate_time_precision(time_precision)
+        data = timestamps.convert_series(
+            data, time_precision or timestamps.DEFAULT_PRECISION)
+        batches = [data]
+        if self.client.shard_partitioner is not None:
+            batches = self.client.shard_partitioner.partition(
+                self.name, data,
+                time_precision or timestamps.DEFAULT_PRECISION)
+        qs = {'time_precision': time_precision} if time_precision else None
+        yield [self.client.request('/db/%(database)s/series',
+                                   {'database': self.name}, qs=qs,
+                                   body=batch, method='POST')
+               for batch in batches if batch]
+        if denied is not None and \
+                self.client.write_precheck == permission_utils.SPLIT:
+            raise gen.Return(denied)
+
+    @asyncflux_coroutine
+    def query(self, query, time_precision=None, start=None, end=None,
+              splits=None, shard_duration=None, concurrency=4,
+              streaming_callback=None):
+        """Runs a query, optionally fanned out over ``splits`` time ranges.
+
+        When ``splits`` is given, ``query`` must not filter by time itself:
+        the ``[start, end)`` range is split (aligned to ``shard_duration``,
+        which may be a duration string or a :class:`ShardSpace`) and every
+        sub-range is queried with at most ``concurrency`` requests in
+        flight. Results are merged back in time order. With a
+        ``streaming_callback``, every merged chunk is passed to it in order
+        as soon as it is available and nothing is returned.
+
+        Split queries can't have a ``limit``, and aggregates must be
+        grouped by time: sub-range boundaries are then moved to multiples
+        of the interval, so every bucket is computed by a single request.
+        ValueError is raised otherwise.
+        """
+        qs = {'q': query}
+        time_precision = time_precision or self.client.time_precision
+        if time_precision:
+            qs['time_precision'] = timestamps.validate_time_precision(
+                time_precision)
+        path_params = {'database': self.name}
+        if not splits:
+            result = yield self.client.request('/db/%(database)s/series',
+                                               path_params, qs=qs)
+            if streaming_callback is not None:
+                streaming_callback(result)
+                result = None
+            raise gen.Return(result)
+
+        if start is None or end is None:
+            raise ValueError('You have to provide start and end to split a '
+                             'query')
+        query_utils.check_splittable(query)
+        shard_duration = getattr(shard_duration, 'shard_duration',
+                                 shard_duration)
+        ranges = query_utils.split_time_range(epoch_seconds(start),
+                                              epoch_seconds(end), splits,
+                                              shard_duration)
+        ranges = query_utils.align_time_ranges(
+            ranges, query_utils.group_interval(query))
+        if not query_utils.is_ascending(query):
+            ranges.reverse()
+
+        def make_task(time_range):
+            range_qs = dict(qs, q=query_utils.add_time_range(query,
+                                                             *time_range))
+            return lambda: self.client.request('/db/%(database)s/series',
+                                               path_params, qs=range_qs)
+
+        ready = {}
+        state = {'next': 0}
+
+        def on_result(index, result):
+            ready[index] = result
+            while state['next'] in ready:
+                chunk = ready.pop(state['next'])
+                state['next'] += 1
+                streaming_callback(query_utils.merge_series([chunk]))
+
+        results = yield gather_bounded(
+            [make_task(r) for r in ranges], concurrency,
+            on_result=on_result if streaming_callback else None)
+        if streaming_callback is None:
+            raise gen.Return(query_utils.merge_series(results))
+
+    @asyncflux_coroutine
+    def write_dataframe(self, dataframe, name, time_precision=None,
+                        chunk_size=None, concurrency=4):
+        """Writes a pandas DataFrame as the series ``name``.
+
+        Its datetime index, if any, is written as the ``time`` column, and
+        datetime columns as epoch timestamps in ``time_precision``. Frames
+        are written in chunks of ``chunk_size`` rows (by default
+        :attr:`BatchWriter.BATCH_SIZE <asyncflux.batch.BatchWriter>`), with
+        at most ``concurrency`` requests in flight.
+        """
+        time_precision = time_precision or self.client.time_precision or \
+            timestamps.DEFAULT_PRECISION
+        columns, points = dataframe_utils.dataframe_to_points(
+            dataframe, time_precision)
+        chunk_size = chunk_size or batch.BatchWriter.BATCH_SIZE
+
+        def make_task(offset):
+            series = [{'name': name, 'columns': columns,
+                       'points': points[offset:offset + chunk_size]}]
+            return lambda: self.write_points(series,
+                                             time_precision=time_precision)
+
+        yield gather_bounded([make_task(offset) for offset in
+                              range(0, len(points), chunk_size)],
+                             concurrency)
+
+    @asyncflux_coroutine
+    def query_dataframe(self, query, time_precision=None, **kwargs):
+        """Runs a query (see :meth:`query`) and returns a dict of pandas
+        DataFrames by series name, indexed by time."""
+        time_precision = time_precision or self.client.time_precision or \
+            timestamps.DEFAULT_PRECISION
+        result = yield self.query(query, time_precision=time_precision,
+                                  **kwargs)
+        raise gen.Return(dict(
+            (series['name'],
+             dataframe_utils.series_to_dataframe(series, time_precision))
+            for series in result or ()))
 
     def __repr__(self):
         return "Database(%r, %r)" % (self.client, self.name)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Conversion between pandas DataFrames and series"""
+from asyncflux import timestamps
+
+_PANDAS_UNITS = {'s': 's', 'ms': 'ms', 'u': 'us'}
+_DATETIME_TYPES = ('datetime64', 'datetime')
+
+
+def _pandas():
+    try:
+        import pandas
+    except ImportError:
+        raise ImportError('pandas is required to work with DataFrames')
+    return pandas
+
+
+def _is_datetime_index(index):
+    return getattr(index, 'inferred_type', None) in _DATETIME_TYPES
+
+
+def _is_datetime_column(pandas, column):
+    return pandas.api.types.infer_dtype(column, skipna=True) in \
+        _DATETIME_TYPES
+
+
+def _to_epochs(pandas, values, time_precision):
+    # Naive datetimes are taken as UTC, and missing ones become None
+    index = pandas.DatetimeIndex(pandas.to_datetime(values, utc=True))
+    epochs = timestamps.to_epoch_array(index, time_precision)
+    return [None if missing else epoch
+            for epoch, missing in zip(epochs, index.isnull())]
+
+
+def dataframe_to_points(dataframe,
+                        time_precision=timestamps.DEFAULT_PRECISION):
+    """Returns the columns and points of a DataFrame.
+
+    A datetime index becomes the ``time`` column, so the frame can't have
+    a ``time`` column too; datetime columns are written as epoch
+    timestamps in ``time_precision``. The conversion is done column-wise:
+    the timestamps in one vectorised pass and the values with a single
+    :meth:`~numpy.ndarray.tolist`; missing values become None.
+    """
+    pandas = _pandas()
+    columns = [str(column) for column in dataframe.columns]
+    time_index = _is_datetime_index(dataframe.index)
+    if time_index and 'time' in columns:
+        raise ValueError('A DataFrame with a datetime index can not have a '
+                         'time column')
+    frame = dataframe.astype(object).where(pandas.notnull(dataframe), None)
+    for position in range(len(columns)):
+        column = dataframe.iloc[:, position]
+        if _is_datetime_column(pandas, column):
+            frame.iloc[:, position] = pandas.Series(
+                _to_epochs(pandas, column, time_precision),
+                index=frame.index, dtype=object)
+    if time_index:
+        frame.insert(0, 'time', timestamps.to_epoch_array(frame.index,
+                                                          time_precision),
+                     allow_duplicates=True)
+        columns.insert(0, 'time')
+    return columns, frame.values.tolist()
+
+
+def series_to_dataframe(series, time_precision=timestamps.DEFAULT_PRECISION):
+    """Builds a DataFrame out of a ``{name, columns, points}`` series, with
+    its ``time`` column as a UTC datetime index."""
+    pandas = _pandas()
+    frame = pandas.DataFrame(series.get('points') or [],
+                             columns=series['columns'])
+    if 'time' in frame.columns:
+        frame.index = pandas.to_datetime(
+            frame.pop('time'), unit=_PANDAS_UNITS[time_precision], utc=True)
+        frame.index.name = 'time'
+    return frame
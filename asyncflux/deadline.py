@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Deadlines and cancellation of client calls
+
+Every coroutine decorated with :func:`asyncflux.util.asyncflux_coroutine`
+accepts ``timeout`` and ``cancellation`` keyword arguments. They are kept in
+the execution context, so nested calls (e.g. :meth:`Database.update_user`
+under :meth:`User.update`) share the deadline and the cancellation handle of
+the outermost call.
+
+The outermost call is also tracked as an :class:`Operation`, so a client
+being closed can tell the follow-up requests of the calls started before
+it apart from new ones.
+"""
+import itertools
+import time
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None  # pragma: no cover
+
+from tornado.concurrent import Future, future_add_done_callback
+
+from asyncflux.errors import RequestCancelled
+
+now = getattr(time, 'monotonic', time.time)
+
+if contextvars is not None:
+    _deadline = contextvars.ContextVar('asyncflux_deadline', default=None)
+    _cancellation = contextvars.ContextVar('asyncflux_cancellation',
+                                           default=None)
+    _operation = contextvars.ContextVar('asyncflux_operation', default=None)
+
+_sequence = itertools.count(1)
+
+
+def current_deadline():
+    """Returns the absolute deadline of the running call, if any."""
+    if contextvars is None:
+        return None  # pragma: no cover
+    return _deadline.get()
+
+
+def current_cancellation():
+    """Returns the cancellation handle of the running call, if any."""
+    if contextvars is None:
+        return None  # pragma: no cover
+    return _cancellation.get()
+
+
+def current_operation():
+    """Returns the :class:`Operation` of the running call, if any."""
+    if contextvars is None:
+        return None  # pragma: no cover
+    return _operation.get()
+
+
+def next_sequence():
+    """Returns a number greater than the sequence of every operation
+    started so far, and lower than the ones of those to come."""
+    return next(_sequence)
+
+
+def remaining():
+    """Returns the seconds left before the current deadline, if any."""
+    deadline = current_deadline()
+    if deadline is None:
+        return None
+    return deadline - now()
+
+
+def run_in_scope(function, args, kwargs, timeout=None, cancellation=None):
+    """Runs ``function`` with a narrower deadline and/or a cancellation."""
+    if contextvars is None:
+        return function(*args, **kwargs)  # pragma: no cover
+
+    def enter():
+        if timeout is not None:
+            deadline = now() + timeout
+            parent = _deadline.get()
+            if parent is not None:
+                deadline = min(deadline, parent)
+            _deadline.set(deadline)
+        if cancellation is not None:
+            parent = _cancellation.get()
+            if parent is not None and parent is not cancellation:
+                parent.add_callback(cancellation.cancel)
+            _cancellation.set(cancellation)
+        return function(*args, **kwargs)
+
+    return contextvars.copy_context().run(enter)
+
+
+def start_operation(function, *args):
+    """Calls ``function(*args)``, which returns a future, as a new
+    :class:`Operation` unless it is nested in one."""
+    if contextvars is None or _operation.get() is not None:
+        return function(*args)
+    operation = Operation()
+    # Coroutines copy the context when they are called, so the operation
+    # is seen by the call and everything it runs
+    token = _operation.set(operation)
+    try:
+        future = function(*args)
+    finally:
+        _operation.reset(token)
+    future_add_done_callback(future, operation.finish)
+    return future
+
+
+class Operation(object):
+    """An outermost client call, numbered in the order calls start."""
+
+    __slots__ = ('sequence', 'done', '__callbacks')
+
+    def __init__(self):
+        self.sequence = next_sequence()
+        self.done = False
+        self.__callbacks = []
+
+    def add_done_callback(self, callback):
+        if self.done:
+            callback(self)
+        else:
+            self.__callbacks.append(callback)
+
+    def finish(self, *_):
+        self.done = True
+        callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class Cancellation(object):
+    """A handle to cancel running client calls.
+
+    Cancelling fails the calls with
+    :class:`~asyncflux.errors.RequestCancelled` right away. With the
+    default ``simple_httpclient``, the underlying HTTP requests are
+    aborted, closing their connections, as soon as they receive any bytes
+    (other HTTP clients receive the rest of the response and drop it).
+    Tornado can't abort a request that is still waiting for the response,
+    which keeps its connection until the server answers or the request
+    times out, so give hung servers a ``request_timeout`` or a
+    ``timeout``.
+    """
+
+    def __init__(self):
+        self.__cancelled = False
+        self.__callbacks = []
+
+    @property
+    def cancelled(self):
+        return self.__cancelled
+
+    def cancel(self):
+        if self.__cancelled:
+            return
+        self.__cancelled = True
+        callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        if self.__cancelled:
+            callback()
+        else:
+            self.__callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        try:
+            self.__callbacks.remove(callback)
+        except ValueError:
+            pass
+
+    def check(self, *_):
+        if self.__cancelled:
+            raise RequestCancelled()
+
+    def wrap(self, future):
+        """Returns a future that fails as soon as this handle is cancelled."""
+        wrapper = Future()
+
+        def on_cancel():
+            if not wrapper.done():
+                wrapper.set_exception(RequestCancelled())
+
+        def on_done(f):
+            self.remove_callback(on_cancel)
+            if wrapper.done():
+                f.exception()  # Already cancelled, silence the error
+            elif f.exception() is not None:
+                wrapper.set_exception(f.exception())
+            else:
+                wrapper.set_result(f.result())
+
+        self.add_callback(on_cancel)
+        future.add_done_callback(on_done)
+        return wrapper
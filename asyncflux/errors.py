@@ -3,7 +3,41 @@
 
 class AsyncfluxError(Exception):
 
-    def __init__(self, http_response):
+    def __init__(self, http_response=None, message=None):
         self.response = http_response
-        self.message = http_response.body
+        if message is None:
+            message = http_response.body
+        self.message = message
         super(AsyncfluxError, self).__init__(self.message)
+
+
+class DeadlineExceeded(AsyncfluxError):
+
+    def __init__(self, message='Deadline exceeded', http_response=None):
+        super(DeadlineExceeded, self).__init__(http_response, message)
+
+
+class RequestCancelled(AsyncfluxError):
+
+    def __init__(self, message='Request cancelled', http_response=None):
+        super(RequestCancelled, self).__init__(http_response, message)
+
+
+class CircuitOpenError(AsyncfluxError):
+
+    def __init__(self, message='Circuit open', http_response=None):
+        super(CircuitOpenError, self).__init__(http_response, message)
+
+
+class PermissionDenied(AsyncfluxError):
+
+    def __init__(self, message='Permission denied', http_response=None,
+                 series=None):
+        self.series = list(series or ())
+        super(PermissionDenied, self).__init__(http_response, message)
+
+
+class ClientClosed(AsyncfluxError):
+
+    def __init__(self, message='Client closed', http_response=None):
+        super(ClientClosed, self).__init__(http_response, message)
@@ -0,0 +1,635 @@
+# -*- coding: utf-8 -*-
+"""In-memory stand-in for the InfluxDB 0.8 HTTP API
+
+:class:`FakeInfluxDB` serves databases, users, cluster admins, shard spaces,
+series writes and simple ``select`` queries from memory, over real sockets.
+Latency, write throughput caps and faults (connection resets, server errors
+and slow bodies) can be configured to exercise clients under load::
+
+    server = FakeInfluxDB(latency=0.005, max_points_per_second=50000)
+    port = server.start()
+    client = AsyncfluxClient('127.0.0.1', port)
+
+It can also be run standalone with ``python -m asyncflux.fakeserver``.
+"""
+import base64
+import json
+import random
+import re
+import time
+
+from tornado import gen, httpserver, ioloop, iostream, netutil, web
+
+PRECISION_FACTORS = {'s': 1000000, 'ms': 1000, 'u': 1}
+_DURATION_FACTORS = {'u': 1, 'ms': 1000, 's': 1000000, 'm': 60000000,
+                     'h': 3600000000, 'd': 86400000000, 'w': 604800000000}
+
+_SELECT_RE = re.compile(
+    r'^\s*select\s+(?P<columns>.+?)\s+from\s+(?P<series>/.+?/|"[^"]+"|\S+)'
+    r'(?:\s+where\s+(?P<where>.+?))?'
+    r'(?:\s+(?P<order_limit>(?:order|limit)\s.*))?\s*;?\s*$', re.I)
+_CONDITION_RE = re.compile(
+    r'^\s*\(?\s*(?P<column>\w+)\s*(?P<operator>=|!=|<>|>=|<=|>|<)\s*'
+    r'(?P<value>\'[^\']*\'|now\(\)(?:\s*-\s*\d+[a-z]+)?|-?[\d.]+[a-z]*)'
+    r'\s*\)?\s*$', re.I)
+_ORDER_RE = re.compile(r'order\s+(asc|desc)', re.I)
+_LIMIT_RE = re.compile(r'limit\s+(\d+)', re.I)
+_AND_RE = re.compile(r'\s+and\s+', re.I)
+_OPERATORS = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<>': lambda a, b: a != b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+}
+
+
+class QueryError(Exception):
+    pass
+
+
+def _now_us():
+    return int(time.time() * 1000000)
+
+
+def _parse_time(value):
+    value = value.strip().lower()
+    if value.startswith('now()'):
+        offset = value[5:].replace(' ', '').lstrip('-')
+        return _now_us() - (_parse_time(offset) if offset else 0)
+    match = re.match(r'^(-?\d+)(u|ms|s|m|h|d|w)?$', value)
+    if not match:
+        raise QueryError('Invalid time: %s' % value)
+    number, unit = match.groups()
+    return int(number) * _DURATION_FACTORS[unit or 'u']
+
+
+def _parse_value(value):
+    if value.startswith("'"):
+        return value[1:-1]
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+class Database(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.users = {}
+        self.series = {}
+        self.sequence = 0
+
+    def write(self, series, time_precision):
+        factor = PRECISION_FACTORS[time_precision]
+        written = 0
+        for s in series:
+            columns = s['columns']
+            stored = self.series.setdefault(s['name'], [])
+            for point in s['points']:
+                values = dict(zip(columns, point))
+                timestamp = values.pop('time', None)
+                timestamp = _now_us() if timestamp is None else \
+                    int(timestamp * factor)
+                self.sequence += 1
+                sequence = values.pop('sequence_number', self.sequence)
+                stored.append((timestamp, sequence, values))
+                written += 1
+        return written
+
+    def query(self, query, time_precision):
+        match = _SELECT_RE.match(query)
+        if not match:
+            raise QueryError('Unsupported query: %s' % query)
+        columns = [c.strip() for c in match.group('columns').split(',')]
+        if any('(' in c for c in columns):
+            raise QueryError('Aggregates are not supported')
+        series_name = match.group('series')
+        if series_name.startswith('/'):
+            regex = re.compile(series_name[1:-1])
+            names = sorted(n for n in self.series if regex.search(n))
+        else:
+            names = [series_name.strip('"')]
+        filters = []
+        if match.group('where'):
+            for condition in _AND_RE.split(match.group('where')):
+                parsed = _CONDITION_RE.match(condition)
+                if not parsed:
+                    raise QueryError('Unsupported condition: %s' % condition)
+                column, operator, value = parsed.groups()
+                if column.lower() == 'time':
+                    value = _parse_time(value)
+                else:
+                    value = _parse_value(value)
+                filters.append((column.lower() if column.lower() == 'time'
+                                else column, _OPERATORS[operator], value))
+        order_limit = match.group('order_limit') or ''
+        order = _ORDER_RE.search(order_limit)
+        ascending = bool(order and order.group(1).lower() == 'asc')
+        limit = _LIMIT_RE.search(order_limit)
+        limit = int(limit.group(1)) if limit else None
+
+        factor = PRECISION_FACTORS[time_precision]
+        results = []
+        for name in names:
+            points = self.series.get(name)
+            if not points:
+                continue
+            if columns == ['*']:
+                names_seen = []
+                for _, _, values in points:
+                    for column in values:
+                        if column not in names_seen:
+                            names_seen.append(column)
+                selected = names_seen
+            else:
+                selected = columns
+            rows = []
+            for timestamp, sequence, values in sorted(
+                    points, key=lambda p: (p[0], p[1]),
+                    reverse=not ascending):
+                row = dict(values, time=timestamp)
+                if all(op(row.get(column), value)
+                       for column, op, value in filters):
+                    rows.append([timestamp // factor, sequence] +
+                                [values.get(c) for c in selected])
+                    if limit is not None and len(rows) >= limit:
+                        break
+            if rows:
+                results.append({'name': name,
+                                'columns': ['time', 'sequence_number'] +
+                                selected,
+                                'points': rows})
+        return results
+
+
+class FakeInfluxDB(object):
+    """In-memory InfluxDB 0.8 server.
+
+    :param latency: seconds added before every response.
+    :param max_points_per_second: write throughput cap; writes over it are
+      delayed until the cap allows them.
+    :param error_rate: probability of answering with a 500 error.
+    :param reset_rate: probability of closing the connection without
+      answering.
+    :param slow_body_delay: seconds between response body chunks.
+    :param ssl_options: server :class:`~ssl.SSLContext` to serve HTTPS.
+    """
+
+    CHUNK_SIZE = 4096
+
+    def __init__(self, latency=0, max_points_per_second=None, error_rate=0,
+                 reset_rate=0, slow_body_delay=0, seed=None,
+                 username='root', password='root', ssl_options=None):
+        self.latency = latency
+        self.max_points_per_second = max_points_per_second
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.slow_body_delay = slow_body_delay
+        self.ssl_options = ssl_options
+        self.random = random.Random(seed)
+        self.databases = {}
+        self.cluster_admins = {username: password}
+        self.shard_spaces = []
+        self.faults = []
+        self.requests = 0
+        self.points_written = 0
+        self.__write_budget_at = 0.0
+        self.__server = None
+        self.port = None
+
+    def inject_fault(self, kind, count=1, path=None):
+        """Queues ``count`` faults for the next requests matching ``path``.
+
+        ``kind`` is one of ``'reset'``, ``'error'`` or ``'slow_body'``.
+        """
+        if kind not in ('reset', 'error', 'slow_body'):
+            raise ValueError('Invalid fault: %s' % kind)
+        self.faults.extend([(kind, path)] * count)
+
+    def take_fault(self, path):
+        for index, (kind, fault_path) in enumerate(self.faults):
+            if fault_path is None or re.search(fault_path, path):
+                del self.faults[index]
+                return kind
+        roll = self.random.random()
+        if roll < self.reset_rate:
+            return 'reset'
+        if roll < self.reset_rate + self.error_rate:
+            return 'error'
+        if self.slow_body_delay:
+            return 'slow_body'
+        return None
+
+    def write_delay(self, points):
+        """Returns how long a write must wait to respect the throughput cap."""
+        if not self.max_points_per_second:
+            return 0
+        now = time.time()
+        start = max(now, self.__write_budget_at)
+        self.__write_budget_at = start + \
+            float(points) / self.max_points_per_second
+        return start - now
+
+    def make_application(self):
+        kwargs = {'server': self}
+        return web.Application([
+            (r'/ping', PingHandler, kwargs),
+            (r'/db', DatabasesHandler, kwargs),
+            (r'/db/([^/]+)', DatabaseHandler, kwargs),
+            (r'/db/([^/]+)/authenticate', AuthenticateUserHandler, kwargs),
+            (r'/db/([^/]+)/users', UsersHandler, kwargs),
+            (r'/db/([^/]+)/users/([^/]+)', UserHandler, kwargs),
+            (r'/db/([^/]+)/series', SeriesHandler, kwargs),
+            (r'/cluster_admins', ClusterAdminsHandler, kwargs),
+            (r'/cluster_admins/authenticate', AuthenticateAdminHandler,
+             kwargs),
+            (r'/cluster_admins/([^/]+)', ClusterAdminHandler, kwargs),
+            (r'/cluster/shard_spaces', ShardSpacesHandler, kwargs),
+            (r'/cluster/shard_spaces/([^/]+)', ShardSpacesHandler, kwargs),
+            (r'/cluster/shard_spaces/([^/]+)/([^/]+)', ShardSpaceHandler,
+             kwargs),
+        ])
+
+    def start(self, port=0, address='127.0.0.1'):
+        """Starts listening and returns the bound port."""
+        sockets = netutil.bind_sockets(port, address)
+        self.port = sockets[0].getsockname()[1]
+        self.__server = httpserver.HTTPServer(self.make_application(),
+                                              ssl_options=self.ssl_options)
+        self.__server.add_sockets(sockets)
+        return self.port
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.stop()
+            self.__server = None
+
+    @property
+    def url(self):
+        scheme = 'https' if self.ssl_options is not None else 'http'
+        return '%s://127.0.0.1:%s' % (scheme, self.port)
+
+
+class BaseHandler(web.RequestHandler):
+
+    def initialize(self, server):
+        self.server = server
+
+    def credentials(self):
+        header = self.request.headers.get('Authorization', '')
+        if header.startswith('Basic '):
+            decoded = base64.b64decode(header[6:]).decode('utf-8')
+            return tuple(decoded.split(':', 1))
+        return (self.get_argument('u', None), self.get_argument('p', None))
+
+    def is_cluster_admin(self):
+        username, password = self.credentials()
+        return username is not None and \
+            self.server.cluster_admins.get(username) == password
+
+    def database_user(self, name):
+        username, password = self.credentials()
+        db = self.server.databases.get(name)
+        if db is None:
+            return None
+        user = db.users.get(username)
+        if user is not None and user['password'] == password:
+            return user
+        return None
+
+    def require_cluster_admin(self):
+        if not self.is_cluster_admin():
+            raise web.HTTPError(401, reason='Invalid username/password')
+
+    def get_database(self, name):
+        db = self.server.databases.get(name)
+        if db is None:
+            raise web.HTTPError(400, reason="Database %s doesn't exist" %
+                                name)
+        return db
+
+    def json_body(self):
+        try:
+            return json.loads(self.request.body.decode('utf-8'))
+        except ValueError:
+            raise web.HTTPError(400, reason='Invalid JSON')
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header('Content-Type', 'text/plain')
+        self.finish(self._reason)
+
+    @gen.coroutine
+    def prepare(self):
+        self.server.requests += 1
+        if self.server.latency:
+            yield gen.sleep(self.server.latency)
+        fault = self.server.take_fault(self.request.path)
+        self.slow_body = fault == 'slow_body'
+        if fault == 'reset':
+            self.detach().close()
+        elif fault == 'error':
+            raise web.HTTPError(500, reason='Injected error')
+
+    @gen.coroutine
+    def respond(self, body=None, status=200):
+        self.set_status(status)
+        if body is None:
+            self.finish()
+            return
+        self.set_header('Content-Type', 'application/json')
+        data = json.dumps(body).encode('utf-8')
+        if not self.slow_body:
+            self.finish(data)
+            return
+        try:
+            for i in range(0, len(data), self.server.CHUNK_SIZE):
+                self.write(data[i:i + self.server.CHUNK_SIZE])
+                yield self.flush()
+                yield gen.sleep(self.server.slow_body_delay)
+        except iostream.StreamClosedError:
+            # The client went away, e.g. it cancelled the request
+            return
+        self.finish()
+
+
+class PingHandler(BaseHandler):
+
+    @gen.coroutine
+    def get(self):
+        yield self.respond({'status': 'ok'})
+
+
+class DatabasesHandler(BaseHandler):
+
+    @gen.coroutine
+    def get(self):
+        self.require_cluster_admin()
+        yield self.respond([{'name': name}
+                            for name in sorted(self.server.databases)])
+
+    @gen.coroutine
+    def post(self):
+        self.require_cluster_admin()
+        name = self.json_body().get('name')
+        if name in self.server.databases:
+            raise web.HTTPError(409, reason='database %s exists' % name)
+        self.server.databases[name] = Database(name)
+        yield self.respond(status=201)
+
+
+class DatabaseHandler(BaseHandler):
+
+    @gen.coroutine
+    def delete(self, name):
+        self.require_cluster_admin()
+        self.get_database(name)
+        del self.server.databases[name]
+        self.server.shard_spaces = [s for s in self.server.shard_spaces
+                                    if s['database'] != name]
+        yield self.respond(status=204)
+
+
+class AuthenticateUserHandler(BaseHandler):
+
+    @gen.coroutine
+    def get(self, name):
+        if self.database_user(name) is None:
+            raise web.HTTPError(401, reason='Invalid username/password')
+        yield self.respond()
+
+
+def _public_user(user):
+    return dict((k, v) for k, v in user.items() if k != 'password')
+
+
+class UsersHandler(BaseHandler):
+
+    def require_admin(self, name):
+        user = self.database_user(name)
+        if not self.is_cluster_admin() and not (user and user['isAdmin']):
+            raise web.HTTPError(401, reason='Insufficient permissions')
+
+    @gen.coroutine
+    def get(self, name):
+        db = self.get_database(name)
+        self.require_admin(name)
+        yield self.respond([_public_user(u) for _, u in
+                            sorted(db.users.items())])
+
+    @gen.coroutine
+    def post(self, name):
+        db = self.get_database(name)
+        self.require_admin(name)
+        body = self.json_body()
+        username = body.get('name')
+        if username in db.users:
+            raise web.HTTPError(400, reason='User %s already exists' %
+                                username)
+        db.users[username] = {'name': username,
+                              'password': body.get('password'),
+                              'isAdmin': bool(body.get('isAdmin')),
+                              'readFrom': body.get('readFrom', '.*'),
+                              'writeTo': body.get('writeTo', '.*')}
+        yield self.respond()
+
+
+class UserHandler(UsersHandler):
+
+    def get_user(self, db, username):
+        user = db.users.get(username)
+        if user is None:
+            raise web.HTTPError(400, reason="Invalid user name %s" %
+                                username)
+        return user
+
+    @gen.coroutine
+    def get(self, name, username):
+        db = self.get_database(name)
+        current = self.database_user(name)
+        if not current or current['name'] != username:
+            self.require_admin(name)
+        yield self.respond(_public_user(self.get_user(db, username)))
+
+    @gen.coroutine
+    def post(self, name, username):
+        db = self.get_database(name)
+        current = self.database_user(name)
+        body = self.json_body()
+        if not current or current['name'] != username or \
+                set(body) - set(['password']):
+            self.require_admin(name)
+        user = self.get_user(db, username)
+        for key in ('password', 'isAdmin', 'readFrom', 'writeTo'):
+            if key in body:
+                user[key] = body[key]
+        yield self.respond()
+
+    @gen.coroutine
+    def delete(self, name, username):
+        db = self.get_database(name)
+        self.require_admin(name)
+        self.get_user(db, username)
+        del db.users[username]
+        yield self.respond(status=204)
+
+
+class SeriesHandler(BaseHandler):
+
+    def authorize(self, name, permission):
+        if self.is_cluster_admin():
+            return None
+        user = self.database_user(name)
+        if user is None:
+            raise web.HTTPError(401, reason='Invalid username/password')
+        return re.compile(user[permission])
+
+    def time_precision(self):
+        precision = self.get_argument('time_precision', 'ms')
+        if precision not in PRECISION_FACTORS:
+            raise web.HTTPError(400, reason='Invalid time precision')
+        return precision
+
+    @gen.coroutine
+    def get(self, name):
+        db = self.get_database(name)
+        regex = self.authorize(name, 'readFrom')
+        try:
+            results = db.query(self.get_argument('q'),
+                               self.time_precision())
+        except QueryError as e:
+            raise web.HTTPError(400, reason=str(e))
+        if regex is not None:
+            results = [r for r in results if regex.search(r['name'])]
+        yield self.respond(results)
+
+    @gen.coroutine
+    def post(self, name):
+        db = self.get_database(name)
+        regex = self.authorize(name, 'writeTo')
+        series = self.json_body()
+        if regex is not None:
+            for s in series:
+                if not regex.search(s['name']):
+                    raise web.HTTPError(
+                        401, reason="User doesn't have write permissions "
+                        "for %s" % s['name'])
+        points = sum(len(s['points']) for s in series)
+        delay = self.server.write_delay(points)
+        if delay > 0:
+            yield gen.sleep(delay)
+        self.server.points_written += db.write(series,
+                                               self.time_precision())
+        yield self.respond()
+
+
+class ClusterAdminsHandler(BaseHandler):
+
+    @gen.coroutine
+    def get(self):
+        self.require_cluster_admin()
+        yield self.respond([{'name': name} for name in
+                            sorted(self.server.cluster_admins)])
+
+    @gen.coroutine
+    def post(self):
+        self.require_cluster_admin()
+        body = self.json_body()
+        self.server.cluster_admins[body['name']] = body['password']
+        yield self.respond()
+
+
+class AuthenticateAdminHandler(BaseHandler):
+
+    @gen.coroutine
+    def get(self):
+        self.require_cluster_admin()
+        yield self.respond()
+
+
+class ClusterAdminHandler(BaseHandler):
+
+    def get_admin(self, username):
+        if username not in self.server.cluster_admins:
+            raise web.HTTPError(400, reason='Invalid user name %s' %
+                                username)
+
+    @gen.coroutine
+    def post(self, username):
+        self.require_cluster_admin()
+        self.get_admin(username)
+        self.server.cluster_admins[username] = self.json_body()['password']
+        yield self.respond()
+
+    @gen.coroutine
+    def delete(self, username):
+        self.require_cluster_admin()
+        self.get_admin(username)
+        del self.server.cluster_admins[username]
+        yield self.respond(status=204)
+
+
+class ShardSpacesHandler(BaseHandler):
+
+    @gen.coroutine
+    def get(self, name=None):
+        self.require_cluster_admin()
+        yield self.respond(self.server.shard_spaces)
+
+    @gen.coroutine
+    def post(self, name=None):
+        self.require_cluster_admin()
+        self.get_database(name)
+        body = self.json_body()
+        space = {'name': body['name'], 'database': name,
+                 'regex': body.get('regex', '/.*/'),
+                 'retentionPolicy': body.get('retentionPolicy', 'inf'),
+                 'shardDuration': body.get('shardDuration', '7d'),
+                 'replicationFactor': body.get('replicationFactor', 1),
+                 'split': body.get('split', 1)}
+        self.server.shard_spaces = [
+            s for s in self.server.shard_spaces
+            if (s['database'], s['name']) != (name, space['name'])]
+        self.server.shard_spaces.append(space)
+        yield self.respond()
+
+
+class ShardSpaceHandler(BaseHandler):
+
+    @gen.coroutine
+    def delete(self, name, space_name):
+        self.require_cluster_admin()
+        spaces = [s for s in self.server.shard_spaces
+                  if (s['database'], s['name']) != (name, space_name)]
+        if len(spaces) == len(self.server.shard_spaces):
+            raise web.HTTPError(400, reason="Shard space %s doesn't exist" %
+                                space_name)
+        self.server.shard_spaces = spaces
+        yield self.respond(status=204)
+
+
+def main():
+    from optparse import OptionParser
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('--port', type='int', default=8086)
+    parser.add_option('--address', default='127.0.0.1')
+    parser.add_option('--latency', type='float', default=0)
+    parser.add_option('--max-points-per-second', type='int', default=None)
+    parser.add_option('--error-rate', type='float', default=0)
+    parser.add_option('--reset-rate', type='float', default=0)
+    parser.add_option('--slow-body-delay', type='float', default=0)
+    options, _ = parser.parse_args()
+    server = FakeInfluxDB(latency=options.latency,
+                          max_points_per_second=options.max_points_per_second,
+                          error_rate=options.error_rate,
+                          reset_rate=options.reset_rate,
+                          slow_body_delay=options.slow_body_delay)
+    server.start(options.port, options.address)
+    ioloop.IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Prioritised request lanes"""
+import collections
+import re
+
+from tornado import ioloop
+from tornado.concurrent import Future
+
+from asyncflux.deadline import now
+from asyncflux.errors import DeadlineExceeded
+
+CONTROL = 'control'
+QUERY = 'query'
+WRITE = 'write'
+# Requests sent outside of every lane budget, like warm-up probes
+BYPASS = 'bypass'
+
+_SERIES_RE = re.compile(r'^/db/[^/]+/series$')
+
+
+def classify(method, path):
+    """Returns the default lane for a request given its route template."""
+    if _SERIES_RE.match(path):
+        return QUERY if method == 'GET' else WRITE
+    return CONTROL
+
+
+class Lane(object):
+
+    def __init__(self, name, weight, max_in_flight):
+        self.name = name
+        self.weight = float(weight)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.waiters = collections.deque()
+        self.virtual_time = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def statistics(self):
+        return {'weight': self.weight, 'max_in_flight': self.max_in_flight,
+                'in_flight': self.in_flight, 'waiting': len(self.waiters),
+                'admitted': self.admitted, 'queued': self.queued,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time}
+
+
+class LaneScheduler(object):
+    """Admits requests into lanes with their own connection budgets.
+
+    Every lane may have up to ``max_in_flight`` requests running, and the
+    lanes together up to the scheduler ``max_in_flight`` (which should not
+    exceed the ``max_clients`` of the HTTP client, so requests never queue
+    inside it). Whenever a slot is freed, the waiting lanes share it in
+    proportion to their weights (stride scheduling).
+    """
+
+    MAX_IN_FLIGHT = 10
+    LANES = ((CONTROL, 10, 2), (QUERY, 5, 5), (WRITE, 1, 6))
+
+    def __init__(self, lanes=None, max_in_flight=None, io_loop=None):
+        self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+        self.io_loop = io_loop or ioloop.IOLoop.current()
+        self.lanes = collections.OrderedDict(
+            (name, Lane(name, weight, budget))
+            for name, weight, budget in (lanes or self.LANES))
+        self.in_flight = 0
+
+    def __eligible(self, lane):
+        return lane.in_flight < lane.max_in_flight and \
+            self.in_flight < self.max_in_flight
+
+    def __admit(self, lane, future, queued_at=None):
+        lane.in_flight += 1
+        lane.admitted += 1
+        lane.virtual_time += 1 / lane.weight
+        self.in_flight += 1
+        if queued_at is not None:
+            waited = now() - queued_at
+            lane.wait_time += waited
+            lane.max_wait_time = max(lane.max_wait_time, waited)
+        future.set_result(lane.name)
+
+    def __dispatch(self):
+        while self.in_flight < self.max_in_flight:
+            candidates = [lane for lane in self.lanes.values()
+                          if lane.waiters and self.__eligible(lane)]
+            if not candidates:
+                return
+            lane = min(candidates, key=lambda l: l.virtual_time)
+            future, queued_at, timeout_handle = lane.waiters.popleft()
+            if timeout_handle is not None:
+                self.io_loop.remove_timeout(timeout_handle)
+            self.__admit(lane, future, queued_at)
+
+    def __sync_virtual_time(self, lane):
+        # An idle lane must not bank credit while others are busy
+        busy = [l.virtual_time for l in self.lanes.values()
+                if l.waiters or l.in_flight]
+        if busy:
+            lane.virtual_time = max(lane.virtual_time, min(busy))
+
+    def acquire(self, name, timeout=None):
+        """Returns a future resolved once the request has a slot in ``name``.
+
+        The future fails with :class:`DeadlineExceeded` if no slot is
+        available within ``timeout`` seconds.
+        """
+        lane = self.lanes[name]
+        future = Future()
+        if not lane.waiters and self.__eligible(lane):
+            if not lane.in_flight:
+                self.__sync_virtual_time(lane)
+            self.__admit(lane, future)
+            return future
+        if not lane.waiters and not lane.in_flight:
+            self.__sync_virtual_time(lane)
+        lane.queued += 1
+        timeout_handle = None
+        if timeout is not None:
+            timeout_handle = self.io_loop.call_later(
+                max(timeout, 0), self.__expire, lane, future)
+        lane.waiters.append((future, now(), timeout_handle))
+        return future
+
+    def __remove_waiter(self, lane, future):
+        for waiter in lane.waiters:
+            if waiter[0] is future:
+                lane.waiters.remove(waiter)
+                if waiter[2] is not None:
+                    self.io_loop.remove_timeout(waiter[2])
+                return True
+        return False
+
+    def __expire(self, lane, future):
+        if self.__remove_waiter(lane, future):
+            future.set_exception(DeadlineExceeded(
+                'Deadline exceeded waiting in the %s lane' % lane.name))
+
+    def abandon(self, name, future):
+        """Gives up a slot requested with :meth:`acquire`."""
+        lane = self.lanes[name]
+        if future.done():
+            if future.exception() is None:
+                self.release(name)
+        else:
+            self.__remove_waiter(lane, future)
+
+    def release(self, name):
+        lane = self.lanes[name]
+        lane.in_flight -= 1
+        self.in_flight -= 1
+        self.__dispatch()
+
+    def statistics(self):
+        return dict((name, lane.statistics())
+                    for name, lane in self.lanes.items())
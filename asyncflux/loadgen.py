@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Synthetic write and query load generator
+
+Drives a configurable workload through :class:`AsyncfluxClient` and reports
+throughput, latency percentiles and the CPU and memory used by the client::
+
+    $ python -m asyncflux.loadgen --url http://localhost:8086 \\
+        --database loadgen --series 100 --rate 50000 --batch-size 500 \\
+        --query-ratio 0.1 --concurrency 8 --duration 30
+
+Use ``--fake-server`` to run against an in-process
+:class:`~asyncflux.fakeserver.FakeInfluxDB` instead of a real server.
+Latencies are measured from the time every operation was scheduled, so a
+saturated client shows up as latency rather than as a lower rate.
+"""
+import json
+import random
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # pragma: no cover
+
+from tornado import gen, ioloop
+
+from asyncflux.client import AsyncfluxClient
+
+
+def percentile(values, q):
+    """Returns the ``q`` percentile (0-100) of ``values``, or None."""
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(round(q / 100.0 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def _summary(latencies):
+    summary = {'count': len(latencies)}
+    for q in (50, 90, 99):
+        summary['p%d' % q] = percentile(latencies, q)
+    summary['max'] = max(latencies) if latencies else None
+    return summary
+
+
+def _usage():
+    if resource is None:
+        return time.process_time(), None  # pragma: no cover
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss * scale
+
+
+class LoadGenerator(object):
+    """Writes batches of random points at ``rate`` points per second.
+
+    ``query_ratio`` of the operations are queries over one of the series
+    instead of writes, and at most ``concurrency`` operations run at once.
+    """
+
+    def __init__(self, client, database, series=10, columns=3, rate=1000,
+                 batch_size=100, duration=10, concurrency=4, query_ratio=0,
+                 seed=None):
+        self.client = client
+        self.database = client[database]
+        self.series = ['loadgen.series.%d' % i for i in range(series)]
+        self.columns = ['value%d' % i for i in range(columns)]
+        self.rate = float(rate)
+        self.batch_size = batch_size
+        self.duration = duration
+        self.concurrency = concurrency
+        self.query_ratio = query_ratio
+        self.random = random.Random(seed)
+        self.write_latencies = []
+        self.query_latencies = []
+        self.errors = 0
+        self.points = 0
+        self.__started = None
+        self.__scheduled = 0
+
+    def make_batch(self):
+        name = self.random.choice(self.series)
+        points = [[self.random.random() for _ in self.columns]
+                  for _ in range(self.batch_size)]
+        return [{'name': name, 'columns': self.columns, 'points': points}]
+
+    @gen.coroutine
+    def __worker(self):
+        io_loop = self.client.io_loop
+        interval = self.batch_size / self.rate
+        operations = int(round(self.duration / interval))
+        while self.__scheduled < operations:
+            scheduled = self.__started + self.__scheduled * interval
+            self.__scheduled += 1
+            delay = scheduled - io_loop.time()
+            if delay > 0:
+                yield gen.sleep(delay)
+            is_query = self.random.random() < self.query_ratio
+            try:
+                if is_query:
+                    yield self.database.query(
+                        'select * from "%s" limit %d' %
+                        (self.random.choice(self.series), self.batch_size))
+                else:
+                    yield self.database.write_points(self.make_batch())
+                    self.points += self.batch_size
+            except Exception:
+                self.errors += 1
+                continue
+            latency = io_loop.time() - scheduled
+            if is_query:
+                self.query_latencies.append(latency)
+            else:
+                self.write_latencies.append(latency)
+
+    @gen.coroutine
+    def run(self):
+        """Runs the workload and returns the report."""
+        io_loop = self.client.io_loop
+        cpu_start, _ = _usage()
+        started = io_loop.time()
+        self.__started = started
+        self.__scheduled = 0
+        yield [self.__worker() for _ in range(self.concurrency)]
+        elapsed = io_loop.time() - started
+        cpu_end, max_rss = _usage()
+        raise gen.Return({
+            'elapsed': elapsed,
+            'points': self.points,
+            'points_per_second': self.points / elapsed if elapsed else 0,
+            'writes': _summary(self.write_latencies),
+            'queries': _summary(self.query_latencies),
+            'errors': self.errors,
+            'cpu_seconds': cpu_end - cpu_start,
+            'cpu_utilization': (cpu_end - cpu_start) / elapsed
+            if elapsed else 0,
+            'max_rss_bytes': max_rss,
+        })
+
+
+def format_report(report):
+    def ms(value):
+        return '-' if value is None else '%.2fms' % (value * 1000)
+
+    lines = ['elapsed: %.2fs' % report['elapsed'],
+             'points written: %d (%.1f points/s)' % (
+                 report['points'], report['points_per_second']),
+             'errors: %d' % report['errors']]
+    for kind in ('writes', 'queries'):
+        summary = report[kind]
+        lines.append('%s: %d, p50 %s, p90 %s, p99 %s, max %s' % (
+            kind, summary['count'], ms(summary['p50']), ms(summary['p90']),
+            ms(summary['p99']), ms(summary['max'])))
+    lines.append('client cpu: %.2fs (%.0f%%)' % (
+        report['cpu_seconds'], report['cpu_utilization'] * 100))
+    if report['max_rss_bytes'] is not None:
+        lines.append('client max rss: %.1fMiB' % (
+            report['max_rss_bytes'] / 1048576.0))
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    from optparse import OptionParser
+    parser = OptionParser(usage='python -m asyncflux.loadgen [options]')
+    parser.add_option('--url', default='http://localhost:8086')
+    parser.add_option('--database', default='loadgen')
+    parser.add_option('--create-database', action='store_true',
+                      default=False)
+    parser.add_option('--series', type='int', default=10)
+    parser.add_option('--columns', type='int', default=3)
+    parser.add_option('--rate', type='float', default=1000,
+                      help='points per second')
+    parser.add_option('--batch-size', type='int', default=100)
+    parser.add_option('--duration', type='float', default=10)
+    parser.add_option('--concurrency', type='int', default=4)
+    parser.add_option('--query-ratio', type='float', default=0)
+    parser.add_option('--seed', type='int', default=None)
+    parser.add_option('--fake-server', action='store_true', default=False,
+                      help='run against an in-process fake server')
+    parser.add_option('--json', action='store_true', default=False,
+                      help='print the report as JSON')
+    options, _ = parser.parse_args(args)
+
+    io_loop = ioloop.IOLoop()
+    server = None
+    url = options.url
+    if options.fake_server:
+        from asyncflux.fakeserver import FakeInfluxDB
+        server = FakeInfluxDB()
+        url = 'http://127.0.0.1:%d' % server.start()
+        options.create_database = True
+    client = AsyncfluxClient(url, io_loop=io_loop)
+
+    @gen.coroutine
+    def run():
+        if options.create_database:
+            yield client.create_database(options.database)
+        generator = LoadGenerator(
+            client, options.database, series=options.series,
+            columns=options.columns, rate=options.rate,
+            batch_size=options.batch_size, duration=options.duration,
+            concurrency=options.concurrency,
+            query_ratio=options.query_ratio, seed=options.seed)
+        report = yield generator.run()
+        raise gen.Return(report)
+
+    try:
+        report = io_loop.run_sync(run)
+    finally:
+        if server is not None:
+            server.stop()
+        io_loop.close(all_fds=True)
+    if options.json:
+        sys.stdout.write(json.dumps(report, indent=2, sort_keys=True) + '\n')
+    else:
+        sys.stdout.write(format_report(report) + '\n')
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Event loop lag monitoring"""
+import bisect
+import collections
+import itertools
+
+from tornado import ioloop
+
+
+class LoopLagMonitor(object):
+    """Measures how late the IOLoop runs its callbacks.
+
+    A timeout is scheduled every ``interval`` seconds and the lag is the
+    time it ran past its deadline, so anything blocking the loop (callers,
+    decoding, hooks) shows up here. Lags are counted in a histogram whose
+    upper bounds are ``BUCKETS`` (in seconds), and the ones reaching
+    ``threshold`` are kept as spikes along with the client operations that
+    were in flight, which are registered through :meth:`begin` and
+    :meth:`end`.
+    """
+
+    INTERVAL = 0.05
+    THRESHOLD = 0.1
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+    MAX_SPIKES = 100
+
+    def __init__(self, io_loop=None, interval=None, threshold=None):
+        self.io_loop = io_loop or ioloop.IOLoop.current()
+        self.interval = interval or self.INTERVAL
+        self.threshold = threshold or self.THRESHOLD
+        self.__histogram = [0] * (len(self.BUCKETS) + 1)
+        self.__samples = 0
+        self.__total_lag = 0.0
+        self.__max_lag = 0.0
+        self.__spikes = collections.deque(maxlen=self.MAX_SPIKES)
+        self.__spike_count = 0
+        self.__spiking_operations = collections.Counter()
+        self.__in_flight = {}
+        self.__ids = itertools.count()
+        self.__expected = None
+        self.__timeout = None
+
+    @property
+    def running(self):
+        return self.__timeout is not None
+
+    @property
+    def spikes(self):
+        return list(self.__spikes)
+
+    def start(self):
+        if self.__timeout is None:
+            self.__schedule()
+
+    def stop(self):
+        if self.__timeout is not None:
+            self.io_loop.remove_timeout(self.__timeout)
+            self.__timeout = None
+
+    def __schedule(self):
+        self.__expected = self.io_loop.time() + self.interval
+        self.__timeout = self.io_loop.call_at(self.__expected, self.__tick)
+
+    def __tick(self):
+        self.record(max(self.io_loop.time() - self.__expected, 0))
+        self.__schedule()
+
+    def record(self, lag):
+        """Counts a lag of ``lag`` seconds."""
+        self.__histogram[bisect.bisect_left(self.BUCKETS, lag)] += 1
+        self.__samples += 1
+        self.__total_lag += lag
+        self.__max_lag = max(self.__max_lag, lag)
+        if lag >= self.threshold:
+            operations = sorted(set(self.__in_flight.values()))
+            self.__spike_count += 1
+            self.__spiking_operations.update(operations)
+            self.__spikes.append({'at': self.io_loop.time(), 'lag': lag,
+                                  'in_flight': operations})
+
+    def begin(self, method, path):
+        """Registers a client operation in flight; returns its token."""
+        token = next(self.__ids)
+        self.__in_flight[token] = '%s %s' % (method, path)
+        return token
+
+    def end(self, token):
+        self.__in_flight.pop(token, None)
+
+    def statistics(self):
+        buckets = ['%g' % bound for bound in self.BUCKETS] + ['+inf']
+        return {
+            'samples': self.__samples,
+            'mean': self.__total_lag / self.__samples
+            if self.__samples else 0.0,
+            'max': self.__max_lag,
+            'histogram': dict(zip(buckets, self.__histogram)),
+            'spikes': self.__spike_count,
+            'spiking_operations': dict(self.__spiking_operations),
+        }
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Snapshot and restore of cluster metadata"""
+from tornado import gen
+
+from asyncflux.database import USER_FIELDS
+from asyncflux.util import gather_bounded
+
+VERSION = 1
+
+_SHARD_SPACE_FIELDS = ('regex', 'retention_policy', 'shard_duration',
+                       'replication_factor', 'split')
+
+
+@gen.coroutine
+def snapshot(client, concurrency=8):
+    """Returns the databases with their users and shard spaces, and the
+    cluster admins of a cluster, as a JSON-serialisable document.
+
+    Passwords can't be read back from InfluxDB, so they are not part of it.
+    """
+    names, admins, shard_spaces = yield [client.get_database_names(),
+                                         client.get_cluster_admin_names(),
+                                         client.get_shard_spaces()]
+    names = sorted(names)
+    users = yield gather_bounded(
+        [lambda name=name: client[name].get_users() for name in names],
+        concurrency)
+    databases = []
+    for name, database_users in zip(names, users):
+        databases.append({
+            'name': name,
+            'users': [{'name': u.name, 'is_admin': bool(u.is_admin),
+                       'read_from': u.read_from, 'write_to': u.write_to}
+                      for u in sorted(database_users, key=lambda u: u.name)],
+            'shard_spaces': [s.as_dict() for s in shard_spaces
+                             if s.database.name == name],
+        })
+    raise gen.Return({'version': VERSION, 'databases': databases,
+                      'cluster_admins': sorted(admins)})
+
+
+@gen.coroutine
+def _apply(tasks, report, concurrency):
+    """Runs ``(key, action, run)`` tasks, recording errors in ``report``."""
+    def make_task(key, run):
+        @gen.coroutine
+        def task():
+            try:
+                yield run()
+            except Exception as e:
+                report[key]['error'] = e
+        return task
+
+    yield gather_bounded([make_task(key, run) for key, _, run in tasks],
+                         concurrency)
+
+
+def _plan(report, key, action, run, tasks, dry_run):
+    report[key] = {'action': action, 'error': None}
+    if action not in (None, 'conflict') and not dry_run:
+        tasks.append((key, action, run))
+
+
+@gen.coroutine
+def restore(client, document, password=None, delete_missing=False,
+            concurrency=8, dry_run=False):
+    """Applies a :func:`snapshot` document to a cluster.
+
+    Only the differences with the current metadata are applied, phase by
+    phase (databases, cluster admins, shard spaces and then users), each
+    with at most ``concurrency`` requests in flight. ``password(database,
+    name)`` gives the password of the users and cluster admins to create
+    (``database`` is None for the latter). Metadata missing from the
+    document is deleted only with ``delete_missing``, except for the
+    cluster admin the client is authenticated as. Shard spaces whose
+    definition changed are reported as conflicts and left untouched, since
+    replacing them would drop their data.
+
+    Returns a report by kind of metadata with the ``action`` taken and the
+    ``error`` raised for every item. Nothing is changed on a ``dry_run``.
+    """
+    if document.get('version') != VERSION:
+        raise ValueError('Unsupported metadata version: %s' %
+                         document.get('version'))
+    desired = dict((d['name'], d) for d in document['databases'])
+    current, admins, shard_spaces = yield [
+        client.get_database_names(), client.get_cluster_admin_names(),
+        client.get_shard_spaces()]
+    current = set(current)
+    report = {'databases': {}, 'cluster_admins': {}, 'shard_spaces': {},
+              'users': {}}
+
+    def password_for(database, name):
+        value = password(database, name) if password else None
+        if not value:
+            raise ValueError('A password is required to create %s' %
+                             (name if database is None else
+                              '%s/%s' % (database, name)))
+        return value
+
+    # Databases
+    tasks = []
+    for name in sorted(desired):
+        _plan(report['databases'], name,
+              None if name in current else 'create',
+              lambda name=name: client.create_database(name), tasks,
+              dry_run)
+    if delete_missing:
+        for name in sorted(current - set(desired)):
+            _plan(report['databases'], name, 'delete',
+                  lambda name=name: client.delete_database(name), tasks,
+                  dry_run)
+    yield _apply(tasks, report['databases'], concurrency)
+
+    # Cluster admins
+    tasks = []
+    for name in document.get('cluster_admins', ()):
+        if name not in admins:
+            _plan(report['cluster_admins'], name, 'create',
+                  lambda name=name: client.create_cluster_admin(
+                      name, password_for(None, name)), tasks, dry_run)
+        else:
+            _plan(report['cluster_admins'], name, None, None, tasks,
+                  dry_run)
+    if delete_missing:
+        for name in admins:
+            if name not in document.get('cluster_admins', ()) and \
+                    name != client.username:
+                _plan(report['cluster_admins'], name, 'delete',
+                      lambda name=name: client.delete_cluster_admin(name),
+                      tasks, dry_run)
+    yield _apply(tasks, report['cluster_admins'], concurrency)
+
+    # Shard spaces
+    tasks = []
+    existing = dict(((s.database.name, s.name), s.as_dict())
+                    for s in shard_spaces)
+    wanted = set()
+    for database in document['databases']:
+        for space in database.get('shard_spaces', ()):
+            key = (database['name'], space['name'])
+            wanted.add(key)
+            action = 'create'
+            if key in existing:
+                action = None
+                if any(existing[key][f] != space.get(f)
+                       for f in _SHARD_SPACE_FIELDS):
+                    action = 'conflict'
+            options = dict((f, space[f]) for f in _SHARD_SPACE_FIELDS
+                           if f in space)
+            _plan(report['shard_spaces'], '%s/%s' % key, action,
+                  lambda key=key, options=options:
+                  client.create_shard_space(key[0], key[1], **options),
+                  tasks, dry_run)
+    if delete_missing:
+        for key in sorted(set(existing) - wanted):
+            if key[0] in desired:
+                _plan(report['shard_spaces'], '%s/%s' % key, 'delete',
+                      lambda key=key: client.delete_shard_space(*key),
+                      tasks, dry_run)
+    yield _apply(tasks, report['shard_spaces'], concurrency)
+
+    # Users, spreading the concurrency over the databases
+    names = sorted(desired)
+    parallel = max(min(concurrency, len(names)), 1)
+    per_database = max(concurrency // parallel, 1)
+
+    @gen.coroutine
+    def sync(name):
+        users = []
+        for spec in desired[name].get('users', ()):
+            spec = dict(spec)
+            spec.setdefault('password', password(name, spec['name'])
+                            if password else None)
+            users.append(spec)
+        if dry_run and name not in current:
+            report['users'][name] = dict(
+                (u['name'], {'action': 'create',
+                             'changes': list(USER_FIELDS),
+                             'error': None}) for u in users)
+            return
+        try:
+            report['users'][name] = yield client[name].sync_users(
+                users, delete_missing=delete_missing,
+                concurrency=per_database, dry_run=dry_run)
+        except Exception as e:
+            report['users'][name] = {'error': e}
+
+    yield gather_bounded([lambda name=name: sync(name) for name in names],
+                         parallel)
+    raise gen.Return(report)
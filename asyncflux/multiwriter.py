@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""Multi-process writes through shared-memory ring buffers"""
+import logging
+import marshal
+import multiprocessing
+import struct
+import threading
+import time
+import zlib
+
+from tornado import ioloop
+
+from asyncflux.batch import BatchWriter
+from asyncflux.errors import DeadlineExceeded
+
+logger = logging.getLogger('asyncflux.multiwriter')
+
+_HEADER = struct.Struct('<I')
+
+
+class RingBuffer(object):
+    """A single-producer, single-consumer ring buffer in shared memory.
+
+    Records are length-prefixed byte strings. ``head`` and ``tail`` are
+    ever-increasing byte counters, and a semaphore counts the records ready
+    to be read, which also orders the memory accesses of both processes.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.__buffer = multiprocessing.RawArray('B', capacity)
+        self.__view = memoryview(self.__buffer).cast('B')
+        self.__head = multiprocessing.RawValue('Q', 0)
+        self.__tail = multiprocessing.RawValue('Q', 0)
+        self.__records = multiprocessing.Semaphore(0)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_RingBuffer__view']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__view = memoryview(self.__buffer).cast('B')
+
+    @property
+    def used(self):
+        return self.__tail.value - self.__head.value
+
+    def __copy_in(self, offset, data):
+        start = offset % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.__view[start:start + first] = data[:first]
+        if first < len(data):
+            self.__view[:len(data) - first] = data[first:]
+
+    def __copy_out(self, offset, size):
+        start = offset % self.capacity
+        first = min(size, self.capacity - start)
+        data = self.__view[start:start + first].tobytes()
+        if first < size:
+            data += self.__view[:size - first].tobytes()
+        return data
+
+    def put(self, data, timeout=None):
+        """Appends a record, waiting up to ``timeout`` seconds for room."""
+        size = _HEADER.size + len(data)
+        if size > self.capacity:
+            raise ValueError('Record larger than the ring buffer')
+        deadline = None if timeout is None else time.time() + timeout
+        while self.capacity - self.used < size:
+            if deadline is not None and time.time() >= deadline:
+                raise DeadlineExceeded('Ring buffer full')
+            time.sleep(0.001)
+        tail = self.__tail.value
+        self.__copy_in(tail, _HEADER.pack(len(data)))
+        self.__copy_in(tail + _HEADER.size, data)
+        self.__tail.value = tail + size
+        self.__records.release()
+
+    def get(self, block=True, timeout=None):
+        """Removes and returns the oldest record, or None if there is none."""
+        if not self.__records.acquire(block, timeout):
+            return None
+        head = self.__head.value
+        size, = _HEADER.unpack(self.__copy_out(head, _HEADER.size))
+        data = self.__copy_out(head + _HEADER.size, size)
+        self.__head.value = head + _HEADER.size + size
+        return data
+
+
+def _worker_main(ring, stop_event, database, client_args, client_kwargs,
+                 batch_options, poll_interval):
+    from asyncflux.client import AsyncfluxClient
+
+    io_loop = ioloop.IOLoop()
+    client = AsyncfluxClient(*client_args, io_loop=io_loop, **client_kwargs)
+    writer = BatchWriter(client[database], **batch_options)
+
+    def drain():
+        while True:
+            record = ring.get(block=False)
+            if record is None:
+                return
+            name, columns, points = marshal.loads(record)
+            writer.add(name, columns, points)
+
+    def stop(future):
+        if future.exception() is not None:
+            logger.error('Failed to flush the last batch: %s',
+                         future.exception())
+        io_loop.stop()
+
+    def poll():
+        # Records put before the stop event was set are all in the ring by
+        # the time it is seen, so check it before draining
+        stopping = stop_event.is_set()
+        drain()
+        if stopping:
+            callback.stop()
+            io_loop.add_future(writer.flush(), stop)
+
+    callback = ioloop.PeriodicCallback(poll, poll_interval * 1000)
+    callback.start()
+    io_loop.start()
+
+
+class MultiProcessWriter(object):
+    """Writes points through ``processes`` worker processes.
+
+    Every worker owns an :class:`AsyncfluxClient` and a
+    :class:`~asyncflux.batch.BatchWriter`, and reads points from its own
+    :class:`RingBuffer`. Points are routed to workers by a stable hash of
+    the series name, so the producer only frames them with :mod:`marshal`;
+    the JSON encoding and the HTTP traffic happen in the workers.
+
+    :meth:`write` may be called from several threads: every ring buffer
+    has a single producer at a time, guarded by its own lock.
+
+    Dead workers are restarted on the same ring buffer by a monitor thread
+    (points already taken by a crashed worker are lost). :meth:`close` lets
+    the workers drain their buffers and flush their batches.
+    """
+
+    PROCESSES = multiprocessing.cpu_count()
+    BUFFER_SIZE = 8 * 1024 * 1024
+    POLL_INTERVAL = 0.005
+    MONITOR_INTERVAL = 1.0
+
+    def __init__(self, database, processes=None, buffer_size=None,
+                 client_args=(), client_kwargs=None, batch_size=None,
+                 flush_interval=None, time_precision=None,
+                 put_timeout=None):
+        self.database = database
+        self.processes = processes or self.PROCESSES
+        self.put_timeout = put_timeout
+        self.__client_args = tuple(client_args)
+        self.__client_kwargs = dict(client_kwargs or {})
+        self.__batch_options = dict(batch_size=batch_size,
+                                    flush_interval=flush_interval,
+                                    time_precision=time_precision)
+        self.__rings = [RingBuffer(buffer_size or self.BUFFER_SIZE)
+                        for _ in range(self.processes)]
+        self.__put_locks = [threading.Lock() for _ in range(self.processes)]
+        self.__stop_event = multiprocessing.Event()
+        self.__lock = threading.Lock()
+        self.__workers = [None] * self.processes
+        self.__closed = False
+        self.restarts = 0
+        for index in range(self.processes):
+            self.__start_worker(index)
+        self.__monitor = threading.Thread(target=self.__monitor_workers,
+                                          name='asyncflux-multiwriter')
+        self.__monitor.daemon = True
+        self.__monitor.start()
+
+    @property
+    def workers(self):
+        return list(self.__workers)
+
+    def __start_worker(self, index):
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(self.__rings[index], self.__stop_event, self.database,
+                  self.__client_args, self.__client_kwargs,
+                  self.__batch_options, self.POLL_INTERVAL),
+            name='asyncflux-writer-%d' % index)
+        process.daemon = True
+        process.start()
+        self.__workers[index] = process
+
+    def check_workers(self):
+        """Restarts the workers that died; returns how many were."""
+        restarted = 0
+        with self.__lock:
+            if self.__closed:
+                return restarted
+            for index, process in enumerate(self.__workers):
+                if not process.is_alive():
+                    logger.warning('Writer process %s exited with %s, '
+                                   'restarting it', process.name,
+                                   process.exitcode)
+                    self.__start_worker(index)
+                    restarted += 1
+            self.restarts += restarted
+        return restarted
+
+    def __monitor_workers(self):
+        while not self.__stop_event.wait(self.MONITOR_INTERVAL):
+            self.check_workers()
+
+    def route(self, name):
+        """Returns the index of the worker in charge of a series."""
+        if not isinstance(name, bytes):
+            name = name.encode('utf-8')
+        return zlib.crc32(name) % self.processes
+
+    def write(self, name, columns, points):
+        """Hands points of the series ``name`` to its worker."""
+        if self.__closed:
+            raise RuntimeError('Writer is closed')
+        record = marshal.dumps((name, list(columns), list(points)))
+        index = self.route(name)
+        with self.__put_locks[index]:
+            self.__rings[index].put(record, self.put_timeout)
+
+    def close(self, timeout=None):
+        """Stops the workers once they have written every queued point.
+
+        Returns True if all of them exited within ``timeout`` seconds; the
+        ones that didn't are terminated.
+        """
+        with self.__lock:
+            if self.__closed:
+                return True
+            self.__closed = True
+        self.__stop_event.set()
+        deadline = None if timeout is None else time.time() + timeout
+        clean = True
+        for process in self.__workers:
+            remaining = None
+            if deadline is not None:
+                remaining = max(deadline - time.time(), 0)
+            process.join(remaining)
+            if process.is_alive():
+                clean = False
+                process.terminate()
+                process.join()
+        return clean
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Shard-aligned partitioning of series writes"""
+import re
+import time
+
+from asyncflux.timestamps import PRECISION_FACTORS
+from asyncflux.util import LRUCache, parse_duration
+
+# InfluxDB truncates timestamps to shard boundaries counting from Go's zero
+# time (0001-01-01 UTC) rather than from the Unix epoch.
+_GO_ZERO_TIME_OFFSET = 62135596800
+
+_REGEX_LITERAL_RE = re.compile(r'^/(.*)/([a-z]*)$', re.DOTALL)
+
+
+def _compile_shard_space_regex(regex):
+    """Translates a shard space regex (``/pattern/flags``) into a pattern."""
+    match = _REGEX_LITERAL_RE.match(regex)
+    if not match:
+        return regex
+    pattern, flags = match.groups()
+    if 'i' in flags:
+        pattern = '(?i:%s)' % pattern
+    return pattern
+
+
+class _SeriesMatcher(object):
+    """Matches series names against the shard spaces of one database.
+
+    All the shard space regexes are folded into a single alternation of
+    anchored lookaheads, so the first shard space in order wins, exactly as
+    the server resolves them.
+    """
+
+    def __init__(self, shard_spaces):
+        self.shard_spaces = list(shard_spaces)
+        patterns = [_compile_shard_space_regex(s.regex)
+                    for s in self.shard_spaces]
+        try:
+            self.__combined = re.compile('^(?:%s)' % '|'.join(
+                '(?P<s%d>(?=[\\s\\S]*?(?:%s)))' % (i, pattern)
+                for i, pattern in enumerate(patterns)))
+            self.__separate = None
+        except re.error:
+            # Backreferences or global flags can't be combined, fall back to
+            # matching the regexes one by one.
+            self.__combined = None
+            self.__separate = [re.compile(p) for p in patterns]
+
+    def match(self, series_name):
+        if self.__combined is not None:
+            match = self.__combined.match(series_name)
+            if match:
+                return self.shard_spaces[int(match.lastgroup[1:])]
+            return None
+        for shard_space, regex in zip(self.shard_spaces, self.__separate):
+            if regex.search(series_name):
+                return shard_space
+        return None
+
+
+def _shard_duration(shard_space):
+    """Returns the shard duration of a shard space in seconds, or None."""
+    if shard_space is None:
+        return None
+    return parse_duration(shard_space.shard_duration)
+
+
+class ShardPartitioner(object):
+    """Splits series writes so every batch lands in a single shard.
+
+    Series names are matched against the regexes of the shard spaces of the
+    target database, and points are grouped by the shard time bucket of the
+    matched shard space. Matches are kept in a LRU cache keyed by database
+    and series name.
+    """
+
+    CACHE_SIZE = 10000
+
+    def __init__(self, shard_spaces, cache_size=None):
+        self.__cache = LRUCache(cache_size or self.CACHE_SIZE)
+        by_database = {}
+        for shard_space in shard_spaces:
+            by_database.setdefault(shard_space.database.name,
+                                   []).append(shard_space)
+        self.__matchers = dict((name, _SeriesMatcher(spaces))
+                               for name, spaces in by_database.items())
+
+    def match(self, database_name, series_name):
+        key = (database_name, series_name)
+        shard_space = self.__cache.get(key, key)
+        if shard_space is key:
+            matcher = self.__matchers.get(database_name)
+            shard_space = matcher.match(series_name) if matcher else None
+            self.__cache.set(key, shard_space)
+        return shard_space
+
+    def bucket(self, shard_space, timestamp, time_precision='ms'):
+        """Returns the shard bucket for a timestamp in ``time_precision``."""
+        duration = _shard_duration(shard_space)
+        if not duration:
+            return None
+        if timestamp is None:
+            seconds = int(time.time())
+        else:
+            seconds = timestamp // PRECISION_FACTORS[time_precision]
+        return (seconds + _GO_ZERO_TIME_OFFSET) // duration
+
+    def partition(self, database_name, series_list, time_precision='ms'):
+        """Returns a list of batches, each one within a single shard."""
+        if time_precision not in PRECISION_FACTORS:
+            raise ValueError('Invalid time precision: %s' % time_precision)
+        factor = PRECISION_FACTORS[time_precision]
+        batches = {}
+        order = []
+        for series in series_list:
+            name = series['name']
+            columns = series['columns']
+            shard_space = self.match(database_name, name)
+            space_name = shard_space.name if shard_space else None
+            # Parsed once per series, this is the write hot path
+            duration = _shard_duration(shard_space)
+            try:
+                time_index = columns.index('time')
+            except ValueError:
+                time_index = None
+            if not duration:
+                grouped = {(space_name, None): list(series['points'])}
+            elif time_index is None:
+                now = (int(time.time()) + _GO_ZERO_TIME_OFFSET) // duration
+                grouped = {(space_name, now): list(series['points'])}
+            else:
+                grouped = {}
+                now = None
+                for point in series['points']:
+                    timestamp = point[time_index]
+                    if timestamp is None:
+                        if now is None:
+                            now = int(time.time())
+                        seconds = now
+                    else:
+                        seconds = timestamp // factor
+                    key = (space_name,
+                           (seconds + _GO_ZERO_TIME_OFFSET) // duration)
+                    points = grouped.get(key)
+                    if points is None:
+                        grouped[key] = points = []
+                    points.append(point)
+            for key, points in grouped.items():
+                if key not in batches:
+                    batches[key] = []
+                    order.append(key)
+                batches[key].append({'name': name, 'columns': columns,
+                                     'points': points})
+        return [batches[key] for key in order]
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Client-side checks of database user permissions"""
+import re
+
+from tornado import gen
+from tornado.concurrent import Future
+
+from asyncflux.deadline import now
+from asyncflux.errors import AsyncfluxError
+from asyncflux.util import LRUCache
+
+REJECT = 'reject'
+SPLIT = 'split'
+
+
+class Permissions(object):
+    """The compiled ``readFrom`` and ``writeTo`` regexes of a user.
+
+    Like the server, a series is allowed if the regex matches anywhere in
+    its name. Decisions are memoised per series name.
+    """
+
+    CACHE_SIZE = 10000
+
+    def __init__(self, read_from, write_to, cache_size=None):
+        self.read_from = re.compile(read_from)
+        self.write_to = re.compile(write_to)
+        self.__writable = LRUCache(cache_size or self.CACHE_SIZE)
+
+    def can_read(self, name):
+        return self.read_from.search(name) is not None
+
+    def can_write(self, name):
+        allowed = self.__writable.get(name)
+        if allowed is None:
+            allowed = self.write_to.search(name) is not None
+            self.__writable.set(name, allowed)
+        return allowed
+
+    def split(self, data):
+        """Splits ``{name, columns, points}`` series into the allowed and
+        the denied ones."""
+        allowed = []
+        denied = []
+        for series in data:
+            (allowed if self.can_write(series['name']) else
+             denied).append(series)
+        return allowed, denied
+
+
+class PermissionCache(object):
+    """Fetches and caches the permissions of the client user per database.
+
+    Entries expire after ``ttl`` seconds and concurrent lookups of the same
+    database share a single request. If the permissions can't be fetched
+    (e.g. the client is authenticated as a cluster admin) None is cached,
+    meaning that writes aren't checked.
+    """
+
+    TTL = 60.0
+
+    def __init__(self, client, ttl=None, clock=now):
+        self.client = client
+        self.ttl = ttl or self.TTL
+        self.__clock = clock
+        self.__entries = {}
+        self.__pending = {}
+
+    def invalidate(self, database_name=None, username=None):
+        """Drops the cached permissions of a database, or all of them.
+
+        With a ``username`` other than the one of the client nothing is
+        dropped.
+        """
+        if username is not None and username != self.client.username:
+            return
+        if database_name is None:
+            self.__entries.clear()
+        else:
+            self.__entries.pop((database_name, self.client.username), None)
+
+    def get(self, database_name):
+        """Returns a future resolved with the :class:`Permissions` of the
+        client user on a database, or None."""
+        key = (database_name, self.client.username)
+        entry = self.__entries.get(key)
+        if entry is not None and entry[0] > self.__clock():
+            future = Future()
+            future.set_result(entry[1])
+            return future
+        pending = self.__pending.get(key)
+        if pending is None:
+            pending = self.__fetch(key)
+            self.__pending[key] = pending
+            pending.add_done_callback(lambda _: self.__pending.pop(key, None))
+        return pending
+
+    @gen.coroutine
+    def __fetch(self, key):
+        database_name, username = key
+        try:
+            user = yield self.client.request(
+                '/db/%(database)s/users/%(username)s',
+                {'database': database_name, 'username': username})
+            permissions = Permissions(user.get('readFrom') or '.*',
+                                      user.get('writeTo') or '.*')
+        except AsyncfluxError as e:
+            if e.response is None:
+                # Don't remember transient failures
+                raise gen.Return(None)
+            permissions = None
+        self.__entries[key] = (self.__clock() + self.ttl, permissions)
+        raise gen.Return(permissions)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Sampling profiler for client operations"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None  # pragma: no cover
+
+from tornado import ioloop
+
+logger = logging.getLogger('asyncflux.profiling')
+
+#: Path fragments telling which client subsystem made an allocation, checked
+#: from the innermost frame outwards.
+SUBSYSTEMS = (
+    ('encode', ('json/encoder.py', )),
+    ('decode', ('json/decoder.py', )),
+    ('buffers', ('tornado/iostream.py', 'tornado/http1connection.py',
+                 'tornado/simple_httpclient.py', 'tornado/curl_httpclient.py',
+                 'tornado/httputil.py')),
+    ('models', ('asyncflux/database.py', 'asyncflux/user.py',
+                'asyncflux/clusteradmin.py', 'asyncflux/shardspace.py',
+                'asyncflux/query.py')),
+)
+
+
+def _subsystem(traceback):
+    for frame in reversed(traceback):
+        filename = frame.filename.replace(os.sep, '/')
+        for name, fragments in SUBSYSTEMS:
+            if filename.endswith(fragments):
+                return name
+    return 'other'
+
+
+class Profiler(object):
+    """Profiles a ``sample_rate`` fraction of the client coroutines.
+
+    A sampled call runs under :mod:`cProfile` until its future is done and
+    its statistics are dumped to ``directory``. Only one call is profiled at
+    a time, and since the coroutine interleaves with the rest of the IOLoop,
+    the profile covers everything the loop ran meanwhile.
+
+    With ``trace_memory``, :mod:`tracemalloc` is started and
+    :meth:`take_snapshot` (run every ``snapshot_interval`` seconds if given)
+    writes the allocations grouped by the subsystem in :data:`SUBSYSTEMS`
+    that made them.
+    """
+
+    TRACEBACK_LIMIT = 25
+    TOP_LINES = 10
+
+    def __init__(self, directory, sample_rate=0.01, trace_memory=False,
+                 snapshot_interval=None, seed=None, io_loop=None):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.trace_memory = trace_memory and tracemalloc is not None
+        self.io_loop = io_loop or ioloop.IOLoop.current()
+        self.profiles = 0
+        self.snapshots = 0
+        self.__random = random.Random(seed)
+        self.__active = False
+        self.__started_tracing = False
+        self.__periodic = None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.TRACEBACK_LIMIT)
+                self.__started_tracing = True
+            if snapshot_interval:
+                self.__periodic = ioloop.PeriodicCallback(
+                    self.take_snapshot, snapshot_interval * 1000)
+                self.__periodic.start()
+
+    def __path(self, name, extension):
+        return os.path.join(self.directory, '%s-%d-%s.%s' % (
+            name, os.getpid(), time.strftime('%Y%m%d%H%M%S'), extension))
+
+    def run(self, name, function, *args, **kwargs):
+        """Runs ``function``, which returns a future, profiling it if it is
+        sampled. ``name`` is used for the file of the profile."""
+        if self.__active or self.__random.random() >= self.sample_rate:
+            return function(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this thread
+            return function(*args, **kwargs)
+        self.__active = True
+        try:
+            future = function(*args, **kwargs)
+        except Exception:
+            profile.disable()
+            self.__active = False
+            raise
+
+        def done(_):
+            profile.disable()
+            self.__active = False
+            self.__dump_profile(profile, name)
+        future.add_done_callback(done)
+        return future
+
+    def __dump_profile(self, profile, name):
+        self.profiles += 1
+        path = self.__path('profile-%s-%d' % (name, self.profiles), 'prof')
+        try:
+            profile.dump_stats(path)
+        except Exception:
+            logger.exception('Failed to write the profile %s', path)
+
+    def take_snapshot(self):
+        """Writes the traced allocations by subsystem and returns the bytes
+        allocated by each one of them."""
+        if not self.trace_memory:
+            raise RuntimeError('Memory tracing is not enabled')
+        snapshot = tracemalloc.take_snapshot()
+        totals = {}
+        top = {}
+        for statistic in snapshot.statistics('traceback'):
+            subsystem = _subsystem(statistic.traceback)
+            totals[subsystem] = totals.get(subsystem, 0) + statistic.size
+            top.setdefault(subsystem, []).append(statistic)
+        self.snapshots += 1
+        report = io.StringIO()
+        for subsystem in sorted(totals, key=totals.get, reverse=True):
+            report.write(u'%s: %d bytes\n' % (subsystem, totals[subsystem]))
+            for statistic in top[subsystem][:self.TOP_LINES]:
+                frame = statistic.traceback[-1]
+                report.write(u'    %d bytes in %d blocks at %s:%d\n' % (
+                    statistic.size, statistic.count, frame.filename,
+                    frame.lineno))
+        path = self.__path('memory-%d' % self.snapshots, 'txt')
+        with io.open(path, 'w') as f:
+            f.write(report.getvalue())
+        return totals
+
+    def summary(self, path, limit=20):
+        """Returns the most expensive calls of a dumped profile as text."""
+        stream = io.StringIO()
+        stats = pstats.Stats(path, stream=stream)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    def stop(self):
+        if self.__periodic is not None:
+            self.__periodic.stop()
+            self.__periodic = None
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Time range splitting and merging of queries"""
+import re
+
+from asyncflux.partitioner import _GO_ZERO_TIME_OFFSET
+from asyncflux.util import parse_duration
+
+_WHERE_RE = re.compile(r'\swhere\s', re.I)
+_TAIL_RE = re.compile(r'\s(group\s+by|fill|order|limit|into)\b', re.I)
+_ASC_RE = re.compile(r'\sorder\s+asc\b', re.I)
+_LIMIT_RE = re.compile(r'\slimit\s+\d', re.I)
+_SELECT_RE = re.compile(r'^\s*select\s+(.*?)\s+from\s', re.I | re.S)
+_AGGREGATE_RE = re.compile(
+    r'\b(bottom|count|derivative|difference|distinct|first|histogram|last|'
+    r'max|mean|median|min|mode|percentile|stddev|sum|top)\s*\(', re.I)
+_GROUP_BY_TIME_RE = re.compile(
+    r'\sgroup\s+by\s+(?:[^()]*?,\s*)?time\s*\(\s*([^),\s]+)', re.I)
+
+
+def add_time_range(query, start, end):
+    """Restricts ``query`` to ``start <= time < end`` (epoch seconds)."""
+    condition = 'time >= %ds and time < %ds' % (start, end)
+    where = _WHERE_RE.search(query)
+    tail = _TAIL_RE.search(query, where.end() if where else 0)
+    tail_index = tail.start() if tail else len(query)
+    if where:
+        return '%s where %s and (%s)%s' % (
+            query[:where.start()], condition,
+            query[where.end():tail_index].strip(), query[tail_index:])
+    return '%s where %s%s' % (query[:tail_index].rstrip(), condition,
+                              query[tail_index:])
+
+
+def is_ascending(query):
+    return bool(_ASC_RE.search(query))
+
+
+def group_interval(query):
+    """Returns the ``group by time(...)`` interval of ``query`` in seconds,
+    None when it isn't grouped by time or by less than a second."""
+    match = _GROUP_BY_TIME_RE.search(query)
+    if not match:
+        return None
+    try:
+        return parse_duration(match.group(1))
+    except ValueError:
+        return None
+
+
+def check_splittable(query):
+    """Raises ValueError when the results of ``query`` over a time range
+    can't be rebuilt by merging its results over sub-ranges: a ``limit``
+    would apply to every sub-range, and an aggregate not grouped by time
+    would return one row per sub-range instead of one for the whole range.
+    """
+    if _LIMIT_RE.search(query):
+        raise ValueError('A query with a limit can not be split')
+    select = _SELECT_RE.search(query)
+    if select and _AGGREGATE_RE.search(select.group(1)) and \
+            not _GROUP_BY_TIME_RE.search(query):
+        raise ValueError('An aggregate query can only be split when it is '
+                         'grouped by time')
+
+
+def align_time_ranges(ranges, interval):
+    """Moves the inner boundaries of contiguous ``ranges`` down to
+    multiples of ``interval`` seconds, so no ``group by time`` bucket is
+    split between two ranges. Ranges left empty are dropped."""
+    if not interval or not ranges:
+        return list(ranges)
+    edges = [ranges[0][0]]
+    for _, end in ranges[:-1]:
+        boundary = end - end % interval
+        if boundary > edges[-1]:
+            edges.append(boundary)
+    edges.append(ranges[-1][1])
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def split_time_range(start, end, splits, shard_duration=None):
+    """Splits ``[start, end)`` into at most ``splits`` contiguous ranges.
+
+    When ``shard_duration`` is given, the inner boundaries are aligned to
+    shard boundaries, so no sub-range spans more shards than needed.
+    """
+    if end <= start:
+        raise ValueError('end must be greater than start')
+    splits = max(int(splits), 1)
+    duration = parse_duration(shard_duration) if shard_duration else None
+    if duration:
+        first = (start + _GO_ZERO_TIME_OFFSET) // duration + 1
+        last = (end - 1 + _GO_ZERO_TIME_OFFSET) // duration
+        candidates = [b * duration - _GO_ZERO_TIME_OFFSET
+                      for b in range(first, last + 1)]
+        step = max(float(len(candidates) + 1) / splits, 1)
+        boundaries = []
+        for i in range(1, splits):
+            index = int(i * step + 0.5) - 1
+            if 0 <= index < len(candidates) and \
+                    candidates[index] not in boundaries:
+                boundaries.append(candidates[index])
+    else:
+        step = float(end - start) / splits
+        boundaries = sorted(set(start + int(i * step + 0.5)
+                                for i in range(1, splits)) - set([start, end]))
+    edges = [start] + boundaries + [end]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def merge_series(chunks):
+    """Merges lists of series, concatenating the points of every series.
+
+    Chunks must be given in the order their points have to appear.
+    """
+    merged = {}
+    order = []
+    for chunk in chunks:
+        for series in chunk or ():
+            name = series['name']
+            if name not in merged:
+                merged[name] = {'name': name,
+                                'columns': list(series['columns']),
+                                'points': []}
+                order.append(name)
+            target = merged[name]
+            if series['columns'] == target['columns']:
+                target['points'].extend(series['points'])
+                continue
+            for column in series['columns']:
+                if column not in target['columns']:
+                    target['columns'].append(column)
+                    for point in target['points']:
+                        point.append(None)
+            indexes = [target['columns'].index(c) for c in series['columns']]
+            for point in series['points']:
+                row = [None] * len(target['columns'])
+                for index, value in zip(indexes, point):
+                    row[index] = value
+                target['points'].append(row)
+    return [merged[name] for name in order]
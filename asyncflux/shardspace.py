@@ -1,9 +1,28 @@
 # -*- coding: utf-8 -*-
 """Tools for shard spaces administration"""
 from asyncflux.database import Database
+from asyncflux.util import asyncflux_coroutine, set_from_raw
 
 
 class ShardSpace(object):
+    """A shard space.
+
+    Shard spaces listed by :meth:`~asyncflux.AsyncfluxClient.get_shard_spaces`
+    are built with :meth:`from_raw`, reading their attributes (and building
+    their database) from the response row only when first accessed.
+    """
+
+    __slots__ = ('__client', '__name', '__database', '__regex',
+                 '__retention_policy', '__shard_duration',
+                 '__replication_factor', '__split', '__raw')
+
+    _RAW_ATTRIBUTES = {'database': '_ShardSpace__database',
+                       'regex': '_ShardSpace__regex',
+                       'retention_policy': '_ShardSpace__retention_policy',
+                       'shard_duration': '_ShardSpace__shard_duration',
+                       'replication_factor':
+                       '_ShardSpace__replication_factor',
+                       'split': '_ShardSpace__split'}
 
     def __init__(self, client, name, database, regex, retention_policy,
                  shard_duration, replication_factor, split):
@@ -18,6 +37,24 @@ class ShardSpace(object):
         self.__shard_duration = shard_duration
         self.__replication_factor = replication_factor
         self.__split = split
+        self.__raw = None
+
+    @classmethod
+    def from_raw(cls, client, raw):
+        """Builds a shard space out of a row of an InfluxDB response."""
+        self = cls.__new__(cls)
+        self.__client = client
+        self.__name = raw['name']
+        self.__raw = raw
+        return self
+
+    def __load(self):
+        raw, self.__raw = self.__raw, None
+        for attribute in self._RAW_ATTRIBUTES.values():
+            setattr(self, attribute, None)
+        set_from_raw(self, raw, self._RAW_ATTRIBUTES)
+        if not isinstance(self.__database, Database):
+            self.__database = Database(self.__client, self.__database)
 
     @property
     def client(self):
@@ -29,24 +66,52 @@ class ShardSpace(object):
 
     @property
     def database(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__database
 
     @property
     def regex(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__regex
 
     @property
     def retention_policy(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__retention_policy
 
     @property
     def shard_duration(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__shard_duration
 
     @property
     def replication_factor(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__replication_factor
 
     @property
     def split(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__split
+
+    def as_dict(self):
+        return {'name': self.name, 'database': self.database.name,
+                'regex': self.regex,
+                'retention_policy': self.retention_policy,
+                'shard_duration': self.shard_duration,
+                'replication_factor': self.replication_factor,
+                'split': self.split}
+
+    @asyncflux_coroutine
+    def delete(self):
+        yield self.client.delete_shard_space(self.database.name, self.name)
+
+    def __repr__(self):
+        return "ShardSpace(%r, %r, %r)" % (self.client, self.database.name,
+                                           self.name)
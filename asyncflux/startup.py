@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Import and client construction benchmark
+
+Measures, in fresh interpreters, how long it takes to import asyncflux, to
+import :class:`AsyncfluxClient` and to create a client::
+
+    $ python -m asyncflux.startup --runs 20
+
+Use ``python -X importtime -c 'import asyncflux'`` to see which modules a
+slow import is spending its time in.
+"""
+import json
+import subprocess
+import sys
+
+from asyncflux.loadgen import percentile
+
+PHASES = ('import', 'client_import', 'construct', 'total')
+
+_PROBE = '''
+import sys
+import time
+clock = getattr(time, 'perf_counter', time.time)
+started = clock()
+import asyncflux
+imported = clock()
+from asyncflux import AsyncfluxClient
+client_imported = clock()
+AsyncfluxClient()
+constructed = clock()
+import json
+sys.stdout.write(json.dumps({
+    'import': imported - started,
+    'client_import': client_imported - imported,
+    'construct': constructed - client_imported,
+    'total': constructed - started,
+    'modules': sorted(name for name in sys.modules
+                      if name.startswith(('asyncflux', 'tornado'))),
+}))
+'''
+
+
+def probe(executable=None):
+    """Runs the import and construction of a client in a new interpreter and
+    returns the time taken by every phase, along with the asyncflux and
+    Tornado modules it loaded."""
+    output = subprocess.check_output([executable or sys.executable, '-c',
+                                      _PROBE])
+    return json.loads(output.decode('utf-8'))
+
+
+def measure(runs=10, executable=None):
+    """Returns the p50, p90 and max of every phase over ``runs`` probes."""
+    samples = [probe(executable) for _ in range(runs)]
+    report = {'runs': runs, 'modules': samples[-1]['modules']}
+    for phase in PHASES:
+        values = [sample[phase] for sample in samples]
+        report[phase] = {'p50': percentile(values, 50),
+                         'p90': percentile(values, 90),
+                         'max': max(values)}
+    return report
+
+
+def format_report(report):
+    lines = ['runs: %d' % report['runs']]
+    for phase in PHASES:
+        summary = report[phase]
+        lines.append('%s: p50 %.2fms, p90 %.2fms, max %.2fms' % (
+            phase, summary['p50'] * 1000, summary['p90'] * 1000,
+            summary['max'] * 1000))
+    lines.append('modules loaded: %s' % ', '.join(report['modules']))
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    from optparse import OptionParser
+    parser = OptionParser(usage='python -m asyncflux.startup [options]')
+    parser.add_option('--runs', type='int', default=10)
+    parser.add_option('--python', default=None,
+                      help='interpreter to measure (defaults to this one)')
+    parser.add_option('--json', action='store_true', default=False,
+                      help='print the report as JSON')
+    options, _ = parser.parse_args(args)
+    report = measure(options.runs, options.python)
+    if options.json:
+        sys.stdout.write(json.dumps(report, indent=2, sort_keys=True) + '\n')
+    else:
+        sys.stdout.write(format_report(report) + '\n')
+    return report
+
+
+if __name__ == '__main__':
+    main()
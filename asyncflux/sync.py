@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""Synchronous facade for threaded applications"""
+import collections
+import functools
+import threading
+
+try:
+    from concurrent import futures
+except ImportError:  # pragma: no cover
+    futures = None  # pragma: no cover
+
+from tornado import gen, ioloop
+from tornado.concurrent import is_future
+
+from asyncflux.batch import BatchWriter
+from asyncflux.client import AsyncfluxClient
+from asyncflux.clusteradmin import ClusterAdmin
+from asyncflux.database import Database
+from asyncflux.errors import DeadlineExceeded
+from asyncflux.shardspace import ShardSpace
+from asyncflux.user import User
+from asyncflux.util import is_asyncflux_coroutine
+
+
+_PROXIED = (AsyncfluxClient, ClusterAdmin, Database, ShardSpace, User)
+
+
+class _SyncProxy(object):
+    """Runs the methods of an asynchronous object on the facade's thread.
+
+    Clients, databases, users, cluster admins and shard spaces reached
+    through it (``client.mydb``, ``client['mydb']`` or returned by a call,
+    like the users of ``get_users()``) are proxied as well, so their
+    methods block too. Setting an attribute sets it on the proxied object.
+    """
+
+    def __init__(self, facade, target):
+        self.__facade = facade
+        self.__target = target
+
+    def __wrap(self, value):
+        if isinstance(value, _PROXIED):
+            return _SyncProxy(self.__facade, value)
+        if callable(value):
+            return functools.partial(self.__call, value)
+        return value
+
+    def __wrap_result(self, value):
+        if isinstance(value, _PROXIED):
+            return _SyncProxy(self.__facade, value)
+        if isinstance(value, list):
+            return [self.__wrap_result(item) for item in value]
+        return value
+
+    def __call(self, function, *args, **kwargs):
+        return self.__wrap_result(self.__facade.call(function, *args,
+                                                     **kwargs))
+
+    def __setattr__(self, name, value):
+        if name.startswith('_SyncProxy__'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.__target, name, value)
+
+    def __getattr__(self, name):
+        return self.__wrap(getattr(self.__target, name))
+
+    def __getitem__(self, name):
+        return self.__wrap(self.__target[name])
+
+    def __repr__(self):
+        return 'Sync(%r)' % (self.__target, )
+
+
+class SyncAsyncfluxClient(object):
+    """A thread-safe, blocking client backed by a dedicated IOLoop thread.
+
+    The wrapped :class:`AsyncfluxClient` runs on its own IOLoop in a daemon
+    thread, so every caller thread shares its connections. :meth:`write`
+    only appends to a queue (a :class:`collections.deque`, whose appends and
+    pops are atomic) and the IOLoop thread drains it into a
+    :class:`~asyncflux.batch.BatchWriter` per database. Any other method of
+    the client, of its databases or of the users, cluster admins and shard
+    spaces they return blocks until it is done, for ``timeout`` seconds at
+    most::
+
+        client = SyncAsyncfluxClient('http://localhost:8086', timeout=5)
+        client.write('mydb', 'cpu', ['value'], [[0.64]])
+        client['mydb'].query('select * from cpu')
+        client.close()
+    """
+
+    TIMEOUT = 30.0
+    TIMEOUT_MARGIN = 0.5
+
+    def __init__(self, *args, **kwargs):
+        self.timeout = kwargs.pop('timeout', self.TIMEOUT)
+        self.__batch_options = dict(
+            batch_size=kwargs.pop('batch_size', None),
+            flush_interval=kwargs.pop('flush_interval', None),
+            on_error=kwargs.pop('on_error', None))
+        self.__queue = collections.deque()
+        self.__writers = {}
+        self.__draining = False
+        self.__closed = False
+        self.__ready = threading.Event()
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__run, args=(args,
+                                                                  kwargs),
+                                         name='asyncflux-sync')
+        self.__thread.daemon = True
+        self.__thread.start()
+        self.__ready.wait()
+        if self.__error is not None:
+            raise self.__error
+
+    def __run(self, args, kwargs):
+        self.io_loop = ioloop.IOLoop()
+        try:
+            self.client = AsyncfluxClient(*args, io_loop=self.io_loop,
+                                          **kwargs)
+        except Exception as e:
+            self.__error = e
+            self.__ready.set()
+            self.io_loop.close()
+            return
+        self.__ready.set()
+        self.io_loop.start()
+        self.io_loop.close(all_fds=True)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name in ('client', 'io_loop'):
+            raise AttributeError(name)
+        return getattr(_SyncProxy(self, self.client), name)
+
+    def __getitem__(self, name):
+        return _SyncProxy(self, self.client)[name]
+
+    def call(self, function, *args, **kwargs):
+        """Runs ``function`` on the IOLoop thread and waits for its result.
+
+        A ``timeout`` keyword argument overrides the facade timeout; it is
+        passed on as the deadline of the call.
+        """
+        if threading.current_thread() is self.__thread:
+            raise RuntimeError('Blocking calls are not allowed from the '
+                               'IOLoop thread')
+        timeout = kwargs.pop('timeout', self.timeout)
+        if timeout is not None and is_asyncflux_coroutine(function):
+            kwargs['timeout'] = timeout
+        result = futures.Future()
+
+        def run():
+            try:
+                value = function(*args, **kwargs)
+            except Exception as e:
+                result.set_exception(e)
+                return
+            if not is_future(value):
+                result.set_result(value)
+                return
+
+            def done(f):
+                if f.exception() is not None:
+                    result.set_exception(f.exception())
+                else:
+                    result.set_result(f.result())
+            value.add_done_callback(done)
+
+        self.io_loop.add_callback(run)
+        try:
+            # Leave some room for the deadline to fire on the IOLoop first
+            return result.result(None if timeout is None else
+                                 timeout + self.TIMEOUT_MARGIN)
+        except futures.TimeoutError:
+            raise DeadlineExceeded()
+
+    def write(self, database, name, columns, points):
+        """Queues points to be written in batches, from any thread."""
+        if self.__closed:
+            raise RuntimeError('Client is closed')
+        self.__queue.append((database, name, columns, points))
+        if not self.__draining:
+            self.__draining = True
+            self.io_loop.add_callback(self.__drain)
+
+    def __writer(self, database):
+        writer = self.__writers.get(database)
+        if writer is None:
+            writer = BatchWriter(self.client[database],
+                                 **self.__batch_options)
+            self.__writers[database] = writer
+        return writer
+
+    def __drain(self):
+        self.__draining = False
+        while True:
+            try:
+                database, name, columns, points = self.__queue.popleft()
+            except IndexError:
+                return
+            self.__writer(database).add(name, columns, points)
+
+    def __flush_all(self):
+        self.__drain()
+        return gen.multi([writer.flush()
+                          for writer in self.__writers.values()])
+
+    def flush(self, timeout=None):
+        """Writes every queued point and waits for it."""
+        self.call(self.__flush_all, timeout=timeout or self.timeout)
+
+    def __close_client(self, deadline):
+        self.__drain()
+        return self.client.close(deadline)
+
+    def close(self, timeout=None):
+        """Closes the client within ``timeout`` seconds (see
+        :meth:`AsyncfluxClient.close`), writing the queued points, and
+        stops the IOLoop thread. Returns the report of the client."""
+        if self.__closed:
+            return None
+        self.__closed = True
+        timeout = timeout or self.timeout
+        try:
+            return self.call(self.__close_client, timeout, timeout=timeout)
+        finally:
+            self.io_loop.add_callback(self.io_loop.stop)
+            self.__thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'SyncAsyncfluxClient(%r)' % (self.client, )
@@ -11,7 +11,10 @@ from tornado.gen import coroutine, Return
 from tornado.httpclient import HTTPError, HTTPRequest, HTTPResponse
 from tornado.testing import AsyncTestCase, gen_test
 
-__all__ = ('AsyncfluxTestCase', 'gen_test', )
+from asyncflux.client import AsyncfluxClient
+from asyncflux.fakeserver import FakeInfluxDB
+
+__all__ = ('AsyncfluxTestCase', 'AsyncfluxServerTestCase', 'gen_test', )
 
 
 class AsyncfluxTestCase(AsyncTestCase):
@@ -49,3 +52,23 @@ class AsyncfluxTestCase(AsyncTestCase):
         if error:
             raise error
         super(AsyncfluxTestCase, self).stop(result)
+
+
+class AsyncfluxServerTestCase(AsyncfluxTestCase):
+    """Runs every test against a fresh :class:`FakeInfluxDB` server."""
+
+    def get_server(self):
+        return FakeInfluxDB()
+
+    def get_client(self, **kwargs):
+        return AsyncfluxClient('127.0.0.1', self.server.port,
+                               io_loop=self.io_loop, **kwargs)
+
+    def setUp(self):
+        super(AsyncfluxServerTestCase, self).setUp()
+        self.server = self.get_server()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        super(AsyncfluxServerTestCase, self).tearDown()
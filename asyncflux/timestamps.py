@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Conversion of timestamps to the wire format"""
+import datetime
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # pragma: no cover
+
+#: Time precisions understood by InfluxDB, and their units per second.
+PRECISION_FACTORS = {'s': 1, 'ms': 1000, 'u': 1000000}
+DEFAULT_PRECISION = 'ms'
+
+_UNITS = {'s': datetime.timedelta(seconds=1),
+          'ms': datetime.timedelta(milliseconds=1),
+          'u': datetime.timedelta(microseconds=1)}
+_NUMPY_UNITS = {'s': 's', 'ms': 'ms', 'u': 'us'}
+_NANOSECONDS = {'s': 10 ** 9, 'ms': 10 ** 6, 'u': 10 ** 3}
+
+
+class _UTC(datetime.tzinfo):
+
+    def utcoffset(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return 'UTC'
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_UTC = EPOCH.replace(tzinfo=_UTC())
+
+
+def validate_time_precision(time_precision):
+    if time_precision not in PRECISION_FACTORS:
+        raise ValueError('Invalid time precision: %s' % (time_precision, ))
+    return time_precision
+
+
+def to_epoch(value, time_precision=DEFAULT_PRECISION):
+    """Converts a datetime (naive ones are taken as UTC) to an integer
+    timestamp in ``time_precision``; numbers are returned as integers."""
+    if isinstance(value, datetime.datetime):
+        epoch = EPOCH if value.tzinfo is None else EPOCH_UTC
+        return (value - epoch) // _UNITS[time_precision]
+    return int(value)
+
+
+def _is_pandas(values):
+    return type(values).__module__.startswith('pandas')
+
+
+def to_epoch_array(values, time_precision=DEFAULT_PRECISION):
+    """Converts a sequence of timestamps to a list of integer timestamps.
+
+    ``values`` may be a list of datetimes and numbers, a NumPy
+    ``datetime64`` (or integer) array, or a pandas ``DatetimeIndex`` or
+    datetime ``Series``. Arrays are converted in a single vectorised pass;
+    lists with integer :class:`~datetime.timedelta` arithmetic, avoiding
+    the time tuples of :func:`calendar.timegm`.
+    """
+    validate_time_precision(time_precision)
+    if _is_pandas(values):
+        import pandas
+        index = pandas.DatetimeIndex(values)
+        if hasattr(index, 'as_unit'):
+            # pandas 2 may store coarser units than nanoseconds
+            index = index.as_unit('ns')
+        nanoseconds = index.asi8
+        return (nanoseconds // _NANOSECONDS[time_precision]).tolist()
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        if values.dtype.kind == 'M':
+            unit = 'datetime64[%s]' % _NUMPY_UNITS[time_precision]
+            return values.astype(unit).view('int64').tolist()
+        return values.astype('int64').tolist()
+    unit = _UNITS[time_precision]
+    result = []
+    append = result.append
+    for value in values:
+        if isinstance(value, datetime.datetime):
+            epoch = EPOCH if value.tzinfo is None else EPOCH_UTC
+            append((value - epoch) // unit)
+        else:
+            append(int(value))
+    return result
+
+
+def convert_series(data, time_precision=DEFAULT_PRECISION):
+    """Returns ``{name, columns, points}`` series with the datetimes of their
+    ``time`` columns converted to integers; ``data`` is not modified."""
+    converted = []
+    for series in data:
+        columns = series.get('columns') or ()
+        points = series.get('points')
+        if 'time' not in columns or not points:
+            converted.append(series)
+            continue
+        index = list(columns).index('time')
+        times = [point[index] for point in points]
+        if not any(isinstance(t, datetime.datetime) for t in times):
+            converted.append(series)
+            continue
+        new_points = []
+        for point, timestamp in zip(points,
+                                    to_epoch_array(times, time_precision)):
+            point = list(point)
+            point[index] = timestamp
+            new_points.append(point)
+        converted.append(dict(series, points=new_points))
+    return converted
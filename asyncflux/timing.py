@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Per-request timing breakdown"""
+
+PHASES = ('queue', 'encode', 'connect', 'ttfb', 'transfer', 'fetch', 'decode',
+          'total')
+
+
+class RequestTiming(object):
+    """Where the time of a single request went, in seconds.
+
+    ``queue`` is the time spent in the client before the request was handed
+    to the HTTP client (circuit breakers and lanes), ``encode`` and
+    ``decode`` the JSON work, and ``fetch`` the whole HTTP exchange. The
+    latter is split into ``connect`` (only reported by ``curl_httpclient``),
+    ``ttfb`` (until the first byte of the response) and ``transfer`` (until
+    its last byte). Phases that couldn't be measured are None.
+    """
+
+    def __init__(self, method, path, started):
+        self.method = method
+        self.path = path
+        self.started = started
+        self.code = None
+        self.error = None
+        self.first_byte = None
+        for phase in PHASES:
+            setattr(self, phase, None)
+
+    def on_response(self, response, issued, finished):
+        """Fills the HTTP phases from a response and the loop times the
+        request was issued and its response arrived."""
+        self.code = response.code
+        self.fetch = response.request_time or finished - issued
+        time_info = response.time_info or {}
+        if 'starttransfer' in time_info:
+            self.queue = (self.queue or 0) + time_info.get('queue', 0)
+            self.connect = time_info.get('appconnect') or \
+                time_info.get('connect')
+            self.ttfb = time_info['starttransfer'] - \
+                time_info.get('pretransfer', 0)
+            self.transfer = time_info.get('total', self.fetch) - \
+                time_info['starttransfer']
+        elif self.first_byte is not None:
+            self.ttfb = self.first_byte - issued
+            self.transfer = finished - self.first_byte
+
+    def as_dict(self):
+        timing = dict((phase, getattr(self, phase)) for phase in PHASES)
+        timing.update(method=self.method, path=self.path, code=self.code)
+        return timing
+
+    def __repr__(self):
+        phases = ', '.join('%s=%.4f' % (phase, getattr(self, phase))
+                           for phase in PHASES
+                           if getattr(self, phase) is not None)
+        return 'RequestTiming(%s %s, %s)' % (self.method, self.path, phases)
+
+
+class TimedList(list):
+    """A decoded JSON list carrying the :class:`RequestTiming` of its
+    request."""
+
+    timing = None
+
+
+class TimedDict(dict):
+    """A decoded JSON object carrying the :class:`RequestTiming` of its
+    request."""
+
+    timing = None
+
+
+def attach(result, timing):
+    """Returns ``result`` with ``timing`` attached, if it can carry it."""
+    if isinstance(result, list):
+        result = TimedList(result)
+    elif isinstance(result, dict):
+        result = TimedDict(result)
+    else:
+        return result
+    result.timing = timing
+    return result
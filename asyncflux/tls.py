@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Shared TLS contexts with session resumption"""
+import ssl
+
+from asyncflux.util import LRUCache
+
+
+class _ResumingSocket(ssl.SSLSocket):
+    """Reports its handshakes and sessions to its :class:`SessionContext`."""
+
+    def do_handshake(self, *args, **kwargs):
+        super(_ResumingSocket, self).do_handshake(*args, **kwargs)
+        self.context.record_handshake(self)
+
+    def close(self):
+        # TLS 1.3 tickets arrive after the handshake, so the session is
+        # stored again once the connection was used
+        self.context.store_session(self)
+        super(_ResumingSocket, self).close()
+
+
+class SessionContext(ssl.SSLContext):
+    """A client :class:`~ssl.SSLContext` that resumes TLS sessions.
+
+    The last session of every server is kept (up to ``max_sessions``
+    servers) and offered on the next connection to it, so reconnecting
+    skips the full handshake when the server accepts it. Handshakes are
+    counted as ``full`` or ``resumed``; share one context between clients
+    to share its sessions too.
+    """
+
+    MAX_SESSIONS = 256
+
+    sslsocket_class = _ResumingSocket
+
+    def __init__(self, protocol=None, max_sessions=None):
+        self.max_sessions = max_sessions or self.MAX_SESSIONS
+        self.__sessions = LRUCache(self.max_sessions)
+        self.__full = 0
+        self.__resumed = 0
+
+    def __new__(cls, protocol=None, max_sessions=None):
+        if protocol is None:
+            protocol = ssl.PROTOCOL_TLS_CLIENT
+        return super(SessionContext, cls).__new__(cls, protocol)
+
+    def wrap_socket(self, sock, *args, **kwargs):
+        hostname = kwargs.get('server_hostname')
+        if kwargs.get('session') is None and hostname is not None and \
+                not kwargs.get('server_side'):
+            kwargs['session'] = self.__sessions.get(hostname)
+        return super(SessionContext, self).wrap_socket(sock, *args, **kwargs)
+
+    def record_handshake(self, sock):
+        if sock.session_reused:
+            self.__resumed += 1
+        else:
+            self.__full += 1
+        self.store_session(sock)
+
+    def store_session(self, sock):
+        try:
+            session = sock.session
+        except (AttributeError, ValueError):
+            session = None
+        if session is not None and sock.server_hostname is not None:
+            self.__sessions.set(sock.server_hostname, session)
+
+    def clear_sessions(self):
+        self.__sessions.clear()
+
+    def statistics(self):
+        return {'full_handshakes': self.__full,
+                'resumed_handshakes': self.__resumed,
+                'sessions': len(self.__sessions)}
+
+
+def create_context(cafile=None, capath=None, cadata=None, max_sessions=None):
+    """Returns a :class:`SessionContext` verifying certificates against the
+    given CA certificates, or the default ones of the system."""
+    context = SessionContext(max_sessions=max_sessions)
+    if cafile or capath or cadata:
+        context.load_verify_locations(cafile, capath, cadata)
+    else:
+        context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+    return context
+
+
+_default_context = None
+
+
+def default_context():
+    """Returns the context shared by the secure clients not given one."""
+    global _default_context
+    if _default_context is None:
+        _default_context = create_context()
+    return _default_context
@@ -1,22 +1,63 @@
 # -*- coding: utf-8 -*-
 """Tools for database users"""
-from asyncflux.util import asyncflux_coroutine
+from tornado import gen
+
+from asyncflux.util import asyncflux_coroutine, set_from_raw
+
+TRACKED_ATTRIBUTES = ('is_admin', 'read_from', 'write_to')
 
 
 class User(object):
+    """A database user.
+
+    Assigning ``is_admin``, ``read_from`` or ``write_to`` (or calling
+    :meth:`set_password`) only changes the local object; the changes are
+    tracked and :meth:`save` sends all of them in a single request.
+
+    Users listed by :meth:`~asyncflux.database.Database.get_users` are
+    built with :meth:`from_raw`, reading their attributes from the response
+    row only when first accessed.
+    """
+
+    __slots__ = ('__database', '__name', '__is_admin', '__read_from',
+                 '__write_to', '__original', '__new_password', '__raw')
 
     IS_ADMIN = False
     READ_FROM = '.*'
     WRITE_TO = '.*'
 
+    _RAW_ATTRIBUTES = {'is_admin': '_User__is_admin',
+                       'read_from': '_User__read_from',
+                       'write_to': '_User__write_to'}
+
     def __init__(self, database, name, is_admin=None, read_from=None,
                  write_to=None):
         self.__database = database
-        self.__client = database.client
         self.__name = name
         self.__is_admin = is_admin or self.IS_ADMIN
         self.__read_from = read_from or self.READ_FROM
         self.__write_to = write_to or self.WRITE_TO
+        self.__original = None
+        self.__new_password = None
+        self.__raw = None
+
+    @classmethod
+    def from_raw(cls, database, raw):
+        """Builds a user out of a row of an InfluxDB response."""
+        self = cls.__new__(cls)
+        self.__database = database
+        self.__name = raw['name']
+        self.__original = None
+        self.__new_password = None
+        self.__raw = raw
+        return self
+
+    def __load(self):
+        raw, self.__raw = self.__raw, None
+        self.__is_admin = self.IS_ADMIN
+        self.__read_from = self.READ_FROM
+        self.__write_to = self.WRITE_TO
+        set_from_raw(self, raw, self._RAW_ATTRIBUTES)
 
     @property
     def database(self):
@@ -28,19 +69,103 @@ class User(object):
 
     @property
     def is_admin(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__is_admin
 
+    @is_admin.setter
+    def is_admin(self, value):
+        self.__track('is_admin', self.is_admin)
+        self.__is_admin = value
+
     @property
     def write_to(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__write_to
 
+    @write_to.setter
+    def write_to(self, value):
+        self.__track('write_to', self.write_to)
+        self.__write_to = value
+
     @property
     def read_from(self):
+        if self.__raw is not None:
+            self.__load()
         return self.__read_from
 
+    @read_from.setter
+    def read_from(self, value):
+        self.__track('read_from', self.read_from)
+        self.__read_from = value
+
+    def __track(self, name, current):
+        if self.__original is None:
+            self.__original = {}
+        self.__original.setdefault(name, current)
+
+    def set_password(self, new_password):
+        """Sets the password to send on the next :meth:`save`."""
+        self.__new_password = new_password
+
+    @property
+    def changes(self):
+        """The attributes changed since the last save, with their values."""
+        changes = dict((name, getattr(self, name)) for name, value in
+                       (self.__original or {}).items()
+                       if getattr(self, name) != value)
+        if self.__new_password is not None:
+            changes['password'] = self.__new_password
+        return changes
+
+    @property
+    def dirty(self):
+        return bool(self.changes)
+
+    def discard_changes(self):
+        """Reverts the local changes that haven't been saved."""
+        for name, value in (self.__original or {}).items():
+            setattr(self, '_User__%s' % name, value)
+        self.__original = None
+        self.__new_password = None
+
+    @asyncflux_coroutine
+    def save(self):
+        """Sends the tracked changes in a single request, if there are any.
+
+        Returns True if a request was made.
+        """
+        changes = self.changes
+        if not changes:
+            self.__original = None
+            raise gen.Return(False)
+        kwargs = {}
+        if 'password' in changes:
+            kwargs['new_password'] = changes['password']
+        if 'is_admin' in changes:
+            kwargs['is_admin'] = changes['is_admin']
+        if 'read_from' in changes or 'write_to' in changes:
+            kwargs['read_from'] = self.read_from
+            kwargs['write_to'] = self.write_to
+        original, new_password = self.__original, self.__new_password
+        self.__original, self.__new_password = None, None
+        try:
+            yield self.database.update_user(self.name, **kwargs)
+        except Exception:
+            # Keep the changes, along with those made in the meantime
+            for name, value in (original or {}).items():
+                self.__track(name, value)
+            if self.__new_password is None:
+                self.__new_password = new_password
+            raise
+        raise gen.Return(True)
+
     def __update_attributes(self, is_admin=None, read_from=None,
                             write_to=None):
-        if is_admin:
+        if self.__raw is not None:
+            self.__load()
+        if is_admin is not None:
             self.__is_admin = is_admin
         if read_from:
             self.__read_from = read_from
@@ -1,25 +1,83 @@
 # -*- coding: utf-8 -*-
 """General-purpose utilities"""
+import calendar
+import datetime
 import functools
+import importlib
 import re
+from collections import OrderedDict
 
 from tornado import gen
 
+from asyncflux import deadline
+
+
+class LazyModule(object):
+    """Stands for a module that is only imported when one of its attributes
+    is first accessed, keeping it out of the startup of the client."""
+
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attribute):
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name)
+        return getattr(self.__module, attribute)
+
+    def __repr__(self):
+        state = 'imported' if self.__module is not None else 'not imported'
+        return '<LazyModule %r (%s)>' % (self.__name, state)
+
+
+def _start(coro, args, kwargs, timeout, cancellation):
+    if timeout is None and cancellation is None:
+        return coro(*args, **kwargs)
+    return deadline.run_in_scope(coro, args, kwargs, timeout, cancellation)
+
+
+def _find_profiler(args):
+    """Returns the profiler of the client a method was called on, if any.
+
+    Databases, users, shard spaces and the like are followed through their
+    ``database`` and ``client`` properties.
+    """
+    if not args:
+        return None
+    owner = args[0]
+    for attribute in ('database', 'client'):
+        if isinstance(getattr(type(owner), attribute, None), property):
+            owner = getattr(owner, attribute)
+    return getattr(owner, '__dict__', {}).get('profiler')
+
 
 def asyncflux_coroutine(f):
     """A coroutine that accepts an optional callback.
 
     Given a callback, the function returns None, and the callback is run
     with (result, error). Without a callback the function returns a Future.
+    The optional ``timeout`` and ``cancellation`` arguments scope the call,
+    and all the calls nested in it, as described in
+    :mod:`asyncflux.deadline`.
     """
     coro = gen.coroutine(f)
+    name = getattr(f, '__qualname__', f.__name__)
 
     @functools.wraps(f)
     def wrapper(*args, **kwargs):
         callback = kwargs.pop('callback', None)
         if callback and not callable(callback):
             raise TypeError("callback must be a callable")
-        future = coro(*args, **kwargs)
+        timeout = kwargs.pop('timeout', None)
+        cancellation = kwargs.pop('cancellation', None)
+        profiler = _find_profiler(args)
+        if profiler is not None:
+            future = deadline.start_operation(profiler.run, name, _start,
+                                              coro, args, kwargs, timeout,
+                                              cancellation)
+        else:
+            future = deadline.start_operation(_start, coro, args, kwargs,
+                                              timeout, cancellation)
         if callback:
             def _callback(future):
                 try:
@@ -30,21 +88,127 @@ def asyncflux_coroutine(f):
             future.add_done_callback(_callback)
         else:
             return future
+    wrapper.is_asyncflux_coroutine = True
     return wrapper
 
+
+def is_asyncflux_coroutine(function):
+    return getattr(function, 'is_asyncflux_coroutine', False)
+
+
+@gen.coroutine
+def gather_bounded(tasks, concurrency, on_result=None):
+    """Runs the ``tasks`` callables with at most ``concurrency`` in flight.
+
+    Every task must return a yieldable. Results are returned in the order of
+    the tasks; when ``on_result`` is given, ``on_result(index, result)`` is
+    run as soon as each one of them is available instead, and results are
+    not kept.
+    """
+    tasks = list(tasks)
+    results = [None] * len(tasks)
+    pending = iter(enumerate(tasks))
+
+    @gen.coroutine
+    def worker():
+        for index, task in pending:
+            result = yield task()
+            if on_result is None:
+                results[index] = result
+            else:
+                on_result(index, result)
+
+    yield [worker() for _ in range(min(max(concurrency, 1), len(tasks)))]
+    raise gen.Return(results if on_result is None else None)
+
+
+def epoch_seconds(value):
+    """Converts a datetime (naive ones are taken as UTC) to epoch seconds."""
+    if isinstance(value, datetime.datetime):
+        return calendar.timegm(value.utctimetuple())
+    return int(value)
+
 _SNAKE_RE = re.compile('(?!^)([A-Z]+)')
+_SNAKE_CACHE = {}
+_SNAKE_CACHE_SIZE = 1024
 
 
 def snake_case(string):
-    return re.sub(_SNAKE_RE, r'_\1', string).lower()
+    """Converts a camelCase key to snake_case.
 
-
-def snake_case_dict(_dict):
-    raw_dict = _dict.copy()
-    result = {}
+    Conversions are memoized, since responses repeat the same few keys on
+    every row; the memo is bounded to ``_SNAKE_CACHE_SIZE`` keys.
+    """
     try:
-        while 1:
-            key, value = raw_dict.popitem()
-            result[snake_case(key)] = value
+        return _SNAKE_CACHE[string]
     except KeyError:
-        return result
+        pass
+    result = _SNAKE_RE.sub(r'_\1', string).lower()
+    if len(_SNAKE_CACHE) < _SNAKE_CACHE_SIZE:
+        _SNAKE_CACHE[string] = result
+    return result
+
+
+def snake_case_dict(_dict):
+    return dict((snake_case(key), value) for key, value in _dict.items())
+
+
+def set_from_raw(obj, raw, attributes):
+    """Sets attributes of ``obj`` from the camelCase keys of a raw response
+    row, without building an intermediate dict. ``attributes`` maps the
+    snake_case keys to the (mangled) attribute names; other keys and null
+    values are ignored."""
+    for key, value in raw.items():
+        attribute = attributes.get(snake_case(key))
+        if attribute is not None and value is not None:
+            setattr(obj, attribute, value)
+
+
+_DURATION_RE = re.compile(r'^(\d+)([smhdw]?)$')
+_DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400,
+                   'w': 604800}
+
+
+def parse_duration(string):
+    """Parses an InfluxDB duration string (e.g. ``7d``) into seconds.
+
+    Returns None for infinite durations.
+    """
+    if string in (None, '', 'inf'):
+        return None
+    match = _DURATION_RE.match(str(string).strip())
+    if not match:
+        raise ValueError('Invalid duration: %s' % string)
+    value, unit = match.groups()
+    return int(value) * _DURATION_UNITS[unit]
+
+
+class LRUCache(object):
+    """A minimal least-recently-used mapping with a fixed capacity."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.__data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self.__data.pop(key)
+        except KeyError:
+            return default
+        self.__data[key] = value
+        return value
+
+    def set(self, key, value):
+        self.__data.pop(key, None)
+        self.__data[key] = value
+        if len(self.__data) > self.capacity:
+            self.__data.popitem(last=False)
+
+    def clear(self):
+        self.__data.clear()
+
+    def __contains__(self, key):
+        return key in self.__data
+
+    def __len__(self):
+        return len(self.__data)
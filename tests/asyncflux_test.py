@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 """Test the asyncflux module itself."""
+import os
+import subprocess
+import sys
 import unittest
+
 import asyncflux
 
 
@@ -11,6 +15,22 @@ class TestAsyncflux(unittest.TestCase):
         c = asyncflux.AsyncfluxClient()
         self.assertIsNotNone(c)
 
+    @unittest.skipIf(sys.version_info < (3, 7), 'submodules are eager')
+    def test_lazy_submodules(self):
+        self.assertIs(asyncflux.__getattr__('client'),
+                      sys.modules['asyncflux.client'])
+        self.assertRaises(AttributeError, asyncflux.__getattr__, 'nope')
+        # A fresh interpreter loads submodules on attribute access
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output(
+            [sys.executable, '-c',
+             'import sys, asyncflux\n'
+             'loaded = "asyncflux.client" in sys.modules\n'
+             'print(loaded, asyncflux.client.__name__, '
+             'asyncflux.user.User.__name__)'], cwd=root)
+        self.assertEqual(output.decode('utf-8').split(),
+                         ['False', 'asyncflux.client', 'User'])
+
     def test_version_string(self):
         asyncflux.version_tuple = (0, 0, 0)
         self.assertEqual(asyncflux.get_version_string(), '0.0.0')
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+from tornado import gen
+from tornado.concurrent import Future
+
+from asyncflux.authcache import CLUSTER, AuthCache
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+
+class AuthCacheTestCase(AsyncfluxServerTestCase):
+
+    @gen.coroutine
+    def setup_database(self, client):
+        db = yield client.create_database('foo')
+        yield db.create_user('alice', 'secret')
+        raise gen.Return(db)
+
+    @gen_test
+    def test_cached_outcomes(self):
+        clock = [0]
+        cache = AuthCache(ttl=10, negative_ttl=2, clock=lambda: clock[0])
+        client = self.get_client(auth_cache=cache)
+        db = yield self.setup_database(client)
+        requests = self.server.requests
+
+        results = yield [db.authenticate_user('alice', 'secret')
+                         for _ in range(3)]
+        self.assertEqual(results, [True] * 3)
+        self.assertEqual(self.server.requests - requests, 1)
+        accepted = yield db.authenticate_user('alice', 'secret')
+        self.assertTrue(accepted)
+        rejected = yield db.authenticate_user('alice', 'wrong')
+        self.assertFalse(rejected)
+        rejected = yield db.authenticate_user('alice', 'wrong')
+        self.assertFalse(rejected)
+        self.assertEqual(self.server.requests - requests, 2)
+
+        clock[0] = 3
+        yield db.authenticate_user('alice', 'wrong')
+        yield db.authenticate_user('alice', 'secret')
+        self.assertEqual(self.server.requests - requests, 3)
+        clock[0] = 11
+        yield db.authenticate_user('alice', 'secret')
+        self.assertEqual(self.server.requests - requests, 4)
+        self.assertEqual(cache.statistics()['misses'], 4)
+
+    @gen_test
+    def test_invalidation(self):
+        cache = AuthCache()
+        client = self.get_client(auth_cache=cache)
+        db = yield self.setup_database(client)
+        accepted = yield db.authenticate_user('alice', 'secret')
+        self.assertTrue(accepted)
+
+        yield db.change_user_password('alice', 'changed')
+        accepted = yield db.authenticate_user('alice', 'secret')
+        self.assertFalse(accepted)
+        accepted = yield db.authenticate_user('alice', 'changed')
+        self.assertTrue(accepted)
+
+        yield db.delete_user('alice')
+        accepted = yield db.authenticate_user('alice', 'changed')
+        self.assertFalse(accepted)
+
+        yield client.create_cluster_admin('ops', 'secret')
+        accepted = yield client.authenticate_cluster_admin('ops', 'secret')
+        self.assertTrue(accepted)
+        self.assertTrue(cache.lookup(CLUSTER, 'ops', 'secret'))
+        yield client.delete_cluster_admin('ops')
+        self.assertIsNone(cache.lookup(CLUSTER, 'ops', 'secret'))
+        accepted = yield client.authenticate_cluster_admin('ops', 'secret')
+        self.assertFalse(accepted)
+
+        yield db.create_user('bob', 'secret')
+        yield db.authenticate_user('bob', 'secret')
+        self.assertTrue(cache.lookup('foo', 'bob', 'secret'))
+        yield db.delete()
+        self.assertIsNone(cache.lookup('foo', 'bob', 'secret'))
+
+    @gen_test
+    def test_creation_invalidates(self):
+        cache = AuthCache()
+        client = self.get_client(auth_cache=cache)
+        db = yield self.setup_database(client)
+        accepted = yield db.authenticate_user('bob', 'secret')
+        self.assertFalse(accepted)
+        self.assertFalse(cache.lookup('foo', 'bob', 'secret'))
+        yield db.create_user('bob', 'secret')
+        self.assertIsNone(cache.lookup('foo', 'bob', 'secret'))
+        accepted = yield db.authenticate_user('bob', 'secret')
+        self.assertTrue(accepted)
+
+        accepted = yield client.authenticate_cluster_admin('ops', 'secret')
+        self.assertFalse(accepted)
+        yield client.create_cluster_admin('ops', 'secret')
+        self.assertIsNone(cache.lookup(CLUSTER, 'ops', 'secret'))
+        accepted = yield client.authenticate_cluster_admin('ops', 'secret')
+        self.assertTrue(accepted)
+
+    @gen_test
+    def test_bounded_invalidations(self):
+        cache = AuthCache(max_size=2)
+
+        def check():
+            future = Future()
+            future.set_result(True)
+            return future
+        yield cache.authenticate('foo', 'alice', 'secret', check)
+        yield cache.authenticate('foo', 'bob', 'secret', check)
+        yield gen.moment
+        cache.invalidate('foo', 'alice')
+        self.assertIsNone(cache.lookup('foo', 'alice', 'secret'))
+        self.assertTrue(cache.lookup('foo', 'bob', 'secret'))
+        yield cache.authenticate('foo', 'alice', 'secret', check)
+        yield gen.moment
+        self.assertTrue(cache.lookup('foo', 'alice', 'secret'))
+
+        for i in range(100):
+            cache.invalidate('bar', 'user%d' % i)
+        self.assertEqual(cache.statistics()['invalidations'], 2)
+        # Entries older than the forgotten invalidations are dropped too
+        self.assertIsNone(cache.lookup('foo', 'alice', 'secret'))
+        self.assertIsNone(cache.lookup('foo', 'bob', 'secret'))
+        yield cache.authenticate('foo', 'alice', 'secret', check)
+        yield gen.moment
+        self.assertTrue(cache.lookup('foo', 'alice', 'secret'))
+
+    @gen_test
+    def test_transient_failures_are_not_cached(self):
+        cache = AuthCache()
+        client = self.get_client(auth_cache=cache)
+        db = yield self.setup_database(client)
+        self.server.inject_fault('reset', path='/db/foo/authenticate')
+        accepted = yield db.authenticate_user('alice', 'secret')
+        self.assertFalse(accepted)
+        self.assertIsNone(cache.lookup('foo', 'alice', 'secret'))
+        accepted = yield db.authenticate_user('alice', 'secret')
+        self.assertTrue(accepted)
+
+    @gen_test
+    def test_server_errors_are_not_cached(self):
+        cache = AuthCache()
+        client = self.get_client(auth_cache=cache)
+        db = yield self.setup_database(client)
+        self.server.inject_fault('error', path='/db/foo/authenticate')
+        accepted = yield db.authenticate_user('alice', 'secret')
+        self.assertFalse(accepted)
+        self.assertIsNone(cache.lookup('foo', 'alice', 'secret'))
+        requests = self.server.requests
+        accepted = yield db.authenticate_user('alice', 'secret')
+        self.assertTrue(accepted)
+        self.assertEqual(self.server.requests - requests, 1)
+        self.assertEqual(cache.statistics()['hits'], 0)
+
+    @gen_test
+    def test_no_plaintext(self):
+        cache = AuthCache()
+
+        def check():
+            future = Future()
+            future.set_result(True)
+            return future
+        accepted = yield cache.authenticate('foo', 'alice', 'hunter2', check)
+        yield gen.moment
+        self.assertTrue(accepted)
+        self.assertTrue(cache.lookup('foo', 'alice', 'hunter2'))
+        entries = cache._AuthCache__entries._LRUCache__data
+        self.assertEqual(len(entries), 1)
+        self.assertNotIn('hunter2', repr(entries))
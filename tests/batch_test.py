@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import json
+
+from tornado import gen
+from tornado.concurrent import Future
+
+from asyncflux import AsyncfluxClient
+from asyncflux.batch import BatchWriter
+from asyncflux.errors import ClientClosed
+from asyncflux.testing import AsyncfluxTestCase, gen_test
+
+
+class BatchWriterTestCase(AsyncfluxTestCase):
+
+    @gen_test
+    def test_flush(self):
+        client = AsyncfluxClient()
+        writer = BatchWriter(client['foo'], batch_size=10)
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            writer.add('cpu', ['value'], [[1], [2]])
+            writer.add('mem', ['value'], [[3]])
+            writer.add('cpu', ['value'], [[4]])
+            self.assertEqual(writer.pending, 4)
+            self.assertFalse(m.called)
+
+            yield writer.flush()
+            self.assertEqual(writer.pending, 0)
+            self.assert_mock_args(m, '/db/foo/series', method='POST',
+                                  body=json.dumps([
+                                      {'name': 'cpu', 'columns': ['value'],
+                                       'points': [[1], [2], [4]]},
+                                      {'name': 'mem', 'columns': ['value'],
+                                       'points': [[3]]}]))
+
+            yield writer.flush()
+            self.assertEqual(m.call_count, 1)
+
+    @gen_test
+    def test_batch_size_and_interval(self):
+        client = AsyncfluxClient()
+        errors = []
+        writer = BatchWriter(client['foo'], batch_size=2,
+                             flush_interval=0.01,
+                             on_error=lambda e, data: errors.append(data))
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            writer.add('cpu', ['value'], [[1], [2]])
+            self.assertEqual(writer.pending, 0)
+            writer.add('cpu', ['value'], [[3]])
+            yield gen.sleep(0.05)
+            self.assertEqual(m.call_count, 2)
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 500, body='Internal error')
+            writer.add('cpu', ['value'], [[1], [2]])
+            yield writer.flush()
+            self.assertEqual(len(errors), 1)
+            self.assertEqual(errors[0][0]['points'], [[1], [2]])
+
+    @gen_test
+    def test_close(self):
+        client = AsyncfluxClient()
+        errors = []
+        writer = BatchWriter(client['foo'],
+                             on_error=lambda e, data: errors.append(data))
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            writer.add('cpu', ['value'], [[1], [2]])
+            unwritten = yield writer.close()
+            self.assertEqual(unwritten, [])
+            self.assertEqual(m.call_count, 1)
+        self.assertTrue(writer.closed)
+        self.assertRaises(ClientClosed, writer.add, 'cpu', ['value'], [[3]])
+
+        writer = BatchWriter(client['foo'],
+                             on_error=lambda e, data: errors.append(data))
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 500, body='Internal error')
+            writer.add('cpu', ['value'], [[1], [2]])
+            unwritten = yield writer.close()
+        self.assertEqual(unwritten, [{'name': 'cpu', 'columns': ['value'],
+                                      'points': [[1], [2]]}])
+        self.assertEqual(errors, [])
+
+    def test_abandon(self):
+        client = AsyncfluxClient()
+        writer = BatchWriter(client['foo'], batch_size=2)
+        with self.patch_fetch_mock(client) as m:
+            m.return_value = Future()
+            writer.add('cpu', ['value'], [[1], [2]])
+            writer.add('mem', ['value'], [[3]])
+            self.assertEqual(m.call_count, 1)
+        # Both the buffered points and the ones being written are returned
+        self.assertEqual(sorted(s['name'] for s in writer.abandon()),
+                         ['cpu', 'mem'])
+        self.assertTrue(writer.closed)
+        self.assertEqual(writer.abandon(), [])
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPRequest, HTTPResponse
+from tornado.testing import bind_unused_port
+
+from asyncflux import AsyncfluxClient
+from asyncflux.breaker import (BreakerRegistry, CircuitBreaker, CLOSED,
+                               HALF_OPEN, OPEN)
+from asyncflux.deadline import Cancellation
+from asyncflux.errors import (AsyncfluxError, CircuitOpenError,
+                              RequestCancelled)
+from asyncflux.testing import AsyncfluxTestCase, gen_test
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.time = 0
+
+    def __call__(self):
+        return self.time
+
+
+class CircuitBreakerTestCase(AsyncfluxTestCase):
+
+    def test_states(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=5,
+                                 clock=clock)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+        # Half-open lets a single trial through
+        clock.time = 5
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+        clock.time = 10
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+
+        stats = breaker.statistics()
+        self.assertEqual(stats['state'], CLOSED)
+        self.assertEqual(stats['failures'], 4)
+        self.assertEqual(stats['successes'], 2)
+        self.assertEqual(stats['short_circuited'], 2)
+        self.assertEqual(stats['opened'], 2)
+
+    def test_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5,
+                                 clock=clock)
+        probes = []
+        breaker.record_failure()
+        clock.time = 5
+        self.assertFalse(breaker.allow(lambda: probes.append(1)))
+        self.assertFalse(breaker.allow(lambda: probes.append(1)))
+        self.assertEqual(probes, [1])
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+
+
+class ClientBreakerTestCase(AsyncfluxTestCase):
+
+    @gen_test
+    def test_short_circuit(self):
+        clock = FakeClock()
+        breakers = BreakerRegistry(failure_threshold=2, reset_timeout=5,
+                                   clock=clock)
+        client = AsyncfluxClient(circuit_breaker=breakers)
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 500, body='Internal error')
+            for _ in range(2):
+                with self.assertRaises(AsyncfluxError):
+                    yield client.get_database_names()
+            self.assertEqual(m.call_count, 2)
+
+            with self.assertRaisesRegexp(CircuitOpenError,
+                                         'Circuit open for localhost:8086'):
+                yield client.get_databases()
+            self.assertEqual(m.call_count, 2)
+
+        # Client errors don't open the breaker
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 400, body='Bad request')
+            with self.assertRaises(CircuitOpenError):
+                yield client['foo'].get_users()
+
+        statistics = client.get_statistics()
+        self.assertEqual(statistics['requests'], 2)
+        self.assertEqual(statistics['failures'], 2)
+        self.assertEqual(statistics['short_circuited'], 2)
+        self.assertEqual(statistics['breakers']['localhost:8086']['state'],
+                         OPEN)
+        self.assertEqual(
+            statistics['breakers']['localhost:8086/db']['state'], OPEN)
+
+        # The node is probed with ping() and the route with a trial request
+        clock.time = 5
+        probe_future = Future()
+        with self.patch_fetch_mock(client) as m:
+            m.return_value = probe_future
+            with self.assertRaises(CircuitOpenError):
+                yield client.get_database_names()
+            self.assert_mock_args(m, '/ping')
+            probe_future.set_result(HTTPResponse(HTTPRequest('/ping'), 204))
+            yield gen.moment
+        self.assertEqual(
+            client.get_statistics()['breakers']['localhost:8086']['state'],
+            CLOSED)
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200, body=[{'name': 'foo'}])
+            response = yield client.get_database_names()
+            self.assertEqual(response, ['foo'])
+            self.assertEqual(
+                client.get_statistics()['breakers']['localhost:8086/db'][
+                    'state'], CLOSED)
+
+    @gen_test
+    def test_connection_refused(self):
+        sock, port = bind_unused_port()
+        sock.close()
+        breakers = BreakerRegistry(failure_threshold=2)
+        client = AsyncfluxClient('127.0.0.1', port, circuit_breaker=breakers)
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                yield client.get_database_names()
+        with self.assertRaises(CircuitOpenError):
+            yield client.get_database_names()
+        statistics = client.get_statistics()
+        self.assertEqual(statistics['failures'], 2)
+        self.assertEqual(
+            statistics['breakers']['127.0.0.1:%d' % port]['state'], OPEN)
+
+    @gen_test
+    def test_failed_probe(self):
+        clock = FakeClock()
+        breakers = BreakerRegistry(failure_threshold=1, reset_timeout=5,
+                                   clock=clock)
+        client = AsyncfluxClient(circuit_breaker=breakers)
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 500, body='Internal error')
+            with self.assertRaises(AsyncfluxError):
+                yield client.get_database_names()
+
+        # The probe fails with a transport error: the node opens again
+        clock.time = 5
+        with self.patch_fetch_mock(client) as m:
+            m.side_effect = lambda *args, **kwargs: self.failed_future(
+                ConnectionRefusedError())
+            with self.assertRaises(CircuitOpenError):
+                yield client.get_database_names()
+            yield gen.moment
+            yield gen.moment
+        node = client.get_statistics()['breakers']['localhost:8086']
+        self.assertEqual(node['state'], OPEN)
+
+        # and is probed again once the node recovers
+        clock.time = 10
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200, body=[{'name': 'foo'}])
+            response = yield client.get_database_names()
+            self.assertEqual(response, ['foo'])
+
+    @gen_test
+    def test_cancelled_trial(self):
+        clock = FakeClock()
+        breakers = BreakerRegistry(failure_threshold=1, reset_timeout=5,
+                                   clock=clock)
+        client = AsyncfluxClient(circuit_breaker=breakers)
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 500, body='Internal error')
+            with self.assertRaises(AsyncfluxError):
+                yield client['foo'].get_users()
+        route = breakers.get('localhost:8086', '/db/%(database)s/users')
+        node = breakers.get('localhost:8086')
+        node.record_success()
+        self.assertEqual(route.state, OPEN)
+
+        # The half-open trial is cancelled: it gives back its slot
+        clock.time = 5
+        cancellation = Cancellation()
+        with self.patch_fetch_mock(client) as m:
+            m.return_value = Future()
+            future = client['foo'].get_users(cancellation=cancellation)
+            cancellation.cancel()
+            with self.assertRaises(RequestCancelled):
+                yield future
+        self.assertEqual(route.state, HALF_OPEN)
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200, body=[{'name': 'bar'}])
+            users = yield client['foo'].get_users()
+        self.assertEqual([u.name for u in users], ['bar'])
+        self.assertEqual(route.state, CLOSED)
+
+    def failed_future(self, error):
+        future = Future()
+        future.set_exception(error)
+        return future
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 import json
 
+import mock
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient
+
 from asyncflux import AsyncfluxClient
 from asyncflux.clusteradmin import ClusterAdmin
 from asyncflux.database import Database
-from asyncflux.testing import AsyncfluxTestCase, gen_test
-from asyncflux.errors import AsyncfluxError
+from asyncflux.testing import (AsyncfluxServerTestCase, AsyncfluxTestCase,
+                               gen_test)
+from asyncflux.batch import BatchWriter
+from asyncflux.errors import AsyncfluxError, ClientClosed
+from asyncflux.util import asyncflux_coroutine
 
 
 class AsyncfluxClientTestCase(AsyncfluxTestCase):
@@ -441,3 +448,177 @@ class AsyncfluxClientTestCase(AsyncfluxTestCase):
         port = 8086
         self.assertEqual(repr(AsyncfluxClient(str(host), port)),
                          "AsyncfluxClient('%s', %d)" % (host, port))
+
+
+class WarmUpTestCase(AsyncfluxServerTestCase):
+
+    @gen_test
+    def test_warm_up(self):
+        client = self.get_client()
+        report = yield client.warm_up(3)
+        self.assertEqual(report['node'], client.node)
+        self.assertEqual(report['probes'], 3)
+        self.assertEqual(report['concurrency'], 3)
+        self.assertFalse(report['pooled'])
+        self.assertEqual(report['succeeded'], 3)
+        self.assertEqual(report['errors'], 0)
+        self.assertIsNone(report['last_error'])
+        self.assertGreaterEqual(report['elapsed'], 0)
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(client.get_statistics()['warm_up'], report)
+
+    @gen_test
+    def test_warm_up_failures(self):
+        client = self.get_client()
+        self.server.inject_fault('error', count=1, path='/ping')
+        report = yield client.warm_up(2)
+        self.assertEqual(report['succeeded'], 1)
+        self.assertEqual(report['errors'], 1)
+        self.assertIn('AsyncfluxError', report['last_error'])
+
+    @gen_test
+    def test_warm_connections_hold_back_requests(self):
+        client = self.get_client(warm_connections=2)
+        fetch = client.http_client.fetch
+        fetched = []
+
+        def record(url, **kwargs):
+            fetched.append((url[len(client.base_url):],
+                            'warm_up' in client.get_statistics()))
+            return fetch(url, **kwargs)
+
+        with mock.patch.object(client.http_client, 'fetch',
+                               side_effect=record):
+            names = yield client.get_database_names()
+        self.assertEqual(names, [])
+        # The request was only sent once the warm-up was done
+        self.assertEqual(fetched, [('/db', True)])
+        self.assertEqual(client.get_statistics()['warm_up']['succeeded'], 2)
+
+    @gen_test
+    def test_warm_up_bypasses_lanes(self):
+        client = self.get_client(lanes=True)
+        client.http_client = AsyncHTTPClient(force_instance=True,
+                                             max_clients=4)
+        self.addCleanup(client.http_client.close)
+        self.server.latency = 0.05
+        report = yield client.warm_up(6)
+        self.assertEqual(report['concurrency'], 4)
+        self.assertEqual(report['succeeded'], 6)
+        control = client.get_statistics()['lanes']['control']
+        self.assertEqual(control['admitted'], 0)
+        self.assertEqual(control['queued'], 0)
+
+
+class CloseTestCase(AsyncfluxServerTestCase):
+
+    @gen.coroutine
+    def get_writers(self, client, *names):
+        writers = []
+        for name in names:
+            yield client.create_database(name)
+            writer = BatchWriter(client[name], batch_size=100)
+            writer.add('cpu', ['value'], [[1], [2]])
+            writers.append(writer)
+        raise gen.Return(writers)
+
+    @gen_test
+    def test_close(self):
+        client = self.get_client()
+        writers = yield self.get_writers(client, 'foo', 'bar')
+        future = client.close(deadline=5)
+        self.assertIs(client.close(), future)
+        self.assertTrue(client.closed)
+        with self.assertRaises(ClientClosed):
+            yield client.ping()
+
+        report = yield future
+        self.assertFalse(report['timed_out'])
+        self.assertEqual(report['batch_writers'], 2)
+        self.assertEqual(report['spilled_points'], 0)
+        self.assertEqual(report['abandoned_requests'], 0)
+        self.assertEqual(self.server.points_written, 4)
+        for writer in writers:
+            self.assertTrue(writer.closed)
+            self.assertRaises(ClientClosed, writer.add, 'cpu', ['value'],
+                              [[3]])
+        with self.assertRaises(ClientClosed):
+            yield client.get_database_names()
+
+    @gen_test
+    def test_calls_started_before_close(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        yield db.write_points([{'name': 'cpu', 'columns': ['time', 'value'],
+                                'points': [[5, 1], [15, 2], [25, 3]]}],
+                              time_precision='s')
+        self.server.latency = 0.01
+        # One time range at a time, so two requests are sent after close
+        query = db.query('select value from cpu', time_precision='s',
+                         start=0, end=30, splits=3, concurrency=1)
+        yield gen.moment
+        report = yield client.close()
+        result = yield query
+        self.assertEqual(sorted(p[-1] for p in result[0]['points']),
+                         [1, 2, 3])
+        self.assertEqual(report['operations'], 1)
+        self.assertEqual(report['admitted_requests'], 2)
+        self.assertEqual(report['abandoned_operations'], 0)
+        with self.assertRaises(ClientClosed):
+            yield db.query('select value from cpu')
+
+    @gen_test
+    def test_close_from_a_call(self):
+        client = self.get_client()
+
+        @asyncflux_coroutine
+        def shutdown():
+            yield client.ping()
+            report = yield client.close(deadline=5)
+            raise gen.Return(report)
+
+        report = yield shutdown()
+        self.assertFalse(report['timed_out'])
+        self.assertEqual(report['operations'], 0)
+
+    @gen_test
+    def test_abandoned_calls(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        self.server.latency = 0.2
+        query = db.query('select value from cpu', start=0, end=30,
+                         splits=3, concurrency=1)
+        yield gen.moment
+        report = yield client.close(deadline=0.1)
+        self.assertTrue(report['timed_out'])
+        self.assertEqual(report['operations'], 1)
+        self.assertEqual(report['abandoned_operations'], 1)
+        with self.assertRaises(Exception):
+            yield query
+
+    @gen_test
+    def test_spill_failed_writes(self):
+        spilled = []
+        client = self.get_client(
+            spill_sink=lambda name, data: spilled.append((name, data)))
+        yield self.get_writers(client, 'foo')
+        self.server.inject_fault('error', path='/series')
+        report = yield client.close()
+        self.assertEqual(report['spilled_points'], 2)
+        self.assertEqual(spilled, [('foo', [{'name': 'cpu',
+                                             'columns': ['value'],
+                                             'points': [[1], [2]]}])])
+
+    @gen_test
+    def test_spill_on_deadline(self):
+        spilled = []
+        client = self.get_client(
+            spill_sink=lambda name, data: spilled.append((name, data)))
+        yield self.get_writers(client, 'foo')
+        self.server.latency = 1
+        started = self.io_loop.time()
+        report = yield client.close(deadline=0.1)
+        self.assertLess(self.io_loop.time() - started, 0.5)
+        self.assertTrue(report['timed_out'])
+        self.assertEqual(report['spilled_points'], 2)
+        self.assertEqual([name for name, _ in spilled], ['foo'])
@@ -1,10 +1,21 @@
 # -*- coding: utf-8 -*-
+import datetime
 import json
+try:
+    from StringIO import StringIO
+    from urlparse import parse_qs, urlparse
+except ImportError:  # pragma: no cover
+    from io import StringIO  # pragma: no cover
+    from urllib.parse import parse_qs, urlparse  # pragma: no cover
+
+from tornado.gen import coroutine, Return
+from tornado.httpclient import HTTPRequest, HTTPResponse
 
 from asyncflux import AsyncfluxClient
 from asyncflux.database import Database
 from asyncflux.errors import AsyncfluxError
-from asyncflux.testing import AsyncfluxTestCase, gen_test
+from asyncflux.testing import (AsyncfluxServerTestCase, AsyncfluxTestCase,
+                               gen_test)
 from asyncflux.user import User
 
 
@@ -225,6 +236,15 @@ class DatabaseTestCase(AsyncfluxTestCase):
             self.assert_mock_args(m, '/db/%s/users/%s' % (db_name, username),
                                   method='POST', body=json.dumps(payload))
 
+        # Revoke admin privileges
+        payload = {'isAdmin': False}
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield db.update_user(username, is_admin=False)
+
+            self.assert_mock_args(m, '/db/%s/users/%s' % (db_name, username),
+                                  method='POST', body=json.dumps(payload))
+
         # Update permissions
         payload = {'readFrom': read_from, 'writeTo': write_to}
         with self.patch_fetch_mock(client) as m:
@@ -437,6 +457,148 @@ class DatabaseTestCase(AsyncfluxTestCase):
                                   auth_username=username,
                                   auth_password=password)
 
+    @gen_test
+    def test_write_points(self):
+        client = AsyncfluxClient()
+        db_name = 'foo'
+        db = client[db_name]
+        data = [{'name': 'cpu', 'columns': ['time', 'value'],
+                 'points': [[1400000000, 1], [1400000001, 2]]}]
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            response = yield db.write_points(data)
+            self.assertIsNone(response)
+
+            self.assert_mock_args(m, '/db/%s/series' % db_name, method='POST',
+                                  body=json.dumps(data))
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield db.write_points(data, time_precision='s')
+
+            self.assert_mock_args(m, '/db/%s/series?time_precision=s' %
+                                  db_name, method='POST',
+                                  body=json.dumps(data))
+
+    @gen_test
+    def test_write_points_datetimes(self):
+        client = AsyncfluxClient(time_precision='s')
+        db = client['foo']
+        data = [{'name': 'cpu', 'columns': ['time', 'value'],
+                 'points': [[datetime.datetime(2014, 5, 13, 16, 53, 20), 1],
+                            [1400000001, 2]]}]
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield db.write_points(data)
+
+            expected = [{'name': 'cpu', 'columns': ['time', 'value'],
+                         'points': [[1400000000, 1], [1400000001, 2]]}]
+            self.assert_mock_args(m, '/db/foo/series?time_precision=s',
+                                  method='POST', body=json.dumps(expected))
+            self.assertIsInstance(data[0]['points'][0][0], datetime.datetime)
+
+        with self.assertRaises(ValueError):
+            yield db.write_points(data, time_precision='ns')
+        with self.assertRaises(ValueError):
+            yield db.query('select * from cpu', time_precision='m')
+        self.assertRaises(ValueError, AsyncfluxClient, time_precision='us')
+
+    @gen_test
+    def test_write_points_partitioned(self):
+        client = AsyncfluxClient()
+        db_name = 'foo'
+        db = client[db_name]
+        shard_spaces = [{'name': 'default', 'database': db_name,
+                         'regex': '/.*/', 'retentionPolicy': 'inf',
+                         'shardDuration': '1h', 'replicationFactor': 1,
+                         'split': 1}]
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200, body=shard_spaces)
+            yield client.load_shard_partitioner()
+
+        data = [{'name': 'cpu', 'columns': ['time', 'value'],
+                 'points': [[3599, 1], [3600, 2], [3601, 3]]}]
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield db.write_points(data, time_precision='s')
+
+            self.assertEqual(m.call_count, 2)
+            bodies = [json.loads(c[1]['body']) for c in m.call_args_list]
+            self.assertEqual(bodies[0][0]['points'], [[3599, 1]])
+            self.assertEqual(bodies[1][0]['points'], [[3600, 2], [3601, 3]])
+
+    @gen_test
+    def test_query(self):
+        client = AsyncfluxClient()
+        db_name = 'foo'
+        db = client[db_name]
+        query = 'select * from cpu'
+        series = [{'name': 'cpu', 'columns': ['time', 'value'],
+                   'points': [[1400000001, 2], [1400000000, 1]]}]
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200, body=series)
+            response = yield db.query(query, time_precision='s')
+            self.assertEqual(response, series)
+
+            self.assert_mock_args(m, '/db/%s/series?q=select+%%2A+from+cpu'
+                                  '&time_precision=s' % db_name)
+
+    @gen_test
+    def test_query_splits(self):
+        client = AsyncfluxClient()
+        db = client['foo']
+        query = 'select * from cpu'
+
+        @coroutine
+        def side_effect(url, **_):
+            q = parse_qs(urlparse(url).query)['q'][0]
+            start = int(q.split('time >= ')[1].split('s')[0])
+            body = json.dumps([{'name': 'cpu', 'columns': ['time', 'value'],
+                                'points': [[start + 1, 1], [start, 0]]}])
+            raise Return(HTTPResponse(HTTPRequest(url), 200,
+                                      buffer=StringIO(body)))
+
+        with self.patch_fetch_mock(client) as m:
+            m.side_effect = side_effect
+            response = yield db.query(query, start=0, end=40, splits=4,
+                                      concurrency=2)
+            self.assertEqual(m.call_count, 4)
+            self.assertEqual(response[0]['points'],
+                             [[31, 1], [30, 0], [21, 1], [20, 0],
+                              [11, 1], [10, 0], [1, 1], [0, 0]])
+
+            chunks = []
+            response = yield db.query(query + ' order asc', start=0, end=40,
+                                      splits=2, shard_duration='10s',
+                                      streaming_callback=chunks.append)
+            self.assertIsNone(response)
+            self.assertEqual([c[0]['points'] for c in chunks],
+                             [[[1, 1], [0, 0]], [[21, 1], [20, 0]]])
+
+            m.reset_mock()
+            yield db.query('select mean(value) from cpu group by time(20s)',
+                           start=0, end=70, splits=4)
+            queries = sorted(parse_qs(urlparse(c[0][0]).query)['q'][0]
+                             for c in m.call_args_list)
+            self.assertEqual(queries, [
+                'select mean(value) from cpu where time >= 0s and '
+                'time < 20s group by time(20s)',
+                'select mean(value) from cpu where time >= 20s and '
+                'time < 40s group by time(20s)',
+                'select mean(value) from cpu where time >= 40s and '
+                'time < 70s group by time(20s)'])
+
+        with self.assertRaisesRegexp(ValueError, 'provide start and end'):
+            yield db.query(query, splits=2)
+        with self.assertRaisesRegexp(ValueError, 'limit'):
+            yield db.query(query + ' limit 10', start=0, end=40, splits=2)
+        with self.assertRaisesRegexp(ValueError, 'grouped by time'):
+            yield db.query('select count(value) from cpu', start=0, end=40,
+                           splits=2)
+
     def test_repr(self):
         host = 'localhost'
         port = 8086
@@ -445,3 +607,50 @@ class DatabaseTestCase(AsyncfluxTestCase):
         self.assertEqual(repr(Database(client, db_name)),
                          ("Database(AsyncfluxClient('%s', %d), '%s')" %
                           (host, port, db_name)))
+
+
+class SyncUsersTestCase(AsyncfluxServerTestCase):
+
+    @gen_test
+    def test_sync_users(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        yield db.create_user('alice', 'secret', is_admin=True)
+        yield db.create_user('bob', 'secret', read_from='^cpu$',
+                             write_to='^cpu$')
+        yield db.create_user('carol', 'secret')
+        desired = [{'name': 'alice'},
+                   {'name': 'bob', 'read_from': '^cpu$', 'write_to': '^cpu$'},
+                   {'name': 'dave', 'password': 'secret', 'is_admin': True},
+                   {'name': 'carol', 'password': 'changed',
+                    'read_from': '.*', 'write_to': '^$'}]
+
+        report = yield db.sync_users(desired, dry_run=True)
+        self.assertEqual(len(self.server.databases['foo'].users), 3)
+        self.assertEqual(
+            dict((name, r['action']) for name, r in report.items()),
+            {'alice': 'update', 'bob': None, 'carol': 'update',
+             'dave': 'create'})
+        self.assertEqual(report['alice']['changes'], ['is_admin'])
+        self.assertEqual(report['carol']['changes'], ['read_from',
+                                                      'write_to'])
+
+        requests = self.server.requests
+        report = yield db.sync_users(desired[:3], update_passwords=True,
+                                     concurrency=2)
+        # One listing plus alice, carol and dave
+        self.assertEqual(self.server.requests - requests, 4)
+        self.assertEqual(report['carol']['action'], 'delete')
+        self.assertFalse([r for r in report.values() if r['error']])
+        users = dict((u.name, u) for u in (yield db.get_users()))
+        self.assertEqual(sorted(users), ['alice', 'bob', 'dave'])
+        self.assertFalse(users['alice'].is_admin)
+        self.assertTrue(users['dave'].is_admin)
+        authenticated = yield db.authenticate_user('dave', 'secret')
+        self.assertTrue(authenticated)
+
+        with self.assertRaisesRegexp(ValueError, 'password is required'):
+            yield db.sync_users([{'name': 'erin'}])
+        with self.assertRaises(ValueError):
+            yield db.sync_users([{'name': 'erin', 'password': 'x',
+                                  'read_from': '.*'}])
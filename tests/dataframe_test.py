@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import mock
+
+from asyncflux.batch import BatchWriter
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+@unittest.skipIf(pandas is None, 'pandas is not installed')
+class DataFrameTestCase(AsyncfluxServerTestCase):
+
+    @gen_test
+    def test_write_and_query(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        index = pandas.date_range('2014-05-13 16:53:20', periods=5,
+                                  freq='s', tz='UTC')
+        frame = pandas.DataFrame({'value': [1.5, None, 3.0, 4.0, 5.0],
+                                  'host': ['a', 'b', 'a', 'b', 'a']},
+                                 index=index, columns=['value', 'host'])
+        yield db.write_dataframe(frame, 'cpu', time_precision='s',
+                                 chunk_size=2)
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(self.server.points_written, 5)
+
+        frames = yield db.query_dataframe('select value, host from cpu',
+                                          time_precision='s')
+        result = frames['cpu'].sort_index()
+        self.assertEqual(list(result.index), list(index))
+        self.assertEqual(list(result['host']), ['a', 'b', 'a', 'b', 'a'])
+        self.assertTrue(pandas.isnull(result['value'].iloc[1]))
+
+    @gen_test
+    def test_default_chunk_size(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        frame = pandas.DataFrame({'value': range(12)})
+        requests = self.server.requests
+        with mock.patch.object(BatchWriter, 'BATCH_SIZE', 5):
+            yield db.write_dataframe(frame, 'cpu')
+        self.assertEqual(self.server.requests - requests, 3)
+        self.assertEqual(self.server.points_written, 12)
+
+    @gen_test
+    def test_datetime_columns(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        index = pandas.date_range('2014-05-13 16:53:20', periods=2,
+                                  freq='s', tz='UTC')
+        frame = pandas.DataFrame(
+            {'value': [1, 2],
+             'seen': [pandas.Timestamp('2014-05-13 16:00:00', tz='UTC'),
+                      None],
+             'booted': pandas.to_datetime(['2014-05-13 15:00:00',
+                                           '2014-05-13 15:00:01'])},
+            index=index, columns=['value', 'seen', 'booted'])
+        yield db.write_dataframe(frame, 'cpu', time_precision='s')
+        result = yield db.query('select value, seen, booted from cpu',
+                                time_precision='s')
+        points = sorted(result[0]['points'])
+        columns = result[0]['columns']
+        self.assertEqual(
+            [[p[columns.index(c)] for c in ('time', 'seen', 'booted')]
+             for p in points],
+            [[1400000000, 1399996800, 1399993200],
+             [1400000001, None, 1399993201]])
+
+        # Without a datetime index, a time column is written as it is
+        frame = pandas.DataFrame({'time': index, 'value': [3, 4]})
+        yield db.write_dataframe(frame, 'mem', time_precision='s')
+        result = yield db.query('select value from mem', time_precision='s')
+        self.assertEqual(sorted(p[0] for p in result[0]['points']),
+                         [1400000000, 1400000001])
+
+    @gen_test
+    def test_duplicate_time_column(self):
+        db = self.get_client()['foo']
+        index = pandas.date_range('2014-05-13 16:53:20', periods=2,
+                                  freq='s', tz='UTC')
+        frame = pandas.DataFrame({'time': [1, 2], 'value': [1, 2]},
+                                 index=index)
+        with self.assertRaisesRegexp(ValueError, 'time column'):
+            yield db.write_dataframe(frame, 'cpu')
+
+
+@unittest.skipIf(pandas is not None, 'pandas is installed')
+class MissingPandasTestCase(AsyncfluxServerTestCase):
+
+    @gen_test
+    def test_import_error(self):
+        db = self.get_client()['foo']
+        with self.assertRaises(ImportError):
+            yield db.write_dataframe(object(), 'cpu')
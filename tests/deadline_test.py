@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPError
+from tornado.httputil import HTTPInputError
+
+from asyncflux import AsyncfluxClient
+from asyncflux.deadline import Cancellation, current_operation
+from asyncflux.errors import (AsyncfluxError, DeadlineExceeded,
+                              RequestCancelled)
+from asyncflux.testing import (AsyncfluxServerTestCase, AsyncfluxTestCase,
+                               gen_test)
+from asyncflux.user import User
+from asyncflux.util import asyncflux_coroutine
+
+
+class DeadlineTestCase(AsyncfluxTestCase):
+
+    @gen_test
+    def test_client_timeouts(self):
+        client = AsyncfluxClient(connect_timeout=1, request_timeout=5)
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield client.ping()
+
+            self.assert_mock_args(m, '/ping', connect_timeout=1,
+                                  request_timeout=5)
+
+    @gen_test
+    def test_deadline_propagation(self):
+        client = AsyncfluxClient(request_timeout=5)
+        user = User(client['foo'], 'bar')
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield user.update(new_password='fubar', timeout=0.2)
+
+            kwargs = m.call_args[1]
+            self.assertTrue(0 < kwargs['connect_timeout'] <= 0.2)
+            self.assertTrue(0 < kwargs['request_timeout'] <= 0.2)
+
+        # Inner timeouts can't extend the outer deadline
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield client.ping(timeout=0.5)
+
+            self.assertTrue(m.call_args[1]['request_timeout'] <= 0.5)
+            self.assertFalse(m.call_args[1]['request_timeout'] <= 0.2)
+
+        with self.patch_fetch_mock(client) as m:
+            with self.assertRaises(DeadlineExceeded):
+                yield user.update(new_password='fubar', timeout=0)
+            self.assertFalse(m.called)
+
+    @gen_test
+    def test_timeout_error(self):
+        client = AsyncfluxClient()
+
+        with self.patch_fetch_mock(client) as m:
+            m.side_effect = HTTPError(599, 'Timeout during request')
+            with self.assertRaisesRegexp(DeadlineExceeded, 'Timeout'):
+                yield client.ping()
+
+    @gen_test
+    def test_cancellation(self):
+        client = AsyncfluxClient()
+        cancellation = Cancellation()
+        fetch_future = Future()
+
+        with self.patch_fetch_mock(client) as m:
+            m.return_value = fetch_future
+            future = client.get_databases(cancellation=cancellation)
+            self.assertFalse(future.done())
+
+            header_callback = m.call_args[1]['header_callback']
+            header_callback('HTTP/1.1 200 OK\r\n')
+            cancellation.cancel()
+            # Closes the connection without an error being logged
+            self.assertRaises(HTTPInputError, header_callback,
+                              'HTTP/1.1 200 OK\r\n')
+            with self.assertRaises(RequestCancelled):
+                yield future
+            fetch_future.set_exception(RequestCancelled())
+
+        # Already cancelled handles fail without any request
+        with self.patch_fetch_mock(client) as m:
+            with self.assertRaises(RequestCancelled):
+                yield client.ping(cancellation=cancellation)
+            self.assertFalse(m.called)
+
+    @gen_test
+    def test_cancellation_streamed_body(self):
+        client = AsyncfluxClient()
+        cancellation = Cancellation()
+        fetch_future = Future()
+
+        with self.patch_fetch_mock(client) as m:
+            m.return_value = fetch_future
+            future = client.get_database_names(cancellation=cancellation)
+            streaming_callback = m.call_args[1]['streaming_callback']
+            streaming_callback(b'[{"name": ')
+            streaming_callback(b'"foo"}]')
+            fetch_future.set_result(None)
+            response = yield future
+            self.assertEqual(response, ['foo'])
+
+    @gen_test
+    def test_operations(self):
+        client = AsyncfluxClient()
+        operations = []
+
+        @asyncflux_coroutine
+        def ping_twice():
+            yield client.ping()
+            yield client.ping()
+
+        self.assertIsNone(current_operation())
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            respond = m.side_effect
+
+            def fetch(*args, **kwargs):
+                operations.append(current_operation())
+                return respond(*args, **kwargs)
+            m.side_effect = fetch
+            yield ping_twice()
+            yield client.ping()
+        self.assertIsNone(current_operation())
+        # Nested calls belong to the operation of the outermost one
+        first, nested, last = operations
+        self.assertIs(first, nested)
+        self.assertTrue(first.done)
+        self.assertTrue(last.done)
+        self.assertLess(first.sequence, last.sequence)
+
+
+class CancellationServerTestCase(AsyncfluxServerTestCase):
+
+    def setUp(self):
+        super(CancellationServerTestCase, self).setUp()
+        self.errors = []
+        handler = logging.Handler(logging.ERROR)
+        handler.emit = self.errors.append
+        logging.getLogger().addHandler(handler)
+        self.addCleanup(logging.getLogger().removeHandler, handler)
+
+    def tearDown(self):
+        super(CancellationServerTestCase, self).tearDown()
+        self.assertEqual([r.getMessage() for r in self.errors], [])
+
+    @gen.coroutine
+    def cancel_query(self, client, delay):
+        cancellation = Cancellation()
+        future = client.get_database_names(cancellation=cancellation)
+        yield gen.sleep(delay)
+        cancellation.cancel()
+        with self.assertRaises(RequestCancelled):
+            yield future
+
+    @gen_test
+    def test_cancel_waiting_for_response(self):
+        client = self.get_client()
+        self.server.latency = 0.1
+        yield self.cancel_query(client, 0.02)
+        # Let the response arrive and be dropped
+        yield gen.sleep(0.2)
+
+    @gen_test
+    def test_cancel_streamed_body(self):
+        client = self.get_client()
+        yield client.create_database('foo')
+        self.server.slow_body_delay = 0.05
+        self.server.CHUNK_SIZE = 4
+        yield self.cancel_query(client, 0.1)
+        yield gen.sleep(0.2)
+        self.server.slow_body_delay = 0
+        names = yield client.get_database_names()
+        self.assertEqual(names, ['foo'])
+
+    @gen_test
+    def test_error_body(self):
+        client = self.get_client()
+        yield client.create_database('foo')
+        with self.assertRaises(AsyncfluxError) as context:
+            yield client.create_database('foo', cancellation=Cancellation())
+        self.assertEqual(context.exception.message, b'database foo exists')
+        self.assertEqual(context.exception.response.code, 409)
+        self.assertEqual(context.exception.response.body,
+                         b'database foo exists')
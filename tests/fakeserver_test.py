@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import time
+
+from asyncflux.errors import AsyncfluxError
+from asyncflux.fakeserver import FakeInfluxDB
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+
+class FakeInfluxDBTestCase(AsyncfluxServerTestCase):
+
+    @gen_test
+    def test_databases_and_users(self):
+        client = self.get_client()
+        response = yield client.ping()
+        self.assertEqual(response, {'status': 'ok'})
+
+        db = yield client.create_database('foo')
+        with self.assertRaisesRegexp(AsyncfluxError, 'database foo exists'):
+            yield client.create_database('foo')
+        names = yield client.get_database_names()
+        self.assertEqual(names, ['foo'])
+
+        yield db.create_user('bar', 'secret', read_from='^cpu',
+                             write_to='^cpu')
+        user = yield db.get_user('bar')
+        self.assertEqual(user.read_from, '^cpu')
+        authenticated = yield db.authenticate_user('bar', 'secret')
+        self.assertTrue(authenticated)
+        authenticated = yield db.authenticate_user('bar', 'wrong')
+        self.assertFalse(authenticated)
+        yield db.change_user_password('bar', 'new')
+        authenticated = yield db.authenticate_user('bar', 'new')
+        self.assertTrue(authenticated)
+        yield db.delete_user('bar')
+        names = yield db.get_user_names()
+        self.assertEqual(names, [])
+
+        yield client.create_cluster_admin('admin', 'pass')
+        authenticated = yield client.authenticate_cluster_admin('admin',
+                                                                'pass')
+        self.assertTrue(authenticated)
+        yield client.delete_cluster_admin('admin')
+        names = yield client.get_cluster_admin_names()
+        self.assertEqual(names, ['root'])
+
+        yield db.delete()
+        names = yield client.get_database_names()
+        self.assertEqual(names, [])
+
+    @gen_test
+    def test_series(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        yield db.write_points([{'name': 'cpu',
+                                'columns': ['time', 'host', 'value'],
+                                'points': [[10, 'a', 1], [20, 'b', 2],
+                                           [30, 'a', 3]]},
+                               {'name': 'mem', 'columns': ['value'],
+                                'points': [[5]]}], time_precision='s')
+        self.assertEqual(self.server.points_written, 4)
+
+        response = yield db.query('select * from cpu', time_precision='s')
+        self.assertEqual(response[0]['columns'],
+                         ['time', 'sequence_number', 'host', 'value'])
+        self.assertEqual([p[0] for p in response[0]['points']],
+                         [30, 20, 10])
+
+        response = yield db.query("select value from cpu where host = 'a' "
+                                  "and time > 10s order asc",
+                                  time_precision='s')
+        self.assertEqual([(p[0], p[2]) for p in response[0]['points']],
+                         [(30, 3)])
+
+        response = yield db.query('select value from /.*/ limit 1')
+        self.assertEqual([s['name'] for s in response], ['cpu', 'mem'])
+
+        response = yield db.query('select value from cpu', start=0, end=40,
+                                  splits=4, time_precision='s')
+        self.assertEqual([p[0] for p in response[0]['points']],
+                         [30, 20, 10])
+
+        with self.assertRaisesRegexp(AsyncfluxError, 'Aggregates'):
+            yield db.query('select mean(value) from cpu')
+
+    @gen_test
+    def test_shard_spaces(self):
+        client = self.get_client()
+        yield client.create_database('foo')
+        self.server.shard_spaces.append({
+            'name': 'default', 'database': 'foo', 'regex': '/.*/',
+            'retentionPolicy': 'inf', 'shardDuration': '7d',
+            'replicationFactor': 1, 'split': 1})
+        spaces = yield client.get_shard_spaces()
+        self.assertEqual(spaces[0].shard_duration, '7d')
+
+    @gen_test
+    def test_faults(self):
+        client = self.get_client()
+        self.server.inject_fault('error')
+        with self.assertRaisesRegexp(AsyncfluxError, 'Injected error'):
+            yield client.ping()
+
+        self.server.inject_fault('reset', path='^/db$')
+        yield client.ping()
+        with self.assertRaises(AsyncfluxError):
+            yield client.get_database_names()
+
+        self.server.inject_fault('slow_body')
+        response = yield client.ping()
+        self.assertEqual(response, {'status': 'ok'})
+        self.assertEqual(self.server.requests, 4)
+
+        self.assertRaisesRegexp(ValueError, 'Invalid fault: foo',
+                                self.server.inject_fault, 'foo')
+
+
+class ThrottledFakeInfluxDBTestCase(AsyncfluxServerTestCase):
+
+    def get_server(self):
+        return FakeInfluxDB(latency=0.01, max_points_per_second=1000)
+
+    @gen_test
+    def test_throughput_cap(self):
+        client = self.get_client()
+        db = yield client.create_database('foo')
+        points = [[i] for i in range(50)]
+        start = time.time()
+        yield [db.write_points([{'name': 'cpu', 'columns': ['value'],
+                                 'points': points}]) for _ in range(3)]
+        self.assertTrue(time.time() - start >= 0.1)
+        self.assertEqual(self.server.points_written, 150)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import json
+
+import mock
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = None  # pragma: no cover
+
+from asyncflux import AsyncfluxClient
+from asyncflux.testing import AsyncfluxTestCase, gen_test
+
+
+class JSONOffloadTestCase(AsyncfluxTestCase):
+
+    def setUp(self):
+        super(JSONOffloadTestCase, self).setUp()
+        self.executor = ThreadPoolExecutor(1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(JSONOffloadTestCase, self).tearDown()
+
+    @gen_test
+    def test_decode(self):
+        client = AsyncfluxClient(json_executor=self.executor,
+                                 json_decode_threshold=100)
+        small = [{'name': 'foo'}]
+        large = [{'name': 'db%d' % i} for i in range(20)]
+
+        with mock.patch.object(self.executor, 'submit',
+                               wraps=self.executor.submit) as submit:
+            with self.patch_fetch_mock(client) as m:
+                self.setup_fetch_mock(m, 200, body=small)
+                response = yield client.get_database_names()
+                self.assertEqual(response, ['foo'])
+                self.assertFalse(submit.called)
+
+            with self.patch_fetch_mock(client) as m:
+                self.setup_fetch_mock(m, 200, body=large)
+                response = yield client.get_database_names()
+                self.assertEqual(response, [db['name'] for db in large])
+                submit.assert_called_once_with(json.loads, mock.ANY)
+
+    @gen_test
+    def test_encode(self):
+        client = AsyncfluxClient(json_executor=self.executor,
+                                 json_encode_threshold=10)
+        db = client['foo']
+        small = [{'name': 'cpu', 'columns': ['time', 'value'],
+                  'points': [[1, 1]]}]
+        large = [{'name': 'cpu', 'columns': ['time', 'value'],
+                  'points': [[i, i] for i in range(5)]}]
+
+        with mock.patch.object(self.executor, 'submit',
+                               wraps=self.executor.submit) as submit:
+            with self.patch_fetch_mock(client) as m:
+                self.setup_fetch_mock(m, 200)
+                yield db.write_points(small)
+                self.assertFalse(submit.called)
+
+                yield db.write_points(large)
+                submit.assert_called_once_with(json.dumps, large)
+                self.assertEqual(m.call_args[1]['body'], json.dumps(large))
+
+            # Non-series bodies are always encoded inline
+            with self.patch_fetch_mock(client) as m:
+                self.setup_fetch_mock(m, 201)
+                yield client.create_database('bar')
+                self.assertEqual(submit.call_count, 1)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPRequest, HTTPResponse
+
+from asyncflux import AsyncfluxClient
+from asyncflux.errors import DeadlineExceeded
+from asyncflux.lanes import CONTROL, QUERY, WRITE, LaneScheduler, classify
+from asyncflux.testing import AsyncfluxTestCase, gen_test
+
+
+class LaneSchedulerTestCase(AsyncfluxTestCase):
+
+    def test_classify(self):
+        self.assertEqual(classify('GET', '/ping'), CONTROL)
+        self.assertEqual(classify('GET', '/db/%(database)s/authenticate'),
+                         CONTROL)
+        self.assertEqual(classify('GET', '/db/%(database)s/series'), QUERY)
+        self.assertEqual(classify('POST', '/db/%(database)s/series'), WRITE)
+
+    def test_budgets(self):
+        scheduler = LaneScheduler(lanes=((CONTROL, 10, 1), (WRITE, 1, 2)),
+                                  max_in_flight=3)
+        writes = [scheduler.acquire(WRITE) for _ in range(3)]
+        self.assertEqual([f.done() for f in writes], [True, True, False])
+        control = scheduler.acquire(CONTROL)
+        self.assertTrue(control.done())
+        self.assertFalse(scheduler.acquire(CONTROL).done())
+
+        scheduler.release(WRITE)
+        self.assertTrue(writes[2].done())
+        stats = scheduler.statistics()
+        self.assertEqual(stats[WRITE]['in_flight'], 2)
+        self.assertEqual(stats[WRITE]['queued'], 1)
+        self.assertEqual(stats[CONTROL]['waiting'], 1)
+
+    def test_weighted_dispatch(self):
+        scheduler = LaneScheduler(lanes=((QUERY, 3, 10), (WRITE, 1, 10)),
+                                  max_in_flight=1)
+        self.assertTrue(scheduler.acquire(WRITE).done())
+        waiting = [(lane, scheduler.acquire(lane))
+                   for lane in (WRITE, QUERY) for _ in range(8)]
+        admitted = []
+        running = WRITE
+        for _ in range(8):
+            scheduler.release(running)
+            running = [lane for lane, future in waiting if future.done()][0]
+            waiting = [(l, f) for l, f in waiting if not f.done()]
+            admitted.append(running)
+        self.assertEqual(admitted.count(QUERY), 6)
+        self.assertEqual(admitted.count(WRITE), 2)
+
+    @gen_test
+    def test_timeout_and_abandon(self):
+        scheduler = LaneScheduler(lanes=((WRITE, 1, 1), ), max_in_flight=1)
+        self.assertTrue(scheduler.acquire(WRITE).done())
+        with self.assertRaisesRegexp(DeadlineExceeded, 'write lane'):
+            yield scheduler.acquire(WRITE, timeout=0.01)
+
+        waiting = scheduler.acquire(WRITE)
+        scheduler.abandon(WRITE, waiting)
+        scheduler.release(WRITE)
+        self.assertFalse(waiting.done())
+        self.assertEqual(scheduler.in_flight, 0)
+
+
+class ClientLanesTestCase(AsyncfluxTestCase):
+
+    def test_default_scheduler(self):
+        client = AsyncfluxClient(lanes=True)
+        self.assertIsInstance(client.lanes, LaneScheduler)
+        self.assertIs(client.lanes.io_loop, client.io_loop)
+
+    @gen_test
+    def test_ping_during_backfill(self):
+        scheduler = LaneScheduler(lanes=((CONTROL, 10, 1), (WRITE, 1, 2)),
+                                  max_in_flight=3)
+        client = AsyncfluxClient(lanes=scheduler)
+        db = client['foo']
+        data = [{'name': 'cpu', 'columns': ['value'], 'points': [[1]]}]
+        pending = []
+
+        def fetch(url, **kwargs):
+            future = Future()
+            if '/series' in url:
+                pending.append(future)
+            else:
+                future.set_result(HTTPResponse(HTTPRequest(url), 204))
+            return future
+
+        with self.patch_fetch_mock(client) as m:
+            m.side_effect = fetch
+            writes = [db.write_points(data) for _ in range(4)]
+            yield gen.moment
+            self.assertEqual(len(pending), 2)
+
+            yield client.ping()
+            self.assertEqual(client.get_statistics()['lanes'][WRITE][
+                'waiting'], 2)
+
+            while pending:
+                pending.pop().set_result(
+                    HTTPResponse(HTTPRequest('/series'), 204))
+                yield gen.moment
+                yield gen.moment
+            yield writes
+            self.assertEqual(m.call_count, 5)
+            self.assertEqual(scheduler.in_flight, 0)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+import mock
+
+from asyncflux.loadgen import LoadGenerator, format_report, main, percentile
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+
+class PercentileTestCase(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 51)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([3], 90), 3)
+        self.assertIsNone(percentile([], 50))
+
+
+class LoadGeneratorTestCase(AsyncfluxServerTestCase):
+
+    @gen_test
+    def test_run(self):
+        client = self.get_client()
+        yield client.create_database('loadgen')
+        generator = LoadGenerator(client, 'loadgen', series=3, columns=2,
+                                  rate=2000, batch_size=20, duration=0.2,
+                                  concurrency=2, query_ratio=0.25, seed=1)
+        report = yield generator.run()
+
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['points'], self.server.points_written)
+        operations = report['writes']['count'] + report['queries']['count']
+        self.assertEqual(operations, 20)
+        self.assertTrue(report['queries']['count'] > 0)
+        self.assertTrue(report['writes']['p50'] <= report['writes']['max'])
+        self.assertIn('points written: %d' % report['points'],
+                      format_report(report))
+
+
+class MainTestCase(unittest.TestCase):
+
+    def test_fake_server(self):
+        with mock.patch('sys.stdout') as stdout:
+            report = main(['--fake-server', '--duration', '0.1', '--rate',
+                           '1000', '--batch-size', '10', '--json'])
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['writes']['count'], 10)
+        self.assertEqual(json.loads(stdout.write.call_args[0][0])['points'],
+                         100)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import time
+
+from tornado import gen
+
+from asyncflux.looplag import LoopLagMonitor
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+
+class LoopLagMonitorTestCase(AsyncfluxServerTestCase):
+
+    def test_histogram(self):
+        monitor = LoopLagMonitor(io_loop=self.io_loop, threshold=0.1)
+        token = monitor.begin('GET', '/db')
+        for lag in (0.0005, 0.003, 0.003, 0.2, 5):
+            monitor.record(lag)
+        monitor.end(token)
+        monitor.record(0.3)
+
+        statistics = monitor.statistics()
+        self.assertEqual(statistics['samples'], 6)
+        self.assertEqual(statistics['max'], 5)
+        self.assertEqual(statistics['histogram']['0.001'], 1)
+        self.assertEqual(statistics['histogram']['0.005'], 2)
+        self.assertEqual(statistics['histogram']['0.25'], 1)
+        self.assertEqual(statistics['histogram']['+inf'], 1)
+        self.assertEqual(statistics['spikes'], 3)
+        self.assertEqual(statistics['spiking_operations'], {'GET /db': 2})
+        self.assertEqual([s['in_flight'] for s in monitor.spikes],
+                         [['GET /db'], ['GET /db'], []])
+
+    @gen_test
+    def test_client_spike(self):
+        self.server.latency = 0.05
+        monitor = LoopLagMonitor(io_loop=self.io_loop, interval=0.01,
+                                 threshold=0.05)
+        client = self.get_client(loop_lag_monitor=monitor)
+        self.assertTrue(monitor.running)
+        future = client.get_database_names()
+        yield gen.sleep(0.02)
+        time.sleep(0.1)
+        yield future
+        yield gen.sleep(0.02)
+
+        statistics = client.get_statistics()['loop_lag']
+        self.assertTrue(statistics['samples'] > 1)
+        self.assertTrue(statistics['max'] >= 0.05)
+        self.assertEqual(statistics['spiking_operations'], {'GET /db': 1})
+        monitor.stop()
+        self.assertFalse(monitor.running)
+
+    def test_default_monitor(self):
+        client = self.get_client(loop_lag_monitor=True)
+        self.assertIs(client.loop_monitor.io_loop, self.io_loop)
+        client.loop_monitor.stop()
+        self.assertNotIn('loop_lag', self.get_client().get_statistics())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import json
+
+from asyncflux.fakeserver import FakeInfluxDB
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+
+class MetadataTestCase(AsyncfluxServerTestCase):
+
+    def setUp(self):
+        super(MetadataTestCase, self).setUp()
+        self.target = FakeInfluxDB()
+        self.target.start()
+
+    def tearDown(self):
+        self.target.stop()
+        super(MetadataTestCase, self).tearDown()
+
+    def get_target_client(self):
+        return self.get_client().__class__('127.0.0.1', self.target.port,
+                                           io_loop=self.io_loop)
+
+    @gen_test
+    def test_snapshot_and_restore(self):
+        source = self.get_client()
+        foo = yield source.create_database('foo')
+        yield source.create_database('bar')
+        yield foo.create_user('alice', 'secret', is_admin=True)
+        yield foo.create_user('bob', 'secret', read_from='^cpu$',
+                              write_to='^$')
+        yield source.create_cluster_admin('ops', 'secret')
+        yield source.create_shard_space('foo', 'hourly', regex='/^events/',
+                                        shard_duration='1h')
+
+        document = yield source.snapshot_metadata()
+        document = json.loads(json.dumps(document))
+        self.assertEqual([d['name'] for d in document['databases']],
+                         ['bar', 'foo'])
+        self.assertEqual(document['cluster_admins'], ['ops', 'root'])
+        self.assertEqual(document['databases'][1]['users'][1],
+                         {'name': 'bob', 'is_admin': False,
+                          'read_from': '^cpu$', 'write_to': '^$'})
+        self.assertEqual(document['databases'][1]['shard_spaces'][0]['regex'],
+                         '/^events/')
+
+        target = self.get_target_client()
+        yield target.create_database('baz')
+        report = yield target.restore_metadata(
+            document, password=lambda db, name: 'p-%s' % name,
+            delete_missing=True, dry_run=True)
+        self.assertEqual(report['databases'],
+                         {'foo': {'action': 'create', 'error': None},
+                          'bar': {'action': 'create', 'error': None},
+                          'baz': {'action': 'delete', 'error': None}})
+        self.assertEqual(sorted(self.target.databases), ['baz'])
+
+        report = yield target.restore_metadata(
+            document, password=lambda db, name: 'p-%s' % name,
+            delete_missing=True)
+        self.assertEqual(report['cluster_admins']['ops']['action'], 'create')
+        self.assertIsNone(report['cluster_admins']['root']['action'])
+        self.assertEqual(report['shard_spaces']['foo/hourly']['action'],
+                         'create')
+        self.assertEqual(report['users']['foo']['alice']['action'], 'create')
+
+        restored = yield target.snapshot_metadata()
+        self.assertEqual(restored, document)
+        authenticated = yield target['foo'].authenticate_user('bob',
+                                                              'p-bob')
+        self.assertTrue(authenticated)
+
+        # Applying it again changes nothing
+        requests = self.target.requests
+        report = yield target.restore_metadata(document)
+        self.assertEqual(self.target.requests - requests, 5)
+        self.assertFalse([r for r in report['databases'].values()
+                          if r['action']])
+
+    @gen_test
+    def test_restore_conflicts_and_errors(self):
+        source = self.get_client()
+        yield source.create_database('foo')
+        yield source.create_shard_space('foo', 'hourly', shard_duration='1h')
+        document = yield source.snapshot_metadata()
+        document['databases'][0]['users'] = [{'name': 'carol'}]
+        document['cluster_admins'].append('ops')
+
+        target = self.get_target_client()
+        yield target.create_database('foo')
+        yield target.create_shard_space('foo', 'hourly', shard_duration='1d')
+        report = yield target.restore_metadata(document)
+        self.assertEqual(report['shard_spaces']['foo/hourly']['action'],
+                         'conflict')
+        self.assertIsInstance(report['cluster_admins']['ops']['error'],
+                              ValueError)
+        self.assertIsInstance(report['users']['foo']['error'], ValueError)
+        self.assertEqual(self.target.shard_spaces[0]['shardDuration'], '1d')
+
+        with self.assertRaises(ValueError):
+            yield target.restore_metadata({'version': 2})
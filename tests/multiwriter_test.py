@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import marshal
+import multiprocessing
+import sys
+import threading
+import time
+import unittest
+
+import asyncio
+
+import mock
+from tornado import ioloop
+
+from asyncflux.errors import DeadlineExceeded
+from asyncflux.fakeserver import Database, FakeInfluxDB
+from asyncflux.multiwriter import MultiProcessWriter, RingBuffer
+
+
+_get = RingBuffer.get
+
+
+def slow_get(ring, block=True, timeout=None):
+    # Widens the window between draining the ring and looking at the stop
+    # event, where the last records of a closing writer could be missed
+    record = _get(ring, block, timeout)
+    if record is None:
+        time.sleep(0.02)
+    return record
+
+
+def collect_records(ring, stop_event, database, client_args, client_kwargs,
+                    batch_options, poll_interval):
+    queue = client_kwargs['queue']
+    while True:
+        stopping = stop_event.is_set()
+        record = ring.get(timeout=poll_interval)
+        if record is not None:
+            queue.put(marshal.loads(record))
+        elif stopping:
+            return
+
+
+class RingBufferTestCase(unittest.TestCase):
+
+    def test_put_get(self):
+        ring = RingBuffer(32)
+        self.assertIsNone(ring.get(block=False))
+        ring.put(b'foo')
+        ring.put(b'barbaz')
+        self.assertEqual(ring.used, 17)
+        self.assertEqual(ring.get(), b'foo')
+        self.assertEqual(ring.get(), b'barbaz')
+        self.assertEqual(ring.used, 0)
+
+        # Records wrap around the end of the buffer
+        for i in range(10):
+            record = ('record-%d' % i).encode('ascii')
+            ring.put(record)
+            self.assertEqual(ring.get(timeout=1), record)
+
+    def test_full(self):
+        ring = RingBuffer(16)
+        ring.put(b'12345678')
+        self.assertRaisesRegexp(DeadlineExceeded, 'Ring buffer full',
+                                ring.put, b'12345678', 0.01)
+        self.assertRaisesRegexp(ValueError, 'larger than the ring buffer',
+                                ring.put, b'x' * 16)
+
+
+class MultiProcessWriterTestCase(unittest.TestCase):
+
+    def start_server(self):
+        # The server runs on a thread of its own, so that the workers are
+        # forked from a thread without a running IOLoop
+        server = FakeInfluxDB()
+        server.databases['foo'] = Database('foo')
+        started = threading.Event()
+        loops = []
+
+        def run():
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            loops.append(ioloop.IOLoop.current())
+            server.start()
+            started.set()
+            loops[0].start()
+            loops[0].close(all_fds=True)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        started.wait()
+
+        def stop():
+            loops[0].add_callback(loops[0].stop)
+            thread.join()
+        self.addCleanup(stop)
+        return server
+
+    def test_lifecycle(self):
+        writer = MultiProcessWriter('foo', processes=2, buffer_size=4096,
+                                    client_args=('http://localhost:1', ),
+                                    flush_interval=60)
+        try:
+            self.assertEqual(writer.route('cpu'), writer.route(u'cpu'))
+            self.assertIn(writer.route('cpu'), (0, 1))
+            self.assertEqual(len(writer.workers), 2)
+            self.assertTrue(all(p.is_alive() for p in writer.workers))
+
+            writer.workers[0].terminate()
+            writer.workers[0].join()
+            self.assertEqual(writer.check_workers(), 1)
+            self.assertEqual(writer.restarts, 1)
+            self.assertTrue(all(p.is_alive() for p in writer.workers))
+
+            writer.write('cpu', ['value'], [[1], [2]])
+        finally:
+            self.assertTrue(writer.close(timeout=10))
+        self.assertFalse(any(p.is_alive() for p in writer.workers))
+        self.assertRaises(RuntimeError, writer.write, 'cpu', ['value'],
+                          [[1]])
+
+    def test_concurrent_producers(self):
+        queue = multiprocessing.Queue()
+        with mock.patch('asyncflux.multiwriter._worker_main',
+                        collect_records):
+            writer = MultiProcessWriter('foo', processes=1, buffer_size=256,
+                                        client_kwargs={'queue': queue})
+
+        def produce(producer):
+            for i in range(200):
+                writer.write('cpu', ['producer', 'value'],
+                             [[producer, i], [producer, -i]])
+
+        threads = [threading.Thread(target=produce, args=(p, ))
+                   for p in range(4)]
+        # Switch threads as often as possible to interleave the producers
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            records = [queue.get(timeout=10) for _ in range(800)]
+        finally:
+            self.assertTrue(writer.close(timeout=10))
+        self.assertEqual(
+            sorted(tuple(points[0]) for _, _, points in records),
+            sorted((p, i) for p in range(4) for i in range(200)))
+        self.assertTrue(all(points[1][1] == -points[0][1]
+                            for _, _, points in records))
+
+    def test_write_before_close(self):
+        server = self.start_server()
+        with mock.patch.object(RingBuffer, 'get', slow_get):
+            writer = MultiProcessWriter('foo', processes=2,
+                                        buffer_size=65536,
+                                        client_args=(server.url, ),
+                                        flush_interval=60)
+        time.sleep(0.1)
+        for i in range(20):
+            writer.write('cpu%d' % i, ['value'], [[i]] * 50)
+        self.assertTrue(writer.close(timeout=10))
+        self.assertEqual(server.points_written, 1000)
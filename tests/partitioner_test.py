@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import mock
+
+from asyncflux import AsyncfluxClient
+from asyncflux import partitioner as partitioner_module
+from asyncflux.partitioner import ShardPartitioner
+from asyncflux.shardspace import ShardSpace
+from asyncflux.testing import AsyncfluxTestCase
+
+
+class ShardPartitionerTestCase(AsyncfluxTestCase):
+
+    def make_shard_space(self, client, name, regex, shard_duration,
+                         database='foo'):
+        return ShardSpace(client, name=name, database=database, regex=regex,
+                          retention_policy='inf',
+                          shard_duration=shard_duration,
+                          replication_factor=1, split=1)
+
+    def test_match(self):
+        client = AsyncfluxClient()
+        events = self.make_shard_space(client, 'events', '/^events\\./', '1h')
+        cpu = self.make_shard_space(client, 'cpu', '/CPU/i', '1d')
+        default = self.make_shard_space(client, 'default', '/.*/', '7d')
+        other = self.make_shard_space(client, 'other', '/.*/', '1d', 'bar')
+        partitioner = ShardPartitioner([events, cpu, default, other])
+
+        self.assertIs(partitioner.match('foo', 'events.clicks'), events)
+        self.assertIs(partitioner.match('foo', 'host1.cpu'), cpu)
+        self.assertIs(partitioner.match('foo', 'xevents.cpu'), cpu)
+        self.assertIs(partitioner.match('foo', 'memory'), default)
+        self.assertIs(partitioner.match('bar', 'events.clicks'), other)
+        self.assertIsNone(partitioner.match('fubar', 'memory'))
+        # Cached results
+        self.assertIs(partitioner.match('foo', 'events.clicks'), events)
+        self.assertIsNone(partitioner.match('fubar', 'memory'))
+
+    def test_partition(self):
+        client = AsyncfluxClient()
+        hourly = self.make_shard_space(client, 'hourly', '/^a/', '1h')
+        weekly = self.make_shard_space(client, 'weekly', '/.*/', '7d')
+        partitioner = ShardPartitioner([hourly, weekly])
+        series = [{'name': 'a', 'columns': ['time', 'v'],
+                   'points': [[3599000, 1], [3600000, 2], [7199999, 3]]},
+                  {'name': 'b', 'columns': ['time', 'v'],
+                   'points': [[0, 1], [3600000, 2]]},
+                  {'name': 'c', 'columns': ['v'], 'points': [[1], [2]]}]
+
+        batches = partitioner.partition('foo', series)
+        self.assertEqual(len(batches), 4)
+        self.assertEqual(batches[0], [{'name': 'a', 'columns': ['time', 'v'],
+                                       'points': [[3599000, 1]]}])
+        self.assertEqual(batches[1], [{'name': 'a', 'columns': ['time', 'v'],
+                                       'points': [[3600000, 2],
+                                                  [7199999, 3]]}])
+        self.assertEqual(batches[2], [{'name': 'b', 'columns': ['time', 'v'],
+                                       'points': [[0, 1], [3600000, 2]]}])
+        self.assertEqual(batches[3][0]['name'], 'c')
+
+        # Weekly shards start on Mondays, as the server truncates from the
+        # zero time instead of the epoch
+        series = [{'name': 'b', 'columns': ['time', 'v'],
+                   'points': [[4 * 86400 - 1, 1], [4 * 86400, 2]]}]
+        batches = partitioner.partition('foo', series, 's')
+        self.assertEqual(len(batches), 2)
+
+        self.assertRaisesRegexp(ValueError, 'Invalid time precision: ns',
+                                partitioner.partition, 'foo', series, 'ns')
+
+    def test_duration_parsed_per_series(self):
+        client = AsyncfluxClient()
+        hourly = self.make_shard_space(client, 'hourly', '/.*/', '1h')
+        partitioner = ShardPartitioner([hourly])
+        series = [{'name': 'a', 'columns': ['time', 'v'],
+                   'points': [[t * 1000, t] for t in range(0, 7200, 60)]},
+                  {'name': 'b', 'columns': ['time', 'v'],
+                   'points': [[None, 1], [None, 2]]}]
+        parse_duration = partitioner_module.parse_duration
+        with mock.patch.object(partitioner_module, 'parse_duration',
+                               side_effect=parse_duration) as m:
+            batches = partitioner.partition('foo', series)
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual([len(b[0]['points']) for b in batches],
+                         [60, 60, 2])
+        self.assertEqual(partitioner.bucket(hourly, 3600, 's'),
+                         partitioner.bucket(hourly, 3600000))
+        self.assertIsNone(partitioner.bucket(None, 3600))
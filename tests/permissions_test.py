@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from tornado import gen
+
+from asyncflux import AsyncfluxClient
+from asyncflux.errors import PermissionDenied
+from asyncflux.permissions import Permissions
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+
+class PermissionsTestCase(AsyncfluxServerTestCase):
+
+    data = [{'name': 'tenant.cpu', 'columns': ['value'], 'points': [[1]]},
+            {'name': 'other.cpu', 'columns': ['value'], 'points': [[2]]}]
+
+    def get_tenant_client(self, **kwargs):
+        return AsyncfluxClient('127.0.0.1', self.server.port,
+                               username='tenant', password='secret',
+                               io_loop=self.io_loop, **kwargs)
+
+    @gen.coroutine
+    def setup_database(self):
+        admin = self.get_client()
+        db = yield admin.create_database('foo')
+        yield db.create_user('tenant', 'secret', read_from='.*',
+                             write_to='^tenant\\.')
+
+    def test_permissions(self):
+        permissions = Permissions('.*', '^tenant\\.')
+        self.assertTrue(permissions.can_read('other'))
+        self.assertTrue(permissions.can_write('tenant.cpu'))
+        self.assertFalse(permissions.can_write('other.tenant.cpu'))
+        allowed, denied = permissions.split(self.data)
+        self.assertEqual(allowed, self.data[:1])
+        self.assertEqual(denied, self.data[1:])
+        self.assertRaises(ValueError, AsyncfluxClient, write_precheck='drop')
+
+    @gen_test
+    def test_reject(self):
+        yield self.setup_database()
+        client = self.get_tenant_client(write_precheck='reject')
+        db = client['foo']
+        requests = self.server.requests
+        with self.assertRaises(PermissionDenied) as context:
+            yield [db.write_points(self.data), db.write_points(self.data)]
+        self.assertEqual(context.exception.series, ['other.cpu'])
+        # A single permissions lookup and no writes
+        self.assertEqual(self.server.requests - requests, 1)
+
+        yield db.write_points(self.data[:1])
+        self.assertEqual(self.server.requests - requests, 2)
+        self.assertEqual(self.server.points_written, 1)
+
+    @gen_test
+    def test_split(self):
+        yield self.setup_database()
+        client = self.get_tenant_client(write_precheck='split')
+        denied = yield client['foo'].write_points(self.data)
+        self.assertEqual(denied, self.data[1:])
+        self.assertEqual(self.server.points_written, 1)
+
+        denied = yield client['foo'].write_points(self.data[1:])
+        self.assertEqual(denied, self.data[1:])
+        self.assertEqual(self.server.points_written, 1)
+
+    @gen_test
+    def test_ttl_and_invalidation(self):
+        yield self.setup_database()
+        clock = [0]
+        client = self.get_tenant_client(write_precheck='reject',
+                                        permission_ttl=10)
+        client.permissions._PermissionCache__clock = lambda: clock[0]
+        db = client['foo']
+        yield db.write_points(self.data[:1])
+        self.server.databases['foo'].users['tenant']['writeTo'] = '.*'
+        with self.assertRaises(PermissionDenied):
+            yield db.write_points(self.data)
+
+        clock[0] = 11
+        yield db.write_points(self.data)
+        requests = self.server.requests
+        client.permissions.invalidate('foo', 'someone-else')
+        yield db.write_points(self.data)
+        self.assertEqual(self.server.requests - requests, 1)
+        client.permissions.invalidate('foo', 'tenant')
+        yield db.write_points(self.data)
+        self.assertEqual(self.server.requests - requests, 3)
+
+    @gen_test
+    def test_cluster_admin(self):
+        yield self.setup_database()
+        client = self.get_client(write_precheck='reject')
+        yield client['foo'].write_points(self.data)
+        self.assertEqual(self.server.points_written, 2)
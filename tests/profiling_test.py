@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+
+class ProfilingTestCase(AsyncfluxServerTestCase):
+
+    def setUp(self):
+        super(ProfilingTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(ProfilingTestCase, self).tearDown()
+
+    def files(self, extension):
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.endswith(extension))
+
+    @gen_test
+    def test_sampling(self):
+        client = self.get_client()
+        profiler = client.enable_profiling(self.directory, sample_rate=1)
+        db = yield client.create_database('foo')
+        yield db.get_user_names()
+        yield client.ping()
+
+        self.assertEqual(profiler.profiles, 3)
+        profiles = self.files('.prof')
+        self.assertEqual(len(profiles), 3)
+        self.assertTrue(profiles[0].startswith(
+            'profile-AsyncfluxClient.create_database-1-'))
+        self.assertTrue(profiles[1].startswith(
+            'profile-AsyncfluxClient.ping-3-'))
+        self.assertTrue(profiles[2].startswith(
+            'profile-Database.get_user_names-2-'))
+        summary = profiler.summary(os.path.join(self.directory, profiles[1]))
+        self.assertIn('request', summary)
+
+        self.assertIs(client.disable_profiling(), profiler)
+        yield client.ping()
+        self.assertEqual(profiler.profiles, 3)
+
+    @gen_test
+    def test_sample_rate(self):
+        client = self.get_client()
+        profiler = client.enable_profiling(self.directory, sample_rate=0)
+        yield client.ping()
+        self.assertEqual(profiler.profiles, 0)
+        self.assertEqual(self.files('.prof'), [])
+
+    @gen_test
+    def test_memory_snapshot(self):
+        client = self.get_client()
+        profiler = client.enable_profiling(self.directory, sample_rate=0,
+                                           trace_memory=True)
+        self.assertTrue(tracemalloc.is_tracing())
+        db = yield client.create_database('foo')
+        yield db.create_user('bar', 'baz')
+        users = yield db.get_users()
+        payload = yield client.request('/db')
+
+        totals = profiler.take_snapshot()
+        self.assertTrue(totals['decode'] > 0)
+        self.assertTrue(totals['models'] > 0)
+        with open(os.path.join(self.directory,
+                               self.files('.txt')[0])) as f:
+            self.assertIn('decode: ', f.read())
+        self.assertTrue(users and payload)
+
+        client.disable_profiling()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertRaises(RuntimeError, profiler.take_snapshot)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from asyncflux.query import (add_time_range, align_time_ranges,
+                             check_splittable, group_interval, is_ascending,
+                             merge_series, split_time_range)
+from asyncflux.testing import AsyncfluxTestCase
+
+
+class QueryUtilsTestCase(AsyncfluxTestCase):
+
+    def test_add_time_range(self):
+        self.assertEqual(add_time_range('select * from cpu', 10, 20),
+                         'select * from cpu where time >= 10s and time < 20s')
+        self.assertEqual(
+            add_time_range('select * from cpu where a = 1 or b = 2', 10, 20),
+            'select * from cpu where time >= 10s and time < 20s and '
+            '(a = 1 or b = 2)')
+        self.assertEqual(
+            add_time_range('select mean(v) from cpu group by time(1m) '
+                           'limit 5', 10, 20),
+            'select mean(v) from cpu where time >= 10s and time < 20s '
+            'group by time(1m) limit 5')
+        self.assertEqual(
+            add_time_range('select * from cpu where a = 1 order asc', 10, 20),
+            'select * from cpu where time >= 10s and time < 20s and (a = 1) '
+            'order asc')
+
+    def test_is_ascending(self):
+        self.assertTrue(is_ascending('select * from cpu order asc'))
+        self.assertFalse(is_ascending('select * from cpu'))
+        self.assertFalse(is_ascending('select * from cpu order desc'))
+
+    def test_group_interval(self):
+        self.assertEqual(group_interval('select mean(v) from cpu '
+                                        'group by time(5m)'), 300)
+        self.assertEqual(group_interval('select mean(v) from cpu '
+                                        'group by host, time(1h) fill(0)'),
+                         3600)
+        self.assertIsNone(group_interval('select mean(v) from cpu '
+                                         'group by host'))
+        self.assertIsNone(group_interval('select mean(v) from cpu '
+                                         'group by time(10ms)'))
+        self.assertIsNone(group_interval('select * from cpu'))
+
+    def test_check_splittable(self):
+        check_splittable('select * from cpu where host = \'a\'')
+        check_splittable('select value, host from cpu')
+        check_splittable('select mean(v) from cpu group by time(1m)')
+        check_splittable('select count(v) from cpu group by host, time(1h)')
+        self.assertRaisesRegexp(ValueError, 'limit', check_splittable,
+                                'select * from cpu limit 10')
+        self.assertRaisesRegexp(ValueError, 'limit', check_splittable,
+                                'select mean(v) from cpu group by time(1m) '
+                                'LIMIT 5')
+        for query in ('select count(*) from cpu',
+                      'select MEAN(v) from cpu where host = \'a\'',
+                      'select percentile(v, 95) from cpu group by host',
+                      'select distinct (host) from cpu'):
+            self.assertRaisesRegexp(ValueError, 'grouped by time',
+                                    check_splittable, query)
+
+    def test_align_time_ranges(self):
+        self.assertEqual(align_time_ranges([(0, 25), (25, 50), (50, 75),
+                                            (75, 100)], 20),
+                         [(0, 20), (20, 40), (40, 60), (60, 100)])
+        self.assertEqual(align_time_ranges([(5, 10), (10, 15), (15, 30)], 20),
+                         [(5, 30)])
+        self.assertEqual(align_time_ranges([(0, 30), (30, 60)], None),
+                         [(0, 30), (30, 60)])
+        self.assertEqual(align_time_ranges([], 60), [])
+
+    def test_split_time_range(self):
+        self.assertEqual(split_time_range(0, 100, 4),
+                         [(0, 25), (25, 50), (50, 75), (75, 100)])
+        self.assertEqual(split_time_range(0, 3, 5),
+                         [(0, 1), (1, 2), (2, 3)])
+        self.assertEqual(split_time_range(0, 100, 1), [(0, 100)])
+        self.assertEqual(split_time_range(0, 1, 3), [(0, 1)])
+        self.assertEqual(split_time_range(1800, 4 * 3600 + 1800, 4, '1h'),
+                         [(1800, 3600), (3600, 10800), (10800, 14400),
+                          (14400, 16200)])
+        self.assertEqual(split_time_range(0, 3600, 4, '1h'), [(0, 3600)])
+        self.assertRaisesRegexp(ValueError, 'end must be greater than start',
+                                split_time_range, 10, 10, 2)
+
+    def test_merge_series(self):
+        chunks = [[{'name': 'a', 'columns': ['time', 'v'],
+                    'points': [[3, 1]]}],
+                  [{'name': 'a', 'columns': ['time', 'v'],
+                    'points': [[2, 1]]},
+                   {'name': 'b', 'columns': ['time', 'v'],
+                    'points': [[2, 2]]}],
+                  None,
+                  [{'name': 'a', 'columns': ['time', 'w'],
+                    'points': [[1, 5]]}]]
+        self.assertEqual(merge_series(chunks),
+                         [{'name': 'a', 'columns': ['time', 'v', 'w'],
+                           'points': [[3, 1, None], [2, 1, None],
+                                      [1, None, 5]]},
+                          {'name': 'b', 'columns': ['time', 'v'],
+                           'points': [[2, 2]]}])
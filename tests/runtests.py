@@ -3,8 +3,13 @@ import os
 import sys
 from unittest import defaultTestLoader, TextTestRunner, TestSuite
 
-TESTS = ('asyncflux_test', 'client_test', 'clusteradmin_test', 'database_test',
-         'shardspace_test', 'user_test', 'util_test', )
+TESTS = ('asyncflux_test', 'authcache_test', 'batch_test', 'breaker_test',
+         'client_test', 'clusteradmin_test', 'database_test', 'dataframe_test',
+         'deadline_test', 'fakeserver_test', 'json_offload_test', 'lanes_test',
+         'loadgen_test', 'looplag_test', 'metadata_test', 'multiwriter_test',
+         'partitioner_test', 'permissions_test', 'profiling_test', 'query_test',
+         'shardspace_test', 'startup_test', 'sync_test', 'timestamps_test',
+         'timing_test', 'tls_test', 'user_test', 'util_test', )
 
 
 def make_suite(prefix='', extra=(), force_all=False):
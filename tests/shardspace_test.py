@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import json
+
 from asyncflux import AsyncfluxClient
 from asyncflux.database import Database
 from asyncflux.shardspace import ShardSpace
@@ -34,6 +36,20 @@ class ShardSpaceTestCase(AsyncfluxTestCase):
         self.assertIsInstance(shard_space.database, Database)
         self.assertEqual(shard_space.database.name, database.name)
 
+    def test_from_raw(self):
+        client = AsyncfluxClient()
+        shard_space = ShardSpace.from_raw(client, {
+            'name': 'default', 'database': 'foo', 'regex': '/.*/',
+            'retentionPolicy': 'inf', 'shardDuration': '7d',
+            'replicationFactor': 1, 'split': 2})
+        self.assertFalse(hasattr(shard_space, '__dict__'))
+        self.assertEqual(repr(shard_space),
+                         "ShardSpace(%r, 'foo', 'default')" % client)
+        self.assertEqual(shard_space.as_dict(), {
+            'name': 'default', 'database': 'foo', 'regex': '/.*/',
+            'retention_policy': 'inf', 'shard_duration': '7d',
+            'replication_factor': 1, 'split': 2})
+
     @gen_test
     def test_get_shard_spaces(self):
         client = AsyncfluxClient()
@@ -66,3 +82,31 @@ class ShardSpaceTestCase(AsyncfluxTestCase):
                 self.assertEqual(actual.split, expected['split'])
 
                 self.assert_mock_args(m, '/cluster/shard_spaces')
+
+    @gen_test
+    def test_create_and_delete_shard_space(self):
+        client = AsyncfluxClient()
+        payload = {'name': 'hourly', 'regex': '/^events\\./',
+                   'retentionPolicy': '30d', 'shardDuration': '1h',
+                   'replicationFactor': 1, 'split': 1}
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            shard_space = yield client.create_shard_space(
+                'foo', 'hourly', regex='/^events\\./', retention_policy='30d',
+                shard_duration='1h')
+            self.assertEqual(shard_space.as_dict(), {
+                'name': 'hourly', 'database': 'foo', 'regex': '/^events\\./',
+                'retention_policy': '30d', 'shard_duration': '1h',
+                'replication_factor': 1, 'split': 1})
+
+            self.assertEqual(json.loads(m.call_args[1]['body']), payload)
+            self.assertEqual(m.call_args[0][0],
+                             'http://localhost:8086/cluster/shard_spaces/foo')
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 204)
+            yield shard_space.delete()
+
+            self.assert_mock_args(m, '/cluster/shard_spaces/foo/hourly',
+                                  method='DELETE')
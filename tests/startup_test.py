@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import mock
+
+from asyncflux.startup import PHASES, format_report, main, measure, probe
+
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_probe(self):
+        sample = probe()
+        for phase in PHASES:
+            self.assertGreaterEqual(sample[phase], 0)
+        # Creating a client loads neither the HTTP client nor the models
+        self.assertIn('asyncflux.client', sample['modules'])
+        for module in ('tornado.httpclient', 'asyncflux.database',
+                       'asyncflux.user', 'asyncflux.permissions'):
+            self.assertNotIn(module, sample['modules'])
+
+    def test_measure(self):
+        report = measure(runs=2)
+        self.assertEqual(report['runs'], 2)
+        for phase in PHASES:
+            self.assertLessEqual(report[phase]['p50'], report[phase]['max'])
+        self.assertIn('construct: p50', format_report(report))
+
+    def test_main(self):
+        with mock.patch('sys.stdout') as stdout:
+            report = main(['--runs', '1', '--json'])
+        self.assertEqual(report['runs'], 1)
+        self.assertTrue(stdout.write.called)
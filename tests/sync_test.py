@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import unittest
+
+from tornado.concurrent import Future
+
+from asyncflux.errors import AsyncfluxError, DeadlineExceeded
+from asyncflux.sync import SyncAsyncfluxClient
+from asyncflux.testing import AsyncfluxTestCase
+
+
+class SyncAsyncfluxClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = SyncAsyncfluxClient(batch_size=1000, flush_interval=60,
+                                          timeout=5)
+        self.helper = AsyncfluxTestCase('run')
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_blocking_calls(self):
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            self.helper.setup_fetch_mock(m, 200, body=[{'name': 'foo'}])
+            self.assertEqual(self.client.get_database_names(), ['foo'])
+
+        series = [{'name': 'cpu', 'columns': ['value'], 'points': [[1]]}]
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            self.helper.setup_fetch_mock(m, 200, body=series)
+            self.assertEqual(self.client['foo'].query('select * from cpu'),
+                             series)
+            self.assertEqual(self.client['foo'].name, 'foo')
+            self.assertEqual(self.client.foo.query('select * from cpu'),
+                             series)
+            self.assertEqual(repr(self.client.foo), repr(self.client['foo']))
+            self.assertEqual(self.client.foo.name, 'foo')
+
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            self.helper.setup_fetch_mock(m, 500, body='Internal error')
+            self.assertRaises(AsyncfluxError, self.client.ping)
+
+    def test_model_objects(self):
+        users = [{'name': 'alice', 'isAdmin': False}]
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            self.helper.setup_fetch_mock(m, 200, body=users)
+            user, = self.client['foo'].get_users()
+        self.assertTrue(repr(user).startswith('Sync('))
+        self.assertEqual(user.name, 'alice')
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            self.helper.setup_fetch_mock(m, 200)
+            user.is_admin = True
+            # Blocks on the IOLoop thread instead of returning a future
+            self.assertIs(user.save(), True)
+            self.assertEqual(json.loads(m.call_args[1]['body']),
+                             {'isAdmin': True})
+        self.assertTrue(user.is_admin)
+
+    def test_timeout(self):
+        self.client.TIMEOUT_MARGIN = 0.01
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            m.side_effect = lambda *args, **kwargs: Future()
+            self.assertRaises(DeadlineExceeded, self.client.ping,
+                              timeout=0.05)
+            self.assertTrue(m.call_args[1]['request_timeout'] <= 0.05)
+            # The hung request is abandoned once the deadline is reached
+            report = self.client.close(timeout=0.1)
+            self.assertTrue(report['timed_out'])
+            self.assertEqual(report['abandoned_requests'], 1)
+
+    def test_time_precision(self):
+        client = SyncAsyncfluxClient(time_precision='s', batch_size=1000,
+                                     flush_interval=60, timeout=5)
+        self.addCleanup(client.close)
+        self.assertEqual(client.client.time_precision, 's')
+        with self.helper.patch_fetch_mock(client.client) as m:
+            self.helper.setup_fetch_mock(m, 200)
+            client.write('foo', 'cpu', ['time', 'value'], [[1, 1]])
+            client.flush()
+            self.assertIn('time_precision=s', m.call_args[0][0])
+            client['foo'].query('select * from cpu')
+            self.assertIn('time_precision=s', m.call_args[0][0])
+
+    def test_close(self):
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            self.helper.setup_fetch_mock(m, 200)
+            self.client.write('foo', 'cpu', ['value'], [[1], [2]])
+            report = self.client.close(timeout=1)
+            self.assertFalse(report['timed_out'])
+            self.assertEqual(report['batch_writers'], 1)
+            self.assertEqual(report['spilled_points'], 0)
+            self.assertEqual(m.call_count, 1)
+        self.assertTrue(self.client.client.closed)
+        self.assertIsNone(self.client.close())
+
+    def test_threaded_writes(self):
+        def produce(index):
+            for i in range(50):
+                self.client.write('foo', 'cpu', ['thread', 'value'],
+                                  [[index, i]])
+
+        with self.helper.patch_fetch_mock(self.client.client) as m:
+            self.helper.setup_fetch_mock(m, 200)
+            threads = [threading.Thread(target=produce, args=(i, ))
+                       for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.client.flush()
+
+            self.assertEqual(m.call_count, 1)
+            body = json.loads(m.call_args[1]['body'])
+            self.assertEqual(len(body), 1)
+            self.assertEqual(len(body[0]['points']), 200)
+
+        self.client.close()
+        self.assertRaises(RuntimeError, self.client.write, 'foo', 'cpu',
+                          ['value'], [[1]])
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+
+from asyncflux.timestamps import (EPOCH_UTC, convert_series, to_epoch,
+                                  to_epoch_array, validate_time_precision)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+class UTCPlusTwo(datetime.tzinfo):
+
+    def utcoffset(self, dt):
+        return datetime.timedelta(hours=2)
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+
+class TimestampsTestCase(unittest.TestCase):
+
+    moment = datetime.datetime(2014, 5, 13, 16, 53, 20, 123456)
+
+    def test_to_epoch(self):
+        self.assertEqual(to_epoch(self.moment, 's'), 1400000000)
+        self.assertEqual(to_epoch(self.moment, 'ms'), 1400000000123)
+        self.assertEqual(to_epoch(self.moment, 'u'), 1400000000123456)
+        aware = self.moment.replace(hour=18, tzinfo=UTCPlusTwo())
+        self.assertEqual(to_epoch(aware, 'ms'), 1400000000123)
+        self.assertEqual(to_epoch(EPOCH_UTC, 's'), 0)
+        self.assertEqual(to_epoch(1400000000.5, 's'), 1400000000)
+        before_epoch = datetime.datetime(1969, 12, 31, 23, 59, 59, 500000)
+        self.assertEqual(to_epoch(before_epoch, 's'), -1)
+
+    def test_to_epoch_array(self):
+        self.assertEqual(to_epoch_array([self.moment, 5, 6.0], 'ms'),
+                         [1400000000123, 5, 6])
+        self.assertEqual(to_epoch_array((), 's'), [])
+        self.assertRaises(ValueError, to_epoch_array, [1], 'ns')
+        self.assertEqual(validate_time_precision('u'), 'u')
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        values = numpy.array(['2014-05-13T16:53:20.123456',
+                              '1970-01-01T00:00:01'], dtype='datetime64[us]')
+        self.assertEqual(to_epoch_array(values, 'ms'), [1400000000123, 1000])
+        self.assertEqual(to_epoch_array(numpy.arange(3), 's'), [0, 1, 2])
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_pandas(self):
+        index = pandas.DatetimeIndex([self.moment]).tz_localize('UTC')
+        self.assertEqual(to_epoch_array(index, 'u'), [1400000000123456])
+        series = pandas.Series([self.moment])
+        self.assertEqual(to_epoch_array(series, 's'), [1400000000])
+
+    def test_convert_series(self):
+        data = [{'name': 'cpu', 'columns': ['value', 'time'],
+                 'points': [[1, self.moment], [2, 1400000001]]},
+                {'name': 'mem', 'columns': ['value'], 'points': [[3]]},
+                {'name': 'io', 'columns': ['time'], 'points': [[7]]}]
+        converted = convert_series(data, 's')
+        self.assertEqual(converted[0]['points'],
+                         [[1, 1400000000], [2, 1400000001]])
+        self.assertIs(converted[1], data[1])
+        self.assertIs(converted[2], data[2])
+        self.assertEqual(data[0]['points'][0][1], self.moment)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from tornado.httpclient import HTTPRequest, HTTPResponse
+
+from asyncflux.errors import AsyncfluxError
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+from asyncflux.timing import RequestTiming, TimedDict, TimedList, attach
+
+
+class RequestTimingTestCase(AsyncfluxServerTestCase):
+
+    def test_curl_time_info(self):
+        request_timing = RequestTiming('GET', '/ping', 10.0)
+        request_timing.queue = 0.5
+        response = HTTPResponse(HTTPRequest('/ping'), 200, request_time=1.0,
+                                time_info={'queue': 0.1, 'connect': 0.2,
+                                           'pretransfer': 0.3,
+                                           'starttransfer': 0.7,
+                                           'total': 1.0})
+        request_timing.on_response(response, 10.5, 11.5)
+        self.assertAlmostEqual(request_timing.queue, 0.6)
+        self.assertAlmostEqual(request_timing.connect, 0.2)
+        self.assertAlmostEqual(request_timing.ttfb, 0.4)
+        self.assertAlmostEqual(request_timing.transfer, 0.3)
+        self.assertEqual(request_timing.fetch, 1.0)
+        self.assertEqual(request_timing.code, 200)
+
+    def test_attach(self):
+        request_timing = RequestTiming('GET', '/db', 0)
+        self.assertIsInstance(attach([1], request_timing), TimedList)
+        self.assertIsInstance(attach({}, request_timing), TimedDict)
+        self.assertIs(attach({}, request_timing).timing, request_timing)
+        self.assertEqual(attach('ok', request_timing), 'ok')
+
+    @gen_test
+    def test_result_timing(self):
+        client = self.get_client(request_timing=True)
+        yield client.create_database('foo')
+        result = yield client.request('/db')
+        self.assertEqual(result, [{'name': 'foo'}])
+        request_timing = result.timing
+        self.assertEqual(request_timing.code, 200)
+        for phase in ('queue', 'encode', 'ttfb', 'transfer', 'fetch',
+                      'decode', 'total'):
+            self.assertIsNotNone(getattr(request_timing, phase), phase)
+        self.assertIsNone(request_timing.connect)
+        self.assertTrue(request_timing.total >= request_timing.fetch)
+        self.assertIn('ttfb=', repr(request_timing))
+
+    @gen_test
+    def test_hooks(self):
+        client = self.get_client()
+        timings = []
+        client.add_request_hook(timings.append)
+        yield client.create_database('foo')
+        with self.assertRaises(AsyncfluxError) as context:
+            yield client.create_database('foo')
+        self.assertEqual(context.exception.message, b'database foo exists')
+        self.assertEqual([t.code for t in timings], [201, 409])
+        self.assertIsNone(timings[0].error)
+        self.assertIsInstance(timings[1].error, AsyncfluxError)
+        self.assertEqual(timings[1].as_dict()['path'], '/db')
+
+        client.remove_request_hook(timings.append)
+        databases = yield client.request('/db')
+        self.assertEqual(len(timings), 2)
+        self.assertNotIsInstance(databases, TimedList)
+
+    @gen_test
+    def test_body_not_streamed(self):
+        client = self.get_client(request_timing=True)
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            yield client.ping()
+        self.assertIn('header_callback', m.call_args[1])
+        self.assertNotIn('streaming_callback', m.call_args[1])
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import ssl
+import unittest
+
+import tornado
+
+from asyncflux import AsyncfluxClient, tls
+from asyncflux.fakeserver import FakeInfluxDB
+from asyncflux.testing import AsyncfluxServerTestCase, gen_test
+
+CERTS = os.path.join(os.path.dirname(tornado.__file__), 'test')
+
+
+class SessionContextTestCase(unittest.TestCase):
+
+    def test_create_context(self):
+        context = tls.create_context(max_sessions=4)
+        self.assertIsInstance(context, ssl.SSLContext)
+        self.assertEqual(context.verify_mode, ssl.CERT_REQUIRED)
+        self.assertTrue(context.check_hostname)
+        self.assertEqual(context.max_sessions, 4)
+        self.assertEqual(context.statistics(),
+                         {'full_handshakes': 0, 'resumed_handshakes': 0,
+                          'sessions': 0})
+
+    def test_default_context(self):
+        self.assertIs(tls.default_context(), tls.default_context())
+        client = AsyncfluxClient(is_secure=True)
+        self.assertIs(client.ssl_context, tls.default_context())
+        self.assertIn('tls', client.get_statistics())
+        self.assertIsNone(AsyncfluxClient().ssl_context)
+
+
+class SessionResumptionTestCase(AsyncfluxServerTestCase):
+
+    def get_server(self):
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(os.path.join(CERTS, 'test.crt'),
+                                os.path.join(CERTS, 'test.key'))
+        return FakeInfluxDB(ssl_options=context)
+
+    def get_context(self):
+        context = tls.create_context(cafile=os.path.join(CERTS, 'test.crt'))
+        # The test certificate isn't issued for 127.0.0.1
+        context.check_hostname = False
+        return context
+
+    @gen_test
+    def test_resumed_handshakes(self):
+        context = self.get_context()
+        client = self.get_client(is_secure=True, ssl_context=context)
+        self.assertTrue(self.server.url.startswith('https://'))
+        for _ in range(3):
+            response = yield client.ping()
+            self.assertEqual(response, {'status': 'ok'})
+        self.assertEqual(client.get_statistics()['tls'],
+                         {'full_handshakes': 1, 'resumed_handshakes': 2,
+                          'sessions': 1})
+
+        # Clients sharing the context share its sessions
+        other = self.get_client(is_secure=True, ssl_context=context)
+        yield other.ping()
+        self.assertEqual(context.statistics()['resumed_handshakes'], 3)
+
+        context.clear_sessions()
+        yield client.ping()
+        self.assertEqual(context.statistics()['full_handshakes'], 2)
+
+    @gen_test
+    def test_plain_context(self):
+        context = ssl.create_default_context(
+            cafile=os.path.join(CERTS, 'test.crt'))
+        context.check_hostname = False
+        client = self.get_client(is_secure=True, ssl_context=context)
+        response = yield client.ping()
+        self.assertEqual(response, {'status': 'ok'})
+        self.assertNotIn('tls', client.get_statistics())
@@ -235,6 +235,65 @@ class UserTestCase(AsyncfluxTestCase):
             self.assert_mock_args(m, '/db/%s/users/%s' % (db_name, username),
                                   method='DELETE')
 
+    @gen_test
+    def test_save(self):
+        client = AsyncfluxClient()
+        db = client['foo']
+        user = User(db, 'bar', is_admin=True)
+        self.assertFalse(user.dirty)
+
+        user.is_admin = False
+        user.read_from = '^cpu$'
+        user.set_password('fubar')
+        self.assertEqual(user.changes, {'is_admin': False,
+                                        'read_from': '^cpu$',
+                                        'password': 'fubar'})
+        payload = {'password': 'fubar', 'isAdmin': False,
+                   'readFrom': '^cpu$', 'writeTo': '.*'}
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            saved = yield user.save()
+            self.assertTrue(saved)
+            self.assertFalse(user.dirty)
+
+            self.assert_mock_args(m, '/db/foo/users/bar', method='POST',
+                                  body=json.dumps(payload))
+
+        with self.patch_fetch_mock(client) as m:
+            user.write_to = '^$'
+            user.write_to = '.*'
+            saved = yield user.save()
+            self.assertFalse(saved)
+            self.assertFalse(m.called)
+
+        user.is_admin = True
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 500, body='Internal error')
+            with self.assertRaises(AsyncfluxError):
+                yield user.save()
+        self.assertEqual(user.changes, {'is_admin': True})
+
+        user.discard_changes()
+        self.assertFalse(user.is_admin)
+        self.assertFalse(user.dirty)
+
+    @gen_test
+    def test_save_users(self):
+        client = AsyncfluxClient()
+        db = client['foo']
+        users = [User(db, 'user%d' % i) for i in range(4)]
+        for user in users[1:]:
+            user.write_to = '^$'
+            user.read_from = '^$'
+
+        with self.patch_fetch_mock(client) as m:
+            self.setup_fetch_mock(m, 200)
+            saved = yield db.save_users(users, concurrency=2)
+            self.assertEqual(saved, 3)
+            self.assertEqual(m.call_count, 3)
+            self.assertEqual(json.loads(m.call_args[1]['body']),
+                             {'readFrom': '^$', 'writeTo': '^$'})
+
     def test_repr(self):
         host = 'localhost'
         port = 8086
@@ -244,3 +303,24 @@ class UserTestCase(AsyncfluxTestCase):
         format_repr = "User(Database(AsyncfluxClient('%s', %d), '%s'), '%s')"
         self.assertEqual(repr(User(db, username)),
                          (format_repr % (host, port, db_name, username)))
+
+    def test_from_raw(self):
+        db = AsyncfluxClient()['foo']
+        raw = {'name': 'bar', 'isAdmin': True, 'readFrom': '^a$'}
+        user = User.from_raw(db, raw)
+        self.assertFalse(hasattr(user, '__dict__'))
+        self.assertEqual(user.name, 'bar')
+        self.assertEqual(user.database, db)
+        # Attributes are read on first access, with the defaults
+        self.assertTrue(user.is_admin)
+        self.assertEqual(user.read_from, '^a$')
+        self.assertEqual(user.write_to, User.WRITE_TO)
+        self.assertEqual(raw, {'name': 'bar', 'isAdmin': True,
+                               'readFrom': '^a$'})
+
+        user = User.from_raw(db, {'name': 'bar', 'writeTo': '^b$'})
+        user.write_to = '^c$'
+        self.assertEqual(user.changes, {'write_to': '^c$'})
+        user.discard_changes()
+        self.assertEqual(user.write_to, '^b$')
+        self.assertFalse(user.dirty)
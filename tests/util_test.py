@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
+from tornado import gen
+from tornado.testing import gen_test
+
 from asyncflux import AsyncfluxClient
 from asyncflux.testing import AsyncfluxTestCase
-from asyncflux.util import snake_case, snake_case_dict
+from asyncflux import util
+from asyncflux.util import (LazyModule, LRUCache, gather_bounded,
+                            parse_duration, set_from_raw, snake_case,
+                            snake_case_dict)
 
 
 class TestAsyncfluxCoroutine(AsyncfluxTestCase):
@@ -38,3 +44,93 @@ class TestSnakeCase(AsyncfluxTestCase):
             'read_from': '.*'
         }
         self.assertDictEqual(snake_case_dict(raw_dict), snake_dict)
+
+    def test_snake_case_memo(self):
+        self.assertEqual(snake_case('shardDuration'), 'shard_duration')
+        self.assertEqual(util._SNAKE_CACHE['shardDuration'],
+                         'shard_duration')
+        self.assertLessEqual(len(util._SNAKE_CACHE), util._SNAKE_CACHE_SIZE)
+
+    def test_set_from_raw(self):
+        class Model(object):
+            __slots__ = ('_Model__is_admin', '_Model__write_to')
+
+        model = Model()
+        set_from_raw(model, {'isAdmin': True, 'writeTo': None, 'other': 1},
+                     {'is_admin': '_Model__is_admin',
+                      'write_to': '_Model__write_to'})
+        self.assertTrue(model._Model__is_admin)
+        self.assertFalse(hasattr(model, '_Model__write_to'))
+
+
+class TestLazyModule(AsyncfluxTestCase):
+
+    def test_lazy_module(self):
+        module = LazyModule('asyncflux.timestamps')
+        self.assertIn('not imported', repr(module))
+        self.assertEqual(module.DEFAULT_PRECISION, 'ms')
+        self.assertIn('(imported)', repr(module))
+        with self.assertRaises(AttributeError):
+            module.missing
+
+    def test_lazy_http_client(self):
+        client = AsyncfluxClient()
+        self.assertIsNone(client._AsyncfluxClient__http_client)
+        http_client = client.http_client
+        self.assertIs(client.http_client, http_client)
+        client.http_client = None
+        self.assertIsNot(client.http_client, http_client)
+
+
+class TestGatherBounded(AsyncfluxTestCase):
+
+    @gen_test
+    def test_gather_bounded(self):
+        state = {'running': 0, 'max': 0}
+
+        @gen.coroutine
+        def task(value):
+            state['running'] += 1
+            state['max'] = max(state['max'], state['running'])
+            yield gen.moment
+            state['running'] -= 1
+            raise gen.Return(value * 2)
+
+        tasks = [lambda v=v: task(v) for v in range(5)]
+        results = yield gather_bounded(tasks, 2)
+        self.assertEqual(results, [0, 2, 4, 6, 8])
+        self.assertEqual(state['max'], 2)
+
+        received = []
+        results = yield gather_bounded(
+            tasks, 2, on_result=lambda i, r: received.append((i, r)))
+        self.assertIsNone(results)
+        self.assertEqual(sorted(received),
+                         [(0, 0), (1, 2), (2, 4), (3, 6), (4, 8)])
+
+
+class TestParseDuration(AsyncfluxTestCase):
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('30s'), 30)
+        self.assertEqual(parse_duration('15m'), 900)
+        self.assertEqual(parse_duration('1h'), 3600)
+        self.assertEqual(parse_duration('7d'), 604800)
+        self.assertEqual(parse_duration('1w'), 604800)
+        self.assertIsNone(parse_duration('inf'))
+        self.assertRaisesRegexp(ValueError, 'Invalid duration: 7y',
+                                parse_duration, '7y')
+
+
+class TestLRUCache(AsyncfluxTestCase):
+
+    def test_lru_cache(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('b', 0), 0)
+        self.assertEqual(len(cache), 2)